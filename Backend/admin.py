@@ -1,6 +1,11 @@
-from django.contrib import admin
+from django.contrib import admin, messages
 from .models import *
 from django.contrib.auth.admin import UserAdmin as BaseUserAdmin
+from django.db.models import Avg, Count, DurationField, ExpressionWrapper, F, Min, Q
+from datetime import timedelta
+from django.utils import timezone
+from .orders import transition_orders
+from .pricing import price_carts, reprice_orders
 
 
 class UserAdmin(BaseUserAdmin):
@@ -30,20 +35,34 @@ admin.site.register(User, UserAdmin)
 
 @admin.register(Category)
 class CategoryAdmin(admin.ModelAdmin):
-    list_display = ('name', 'slug', 'created_at')
+    list_display = ('name', 'slug', 'product_count', 'active_product_count', 'created_at')
+    readonly_fields = ('product_count', 'active_product_count')
     search_fields = ('name',)
     prepopulated_fields = {'slug': ('name',)}
 
 
 @admin.register(Product)
 class ProductAdmin(admin.ModelAdmin):
-    list_display = ('name', 'slug', 'price', 'category', 'stock', 'created_at')
+    list_display = ('name', 'slug', 'price', 'category', 'stock', 'reserved', 'created_at')
+    readonly_fields = ('reserved',)
     list_select_related = ('category',)
     search_fields = ('name', 'description')
     list_filter = ('category', 'stock', 'created_at')
     prepopulated_fields = {'slug': ('name',)}
 
 
+@admin.register(RecommendationRun)
+class RecommendationRunAdmin(admin.ModelAdmin):
+    list_display = ('id', 'last_order_id', 'orders', 'products', 'full', 'started_at', 'finished_at')
+    readonly_fields = ('last_order_id', 'orders', 'products', 'full', 'started_at', 'finished_at')
+
+
+@admin.register(RollupRun)
+class RollupRunAdmin(admin.ModelAdmin):
+    list_display = ('id', 'watermark', 'orders', 'days', 'full', 'started_at', 'finished_at')
+    readonly_fields = ('watermark', 'orders', 'days', 'full', 'started_at', 'finished_at')
+
+
 class OrderItemInline(admin.TabularInline):
     model = OrderItem
     extra = 0
@@ -52,12 +71,40 @@ class OrderItemInline(admin.TabularInline):
 
 @admin.register(Order)
 class OrderAdmin(admin.ModelAdmin):
-    list_display    = ('order_number', 'user', 'status', 'payment_status', 'total', 'created_at')
+    list_display    = ('order_number', 'user', 'status', 'payment_status', 'item_count', 'total', 'created_at')
+    list_select_related = ('user',)
     list_filter     = ('status', 'payment_status', 'created_at')
     search_fields   = ('order_number', 'user__email')
     ordering        = ('-created_at',)
     inlines         = [OrderItemInline]
-    readonly_fields = ('order_number', 'created_at', 'updated_at')
+    readonly_fields = ('order_number', 'item_count', 'total_quantity', 'created_at', 'updated_at')
+    actions = ['mark_confirmed', 'mark_shipped', 'mark_delivered', 'cancel_and_restock', 'reprice']
+
+    def _transition(self, request, queryset, target):
+        applied, rejected = transition_orders(queryset.values_list('id', flat=True), target)
+        level = messages.WARNING if rejected else messages.SUCCESS
+        self.message_user(request, f"{applied} order(s) moved to {target}, {rejected} rejected by their current status.", level)
+
+    @admin.action(description='Mark selected orders as confirmed')
+    def mark_confirmed(self, request, queryset):
+        self._transition(request, queryset, 'confirm')
+
+    @admin.action(description='Mark selected orders as shipped')
+    def mark_shipped(self, request, queryset):
+        self._transition(request, queryset, 'shipped')
+
+    @admin.action(description='Mark selected orders as delivered')
+    def mark_delivered(self, request, queryset):
+        self._transition(request, queryset, 'delivered')
+
+    @admin.action(description='Cancel selected orders and restock')
+    def cancel_and_restock(self, request, queryset):
+        self._transition(request, queryset, 'canceled')
+
+    @admin.action(description='Reprice selected unpaid pending orders with current prices and rules')
+    def reprice(self, request, queryset):
+        repriced = reprice_orders(list(queryset.values_list('id', flat=True)))
+        self.message_user(request, f"{repriced} order(s) repriced; paid or processed orders were left alone.")
 
 
 class CartItemInline(admin.TabularInline):
@@ -68,12 +115,93 @@ class CartItemInline(admin.TabularInline):
 
 @admin.register(Cart)
 class CartAdmin(admin.ModelAdmin):
-    list_display = ('user', 'total_items', 'total_price', 'create_at')
+    list_display = ('user', 'total_items', 'priced_total', 'create_at')
+    list_select_related = ('user',)
     inlines = [CartItemInline]
 
+    def get_queryset(self, request):
+        return Cart.with_totals()
+
+    def get_changelist_instance(self, request):
+        # price the whole page in one pass over the prefetched items
+        changelist = super().get_changelist_instance(request)
+        quotes = price_carts(changelist.result_list)
+        for cart in changelist.result_list:
+            cart.priced_subtotal = quotes[cart.id].subtotal
+        return changelist
+
+    @admin.display(description='Total (after discounts)')
+    def priced_total(self, obj):
+        return obj.priced_subtotal
+
+
+@admin.register(TaxRule)
+class TaxRuleAdmin(admin.ModelAdmin):
+    list_display = ('name', 'rate', 'category', 'country', 'state', 'is_active', 'updated_at')
+    list_filter = ('is_active', 'country', 'category')
+    list_select_related = ('category',)
+    search_fields = ('name', 'country', 'state')
+
+
+@admin.register(DiscountRule)
+class DiscountRuleAdmin(admin.ModelAdmin):
+    list_display = ('name', 'percent', 'product', 'category', 'min_quantity', 'starts_at', 'ends_at', 'is_active')
+    list_filter = ('is_active', 'category')
+    list_select_related = ('product', 'category')
+    search_fields = ('name', 'product__name')
+    raw_id_fields = ('product',)
+
 
 @admin.register(Address)
 class AddressAdmin(admin.ModelAdmin):
     list_display  = ('fullname', 'user', 'city', 'state', 'country', 'is_default')
     list_filter   = ('is_default', 'country')
-    search_fields = ('fullname', 'user__email', 'city')
\ No newline at end of file
+    search_fields = ('fullname', 'user__email', 'city')
+
+
+@admin.register(Task)
+class TaskAdmin(admin.ModelAdmin):
+    list_display = ('id', 'name', 'status', 'attempts', 'max_attempts', 'run_at', 'created_at', 'latency', 'duration')
+    list_filter = ('status', 'name')
+    search_fields = ('name', 'last_error')
+    readonly_fields = ('locked_by', 'locked_at', 'created_at', 'started_at', 'finished_at', 'last_error')
+    actions = ['retry_tasks']
+
+    @admin.display(description='Latency')
+    def latency(self, obj):
+        # queued -> picked up (last attempt)
+        return obj.started_at - obj.run_at if obj.started_at and obj.started_at >= obj.run_at else None
+
+    @admin.display(description='Duration')
+    def duration(self, obj):
+        return obj.finished_at - obj.started_at if obj.finished_at and obj.started_at else None
+
+    @admin.action(description='Retry selected tasks now')
+    def retry_tasks(self, request, queryset):
+        retried = queryset.exclude(status='running').update(
+            status='queued', run_at=timezone.now(), attempts=0, locked_by='', locked_at=None, finished_at=None,
+        )
+        self.message_user(request, f"{retried} task(s) queued again.")
+
+    def changelist_view(self, request, extra_context=None):
+        now = timezone.now()
+        depth = Task.objects.aggregate(
+            queued=Count('id', filter=Q(status='queued')),
+            due=Count('id', filter=Q(status='queued', run_at__lte=now)),
+            running=Count('id', filter=Q(status='running')),
+            failed=Count('id', filter=Q(status='failed')),
+            oldest_due=Min('run_at', filter=Q(status='queued', run_at__lte=now)),
+        )
+        recent = Task.objects.filter(status='done', finished_at__gte=now - timedelta(hours=1)).aggregate(
+            count=Count('id'),
+            latency=Avg(ExpressionWrapper(F('started_at') - F('run_at'), output_field=DurationField())),
+            duration=Avg(ExpressionWrapper(F('finished_at') - F('started_at'), output_field=DurationField())),
+        )
+        waiting = (now - depth['oldest_due']).total_seconds() if depth['oldest_due'] else 0
+        self.message_user(request, (
+            f"Queue: {depth['queued']} queued ({depth['due']} due, oldest waiting {waiting:.0f}s), "
+            f"{depth['running']} running, {depth['failed']} failed. "
+            f"Last hour: {recent['count']} done, avg latency {recent['latency'] or timedelta(0)}, "
+            f"avg run time {recent['duration'] or timedelta(0)}."
+        ), messages.INFO)
+        return super().changelist_view(request, extra_context)
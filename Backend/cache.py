@@ -0,0 +1,108 @@
+import hashlib
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+from django.utils.cache import get_conditional_response
+from django.utils.http import parse_http_date_safe
+from rest_framework.response import Response
+
+
+# Every cached response is keyed on the current version of the tables it reads.
+# Saving or deleting a row bumps that table's version, so stale entries are
+# never read again and simply age out of the cache.
+VERSION_KEY = 'catalog:version:{tag}'
+
+
+def get_version(tag):
+    key = VERSION_KEY.format(tag=tag)
+    version = cache.get(key)
+    if version is None:
+        cache.add(key, 1, timeout=None)
+        version = cache.get(key, 1)
+    return version
+
+
+def bump_version(*tags):
+    for tag in tags:
+        key = VERSION_KEY.format(tag=tag)
+        try:
+            cache.incr(key)
+        except ValueError:
+            # key missing (first write or evicted)
+            cache.set(key, 2, timeout=None)
+
+
+def bump_version_on_commit(*tags):
+    """
+    bump_version once the current transaction commits (right away outside
+    one). Bumping earlier lets a concurrent read cache the old rows under
+    the new version; a rollback bumps nothing.
+    """
+    transaction.on_commit(lambda: bump_version(*tags))
+
+
+def versioned_key(prefix, tags, raw):
+    versions = '.'.join(f"{tag}{get_version(tag)}" for tag in tags)
+    digest = hashlib.md5(raw.encode()).hexdigest()
+    return f"catalog:{prefix}:{versions}:{digest}"
+
+
+def build_cache_key(request, action, tags):
+    query = sorted(
+        (name, value)
+        for name in request.query_params
+        for value in request.query_params.getlist(name)
+    )
+    return versioned_key(f'response.{action}', tags, f"{request.get_host()}|{request.path}|{query}")
+
+
+class CachedResponseMixin:
+    """
+    Serves the read actions of a viewset from the cache.
+    Entries are invalidated by tag through `bump_version`.
+
+    The response's ETag / Last-Modified are cached with its data, so listed
+    before ConditionalGetMixin a hit answers If-None-Match without running
+    the validator query again.
+    """
+    cached_headers = ('ETag', 'Last-Modified')
+    cache_actions = ('list', 'retrieve')
+    cache_tags = ()
+
+    def get_cache_timeout(self):
+        return getattr(settings, 'CATALOG_CACHE_TIMEOUT', 300)
+
+    def cached_response(self, handler, request, *args, **kwargs):
+        # staff get live data (and may use page-number pagination)
+        if (self.action not in self.cache_actions or request.method != 'GET'
+                or request.user.is_staff):
+            return handler(request, *args, **kwargs)
+
+        key = build_cache_key(request, self.action, self.cache_tags)
+        entry = cache.get(key)
+        if entry is not None:
+            data, headers = entry
+            not_modified = get_conditional_response(
+                request,
+                etag=headers.get('ETag'),
+                last_modified=parse_http_date_safe(headers.get('Last-Modified', '')),
+            )
+            if not_modified is not None:
+                return not_modified
+            response = Response(data)
+            for name, value in headers.items():
+                response[name] = value
+            return response
+
+        response = handler(request, *args, **kwargs)
+        if response.status_code == 200:
+            headers = {name: response[name] for name in self.cached_headers if name in response}
+            cache.set(key, (response.data, headers), self.get_cache_timeout())
+        return response
+
+    def list(self, request, *args, **kwargs):
+        return self.cached_response(super().list, request, *args, **kwargs)
+
+    def retrieve(self, request, *args, **kwargs):
+        return self.cached_response(super().retrieve, request, *args, **kwargs)
@@ -0,0 +1,179 @@
+import csv
+import json
+import time
+
+from django.db import transaction
+from django.db.models import Q
+from rest_framework.exceptions import ValidationError
+
+from .cache import bump_version
+from .models import Category, Product
+from .search import get_search_backend
+from .serializers import ProductImportSerializer
+
+FIELDS = ['slug', 'name', 'category', 'description', 'price', 'discount', 'stock', 'status']
+UPDATE_FIELDS = ['name', 'category', 'description', 'price', 'discount', 'stock', 'status', 'updated_at']
+FORMATS = ('csv', 'jsonl')
+
+
+def guess_format(filename, default='csv'):
+    filename = filename.lower().removesuffix('.gz')
+    for fmt in FORMATS:
+        if filename.endswith(f'.{fmt}'):
+            return fmt
+    return default
+
+
+# Reading
+
+def read_rows(stream, fmt):
+    """Yields (line_number, row_dict) from a text stream without loading it."""
+    if fmt == 'csv':
+        reader = csv.DictReader(stream)
+        for row in reader:
+            yield reader.line_num, row
+    else:
+        for line_number, line in enumerate(stream, start=1):
+            if line.strip():
+                try:
+                    yield line_number, json.loads(line)
+                except ValueError as e:
+                    yield line_number, e
+
+
+# Writing
+
+class _Echo:
+    # csv.writer wants a file; this hands back each line instead
+    def write(self, value):
+        return value
+
+
+def export_rows(queryset=None, chunk_size=2000):
+    queryset = queryset if queryset is not None else Product.objects.all()
+    rows = queryset.order_by('id').values_list(
+        'slug', 'name', 'category__slug', 'description', 'price', 'discount', 'stock', 'status',
+    )
+    for row in rows.iterator(chunk_size=chunk_size):
+        yield dict(zip(FIELDS, row))
+
+
+def render_rows(rows, fmt, fields=FIELDS):
+    """Yields encoded CSV/JSONL lines, header first for CSV."""
+    if fmt == 'csv':
+        writer = csv.writer(_Echo())
+        yield writer.writerow(fields)
+        for row in rows:
+            yield writer.writerow([row[name] for name in fields])
+    else:
+        for row in rows:
+            yield json.dumps(row, default=str) + '\n'
+
+
+# Importing
+
+class ProductImporter:
+    """
+    Validates rows in batches and upserts them on `slug` with one
+    INSERT ... ON CONFLICT DO UPDATE per batch. A bad row is reported
+    and skipped; it never aborts the rest of its batch. `errors` keeps the
+    first `max_errors` (line_number, detail) pairs in line order;
+    `error_count` counts them all.
+    """
+
+    def __init__(self, batch_size=1000, on_progress=None, max_errors=100):
+        self.batch_size = batch_size
+        self.on_progress = on_progress
+        self.max_errors = max_errors
+        self.serializer = ProductImportSerializer()
+        self.categories = {}
+        self.processed = 0
+        self.upserted = 0
+        self.errors = []
+        self.error_count = 0
+        self.elapsed = 0.0
+
+    @property
+    def rate(self):
+        return self.processed / self.elapsed if self.elapsed else 0.0
+
+    def run(self, rows):
+        started = time.perf_counter()
+        batch = []
+        for line_number, row in rows:
+            batch.append((line_number, row))
+            if len(batch) >= self.batch_size:
+                self.flush(batch)
+                self.trim_errors()
+                batch = []
+                self.elapsed = time.perf_counter() - started
+                if self.on_progress:
+                    self.on_progress(self)
+        if batch:
+            self.flush(batch)
+            self.trim_errors()
+        self.elapsed = time.perf_counter() - started
+
+        if self.upserted:
+            with transaction.atomic():
+                Category.recount_products()
+            bump_version('product', 'category')
+        return self
+
+    def add_error(self, line_number, detail):
+        self.error_count += 1
+        self.errors.append((line_number, detail))
+
+    def trim_errors(self):
+        # a batch reports its rows out of order; later batches only hold later lines
+        self.errors.sort(key=lambda error: error[0])
+        del self.errors[self.max_errors:]
+
+    def validate(self, batch):
+        valid = []
+        for line_number, row in batch:
+            if isinstance(row, Exception) or not isinstance(row, dict):
+                self.add_error(line_number, {'row': [f'Unreadable row: {row}']})
+                continue
+            try:
+                valid.append((line_number, self.serializer.run_validation(row)))
+            except ValidationError as e:
+                self.add_error(line_number, e.detail)
+        return valid
+
+    def resolve_categories(self, names):
+        missing = {name for name in names if name not in self.categories}
+        if missing:
+            for category in Category.objects.filter(Q(slug__in=missing) | Q(name__in=missing)).only('id', 'name', 'slug'):
+                self.categories[category.slug] = category.id
+                self.categories[category.name] = category.id
+
+    def flush(self, batch):
+        self.processed += len(batch)
+        valid = self.validate(batch)
+        self.resolve_categories({data['category'] for _, data in valid})
+
+        products = {}
+        for line_number, data in valid:
+            category_id = self.categories.get(data['category'])
+            if category_id is None:
+                self.add_error(line_number, {'category': [f"Unknown category \"{data['category']}\"."]})
+                continue
+            data['category_id'] = category_id
+            del data['category']
+            # a slug repeated inside one batch: the last row wins
+            products[data['slug']] = Product(**data)
+
+        if not products:
+            return
+
+        with transaction.atomic():
+            Product.objects.bulk_create(
+                products.values(),
+                update_conflicts=True,
+                unique_fields=['slug'],
+                update_fields=UPDATE_FIELDS,
+            )
+            product_ids = Product.objects.filter(slug__in=products).values_list('id', flat=True)
+            get_search_backend().index_products(list(product_ids))
+        self.upserted += len(products)
@@ -0,0 +1,80 @@
+import hashlib
+
+from django.db.models import Count, Max
+from django.utils.cache import get_conditional_response
+from django.utils.http import http_date
+
+from .cache import get_version
+
+
+class ConditionalGetMixin:
+    """
+    ETag / Last-Modified for read actions, answered before any serialization.
+
+    Validators come from one aggregate over the rows the action would return:
+    COUNT(*) (catches deletes) and MAX(updated_at) of the rows plus any related
+    timestamps in `etag_related` whose data is embedded in the response.
+    A matching If-None-Match / If-Modified-Since gets a bare 304.
+    `etag_tags` are cache-version tags (Backend.cache) of rules that shape the
+    response without living in its rows; their versions go into the ETag.
+    Override get_etag_parts() for rules that change without a version bump.
+    """
+    conditional_actions = ('list', 'retrieve')
+    etag_related = ()
+    etag_tags = ()
+
+    def get_conditional_queryset(self):
+        if self.action == 'retrieve':
+            lookup_url_kwarg = self.lookup_url_kwarg or self.lookup_field
+            return self.get_queryset().filter(**{self.lookup_field: self.kwargs[lookup_url_kwarg]})
+        return self.filter_queryset(self.get_queryset())
+
+    def get_etag_parts(self):
+        return [f'{tag}{get_version(tag)}' for tag in self.etag_tags]
+
+    def get_conditional_state(self):
+        """Returns (count, [timestamps]) for the current action, or None to skip."""
+        fields = ['updated_at', *self.etag_related]
+        aggregates = {f'max_{index}': Max(field) for index, field in enumerate(fields)}
+        row = self.get_conditional_queryset().order_by().aggregate(count=Count('pk'), **aggregates)
+        if self.action == 'retrieve' and not row['count']:
+            return None  # let the view raise its usual 404
+        return row['count'], [row[f'max_{index}'] for index in range(len(fields))]
+
+    def conditional_response(self, handler, request, *args, **kwargs):
+        if self.action not in self.conditional_actions or request.method != 'GET':
+            return handler(request, *args, **kwargs)
+
+        state = self.get_conditional_state()
+        if state is None:
+            return handler(request, *args, **kwargs)
+
+        count, timestamps = state
+        timestamps = [ts for ts in timestamps if ts is not None]
+        last_modified = int(max(timestamps).timestamp()) if timestamps else None
+
+        raw = '|'.join([
+            request.get_full_path(),
+            str(request.user.pk or ''),
+            str(count),
+            *(ts.isoformat() for ts in timestamps),
+            *self.get_etag_parts(),
+        ])
+        etag = f'W/"{hashlib.md5(raw.encode()).hexdigest()}"'
+
+        not_modified = get_conditional_response(request, etag=etag, last_modified=last_modified)
+        if not_modified is not None:
+            return not_modified
+
+        response = handler(request, *args, **kwargs)
+        if response.status_code == 200:
+            response['ETag'] = etag
+            if last_modified is not None:
+                response['Last-Modified'] = http_date(last_modified)
+        return response
+
+    def list(self, request, *args, **kwargs):
+        return self.conditional_response(super().list, request, *args, **kwargs)
+
+    def retrieve(self, request, *args, **kwargs):
+        return self.conditional_response(super().retrieve, request, *args, **kwargs)
@@ -0,0 +1,67 @@
+import zlib
+
+from django.db.models import DecimalField, ExpressionWrapper, F
+
+from .catalog import render_rows
+from .models import Order
+
+# one row per order line; order and address columns repeat on each of its lines
+ORDER_FIELDS = [
+    'order_number', 'created_at', 'status', 'payment_status', 'customer_email',
+    'subtotal', 'tax', 'total', 'item_count', 'total_quantity',
+    'ship_name', 'ship_street', 'ship_city', 'ship_state', 'ship_zipcode', 'ship_country', 'ship_phone',
+    'product_id', 'product_name', 'unit_price', 'quantity', 'line_total',
+]
+BUFFER_SIZE = 64 * 1024
+
+
+def order_rows(queryset=None, chunk_size=2000):
+    """
+    Yields one dict per order line, orders joined to their items, customer
+    and shipping address in a single query read through .iterator(), so
+    memory stays flat however many orders match.
+    """
+    queryset = queryset if queryset is not None else Order.objects.all()
+    rows = (
+        queryset.order_by('id', 'items__id')
+        .annotate(line_total=ExpressionWrapper(
+            F('items__quantity') * F('items__unit_price'), output_field=DecimalField(max_digits=14, decimal_places=2),
+        ))
+        .values_list(
+            'order_number', 'created_at', 'status', 'payment_status', 'user__email',
+            'subtotal', 'tax', 'total', 'item_count', 'total_quantity',
+            'shipped_address__fullname', 'shipped_address__street', 'shipped_address__city',
+            'shipped_address__state', 'shipped_address__zipcode', 'shipped_address__country',
+            'shipped_address__phone',
+            'items__product_id', 'items__product_name', 'items__unit_price', 'items__quantity', 'line_total',
+        )
+    )
+    for row in rows.iterator(chunk_size=chunk_size):
+        yield dict(zip(ORDER_FIELDS, row))
+
+
+def render_orders(rows, fmt):
+    return render_rows(rows, fmt, fields=ORDER_FIELDS)
+
+
+def buffered(lines, size=BUFFER_SIZE):
+    """Joins small text lines into ~`size` byte chunks: fewer writes, better compression."""
+    parts, length = [], 0
+    for line in lines:
+        parts.append(line)
+        length += len(line)
+        if length >= size:
+            yield ''.join(parts).encode('utf-8')
+            parts, length = [], 0
+    if parts:
+        yield ''.join(parts).encode('utf-8')
+
+
+def gzipped(chunks, level=6):
+    """Compresses a byte stream on the fly into a single .gz member."""
+    compressor = zlib.compressobj(level, zlib.DEFLATED, 16 + zlib.MAX_WBITS)
+    for chunk in chunks:
+        data = compressor.compress(chunk)
+        if data:
+            yield data
+    yield compressor.flush()
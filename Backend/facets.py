@@ -0,0 +1,95 @@
+from django.db.models import Count, F, Q
+from django.db.models.lookups import GreaterThan, LessThanOrEqual
+
+# (label, lower bound inclusive, upper bound exclusive); None is open-ended
+PRICE_BUCKETS = [
+    ('under_500', None, 500),
+    ('500_1000', 500, 1000),
+    ('1000_5000', 1000, 5000),
+    ('5000_plus', 5000, None),
+]
+
+# discount is a percentage; the first band is "no discount"
+DISCOUNT_BANDS = [
+    ('none', None, 0),
+    ('upto_10', 0, 10),
+    ('10_25', 10, 25),
+    ('25_50', 25, 50),
+    ('50_plus', 50, None),
+]
+
+
+def _price_q(low, high):
+    q = Q()
+    if low is not None:
+        q &= Q(discounted_price__gte=low)
+    if high is not None:
+        q &= Q(discounted_price__lt=high)
+    return q
+
+
+def _discount_q(low, high):
+    # bands are (low, high]; "none" is discount <= 0
+    q = Q()
+    if low is not None:
+        q &= Q(discount__gt=low)
+    if high is not None:
+        q &= Q(discount__lte=high)
+    return q
+
+
+def compute_facets(queryset, category_id=None):
+    """
+    Facet counts for `queryset` in one grouped query.
+
+    Rows are grouped per category with every other facet counted conditionally
+    alongside, so the category facet ignores the selected category (the
+    sidebar still lists the others) while the remaining facets are summed
+    over the selected category only.
+    """
+    aggregates = {'total': Count('id')}
+    for label, low, high in PRICE_BUCKETS:
+        aggregates[f'price__{label}'] = Count('id', filter=_price_q(low, high))
+    for label, low, high in DISCOUNT_BANDS:
+        aggregates[f'discount__{label}'] = Count('id', filter=_discount_q(low, high))
+    # units held in carts can't be bought: both buckets go by what is left
+    available = F('stock') - F('reserved')
+    aggregates['stock__in_stock'] = Count('id', filter=GreaterThan(available, 0))
+    aggregates['stock__out_of_stock'] = Count('id', filter=LessThanOrEqual(available, 0))
+
+    rows = (
+        queryset.order_by()
+        .values('category_id', 'category__name', 'category__slug')
+        .annotate(**aggregates)
+        .order_by('category__name')
+    )
+
+    categories = []
+    totals = dict.fromkeys(aggregates, 0)
+    for row in rows:
+        categories.append({
+            'id': row['category_id'],
+            'name': row['category__name'],
+            'slug': row['category__slug'],
+            'count': row['total'],
+        })
+        if category_id is None or row['category_id'] == category_id:
+            for name in aggregates:
+                totals[name] += row[name]
+
+    return {
+        'total': totals['total'],
+        'categories': categories,
+        'price': [
+            {'key': label, 'min': low, 'max': high, 'count': totals[f'price__{label}']}
+            for label, low, high in PRICE_BUCKETS
+        ],
+        'discount': [
+            {'key': label, 'min': low, 'max': high, 'count': totals[f'discount__{label}']}
+            for label, low, high in DISCOUNT_BANDS
+        ],
+        'stock': {
+            'in_stock': totals['stock__in_stock'],
+            'out_of_stock': totals['stock__out_of_stock'],
+        },
+    }
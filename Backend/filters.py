@@ -0,0 +1,22 @@
+import django_filters
+
+from .models import Order, Product
+
+
+class ProductFilter(django_filters.FilterSet):
+    # range over the stored discounted_price, served by product_status_dprice_idx
+    min_price = django_filters.NumberFilter(field_name='discounted_price', lookup_expr='gte')
+    max_price = django_filters.NumberFilter(field_name='discounted_price', lookup_expr='lte')
+
+    class Meta:
+        model = Product
+        fields = ['category', 'min_price', 'max_price']
+
+
+class OrderFilter(django_filters.FilterSet):
+    created_after = django_filters.IsoDateTimeFilter(field_name='created_at', lookup_expr='gte')
+    created_before = django_filters.IsoDateTimeFilter(field_name='created_at', lookup_expr='lt')
+
+    class Meta:
+        model = Order
+        fields = ['status', 'payment_status', 'created_after', 'created_before']
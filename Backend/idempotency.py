@@ -0,0 +1,162 @@
+import functools
+import hashlib
+import json
+import time
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import IntegrityError, transaction
+from django.utils import timezone
+from rest_framework import status
+from rest_framework.renderers import JSONRenderer
+from rest_framework.response import Response
+
+from .models import IdempotencyKey
+
+HEADER = 'Idempotency-Key'
+REPLAY_HEADER = 'Idempotent-Replayed'
+MAX_KEY_LENGTH = 255
+POLL_INTERVAL = 0.05
+
+
+def _seconds(name, default):
+    return timedelta(seconds=getattr(settings, name, default))
+
+
+def fingerprint(request):
+    body = json.dumps(request.data, sort_keys=True, default=str)
+    return hashlib.sha256(f"{request.method} {request.path}\n{body}".encode()).hexdigest()
+
+
+def client_ip(request):
+    header = getattr(settings, 'CLIENT_IP_HEADER', '')
+    if header:
+        # the proxy appends the address it saw; anything left of it is client-supplied
+        forwarded = request.META.get(header, '').split(',')[-1].strip()
+        if forwarded:
+            return forwarded
+    return request.META.get('REMOTE_ADDR') or ''
+
+
+def _owner(request):
+    user = request.user
+    if user.is_authenticated:
+        return f'user:{user.pk}'
+    # anonymous keys are scoped to the client address, so two strangers
+    # picking the same key never see each other's responses
+    return f"anon:{client_ip(request)}"
+
+
+def _claim(owner, key, digest):
+    """Returns (record, True) when this request should run, (record, False) when another owns it."""
+    now = timezone.now()
+    expires_at = now + _seconds('IDEMPOTENCY_KEY_TTL', 24 * 60 * 60)
+    try:
+        with transaction.atomic():
+            record = IdempotencyKey.objects.create(
+                owner=owner, key=key, fingerprint=digest, locked_at=now, expires_at=expires_at,
+            )
+        return record, True
+    except IntegrityError:
+        record = IdempotencyKey.objects.filter(owner=owner, key=key).first()
+        if record is None:
+            # finished-and-failed in between; try again from the top
+            return _claim(owner, key, digest)
+
+    # expired, or the first request died while holding it: exactly one caller takes it over
+    abandoned = record.response_status is None and record.locked_at <= now - _seconds('IDEMPOTENCY_LOCK_TIMEOUT', 60)
+    if record.expires_at <= now or abandoned:
+        taken = IdempotencyKey.objects.filter(pk=record.pk, locked_at=record.locked_at).update(
+            fingerprint=digest, response_status=None, response_body=None, locked_at=now, expires_at=expires_at,
+        )
+        if taken:
+            record.fingerprint, record.response_status, record.response_body = digest, None, None
+            return record, True
+        record.refresh_from_db()
+    return record, False
+
+
+def _wait(record):
+    """Polls until the request holding the key finishes; None if it failed instead."""
+    deadline = time.monotonic() + getattr(settings, 'IDEMPOTENCY_WAIT', 10)
+    while record is not None and record.response_status is None and time.monotonic() < deadline:
+        time.sleep(POLL_INTERVAL)
+        record = IdempotencyKey.objects.filter(pk=record.pk).first()
+    return record
+
+
+def idempotent(view_method=None, *, private=(), on_replay=None):
+    """
+    Honours an Idempotency-Key header on a view method. The first request
+    with a key runs; its response (anything below 500) is stored per (user,
+    key) for IDEMPOTENCY_KEY_TTL and replayed to retries. Concurrent
+    duplicates wait for the first to finish instead of running in parallel.
+    Requests without the header are untouched.
+
+    The view runs inside a transaction that also stores its response, so the
+    response is kept if and only if the view's writes are: a crash after
+    commit can't leave an order placed with no response to replay.
+
+    `private` names top-level response fields that are never stored (tokens
+    and the like); `on_replay(view, request, body)` returns the body of a
+    successful replay with them filled back in.
+    """
+    if view_method is None:
+        return functools.partial(idempotent, private=private, on_replay=on_replay)
+
+    @functools.wraps(view_method)
+    def wrapper(self, request, *args, **kwargs):
+        key = request.headers.get(HEADER)
+        if not key:
+            return view_method(self, request, *args, **kwargs)
+        if len(key) > MAX_KEY_LENGTH:
+            return Response(
+                {'error': f'{HEADER} must be at most {MAX_KEY_LENGTH} characters.'},
+                status=status.HTTP_400_BAD_REQUEST,
+            )
+
+        digest = fingerprint(request)
+        record, leader = _claim(_owner(request), key, digest)
+
+        if not leader:
+            if record.fingerprint != digest:
+                return Response(
+                    {'error': f'This {HEADER} was already used for a different request.'},
+                    status=status.HTTP_422_UNPROCESSABLE_ENTITY,
+                )
+            record = _wait(record)
+            if record is None or record.response_status is None:
+                return Response(
+                    {'error': f'A request with this {HEADER} is still in progress.'},
+                    status=status.HTTP_409_CONFLICT,
+                    headers={'Retry-After': '1'},
+                )
+            body = record.response_body
+            if on_replay is not None and status.is_success(record.response_status):
+                body = on_replay(self, request, body)
+            return Response(body, status=record.response_status, headers={REPLAY_HEADER: 'true'})
+
+        try:
+            with transaction.atomic():
+                response = view_method(self, request, *args, **kwargs)
+                if response.status_code < 500:
+                    body = json.loads(JSONRenderer().render(response.data)) if response.data is not None else None
+                    if private and isinstance(body, dict):
+                        body = {name: value for name, value in body.items() if name not in private}
+                    IdempotencyKey.objects.filter(pk=record.pk).update(
+                        response_status=response.status_code, response_body=body,
+                    )
+        except Exception:
+            # nothing was committed; let a retry run again
+            IdempotencyKey.objects.filter(pk=record.pk).delete()
+            raise
+
+        if response.status_code >= 500:
+            IdempotencyKey.objects.filter(pk=record.pk).delete()
+        return response
+    return wrapper
+
+
+def purge_expired():
+    deleted, _ = IdempotencyKey.objects.filter(expires_at__lte=timezone.now()).delete()
+    return deleted
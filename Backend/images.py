@@ -0,0 +1,118 @@
+import logging
+import os
+import queue
+import threading
+from io import BytesIO
+
+from django.conf import settings
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.db import transaction
+from PIL import Image, ImageOps
+
+logger = logging.getLogger(__name__)
+
+# name -> bounding box; images are shrunk to fit, never enlarged
+VARIANTS = {
+    'thumb': (160, 160),
+    'card': (480, 480),
+    'detail': (1200, 1200),
+}
+FORMATS = {
+    'webp': ('WEBP', {'quality': 80, 'method': 4}),
+    'jpeg': ('JPEG', {'quality': 82, 'optimize': True, 'progressive': True}),
+}
+
+
+def variant_name(name, variant, fmt):
+    # product/shoe.png -> product/variants/shoe.png_card.webp; the source
+    # extension stays in the name so shoe.png and shoe.jpg don't share variants
+    directory, filename = os.path.split(name)
+    return os.path.join(directory, 'variants', f'{filename}_{variant}.{fmt}')
+
+
+def variant_urls(name, request=None):
+    if not name:
+        return None
+    urls = {}
+    for variant in VARIANTS:
+        urls[variant] = {}
+        for fmt in FORMATS:
+            url = default_storage.url(variant_name(name, variant, fmt))
+            urls[variant][fmt] = request.build_absolute_uri(url) if request else url
+    return urls
+
+
+def generate_variants(name, force=False):
+    """Writes every variant of one stored image; returns how many were written."""
+    if not force and default_storage.exists(variant_name(name, 'detail', 'jpeg')):
+        return 0
+
+    with default_storage.open(name, 'rb') as source:
+        image = Image.open(source)
+        image = ImageOps.exif_transpose(image)
+        # JPEG has no alpha channel; flatten onto white
+        if image.mode in ('RGBA', 'LA', 'P'):
+            image = image.convert('RGBA')
+            background = Image.new('RGB', image.size, (255, 255, 255))
+            background.paste(image, mask=image.split()[-1])
+            image = background
+        elif image.mode != 'RGB':
+            image = image.convert('RGB')
+
+    written = 0
+    for variant, size in VARIANTS.items():
+        resized = image.copy()
+        resized.thumbnail(size, Image.Resampling.LANCZOS)
+        for fmt, (pil_format, options) in FORMATS.items():
+            buffer = BytesIO()
+            resized.save(buffer, pil_format, **options)
+            target = variant_name(name, variant, fmt)
+            if default_storage.exists(target):
+                default_storage.delete(target)
+            default_storage.save(target, ContentFile(buffer.getvalue()))
+            written += 1
+    return written
+
+
+# Local worker queue
+# Uploads only enqueue the file name; resizing happens on background threads
+# so the request that saved the image never waits for Pillow.
+
+_queue = queue.Queue()
+_workers = []
+_workers_lock = threading.Lock()
+
+
+def _work():
+    while True:
+        name = _queue.get()
+        try:
+            generate_variants(name)
+        except Exception:
+            logger.exception("Could not generate image variants for %s", name)
+        finally:
+            _queue.task_done()
+
+
+def _ensure_workers():
+    with _workers_lock:
+        if _workers:
+            return
+        for index in range(getattr(settings, 'IMAGE_VARIANT_WORKERS', 2)):
+            worker = threading.Thread(target=_work, name=f'image-variants-{index}', daemon=True)
+            worker.start()
+            _workers.append(worker)
+
+
+def enqueue_variants(name):
+    if not name:
+        return
+    _ensure_workers()
+    # the file only exists for sure once the upload's transaction commits
+    transaction.on_commit(lambda: _queue.put(name))
+
+
+def wait_for_variants():
+    """Blocks until the queue is drained (management commands, shutdown)."""
+    _queue.join()
@@ -0,0 +1,106 @@
+import threading
+import time
+import uuid
+from collections import Counter
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.db.models import Sum
+from rest_framework.test import APIRequestFactory, force_authenticate
+
+from Backend.models import Address, Cart, CartItem, Category, Order, OrderItem, Product, User
+from Backend.views import CheckoutView
+
+
+class Command(BaseCommand):
+    help = (
+        "Stress test: many concurrent checkouts of carts sharing the same SKUs, through CheckoutView. "
+        "Fails if any SKU is oversold. Creates throwaway rows and deletes them afterwards. "
+        "Meaningful on PostgreSQL; SQLite serializes every writer."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--threads', type=int, default=100, help="Concurrent shoppers, one checkout each.")
+        parser.add_argument('--skus', type=int, default=3, help="Hot products in every cart.")
+        parser.add_argument('--quantity', type=int, default=2, help="Units of each SKU per cart.")
+        parser.add_argument('--stock', type=int, default=150, help="Starting stock of each SKU.")
+
+    def handle(self, *args, threads, skus, quantity, stock, **options):
+        if threads < 1 or skus < 1 or quantity < 1:
+            raise CommandError("--threads, --skus and --quantity must be at least 1.")
+        tag = uuid.uuid4().hex[:8]
+        category = Category.objects.create(name=f'bench-{tag}', slug=f'bench-{tag}', description='benchmark')
+        products = Product.objects.bulk_create([
+            Product(category=category, name=f'Hot SKU {tag} {index}', slug=f'bench-{tag}-{index}',
+                    description='benchmark', price=10, discount=0, stock=stock, status='active')
+            for index in range(skus)
+        ])
+        users = User.objects.bulk_create([User(email=f'bench-{tag}-{index}@example.com') for index in range(threads)])
+        addresses = Address.objects.bulk_create([
+            Address(user=user, fullname='Bench', street='1 Bench St', city='Bench', zipcode='000000', phone='0')
+            for user in users
+        ])
+        carts = Cart.objects.bulk_create([Cart(user=user) for user in users])
+        # reversed SKU order in every other cart: checkout must not care
+        CartItem.objects.bulk_create([
+            CartItem(cart=cart, product=product, quantity=quantity)
+            for index, cart in enumerate(carts)
+            for product in (products if index % 2 else products[::-1])
+        ])
+
+        try:
+            elapsed, outcomes, errors = self.run(users, addresses)
+            placed = outcomes[201]
+            self.stdout.write(
+                f"threads={threads} skus={skus} quantity={quantity} stock={stock} vendor={connection.vendor}\n"
+                f"{placed} order(s) placed, {outcomes[400]} rejected for stock, {sum(errors.values())} error(s) "
+                f"in {elapsed:.2f}s -> {placed / elapsed:.1f} orders/s"
+            )
+            for message, count in errors.most_common(5):
+                self.stdout.write(f"  {count} x {message}")
+
+            oversold = False
+            for product in Product.objects.filter(pk__in=[p.pk for p in products]).order_by('id'):
+                sold = OrderItem.objects.filter(product=product).aggregate(total=Sum('quantity'))['total'] or 0
+                ok = product.stock >= 0 and sold + product.stock == stock
+                oversold |= not ok
+                self.stdout.write(f"  {product.name}: sold={sold} left={product.stock} {'ok' if ok else 'OVERSOLD'}")
+            if oversold:
+                raise CommandError("Stock accounting is off: a SKU was oversold.")
+            self.stdout.write(self.style.SUCCESS("No SKU oversold."))
+        finally:
+            Order.objects.filter(user__in=users).delete()
+            Category.objects.filter(pk=category.pk).delete()
+            User.objects.filter(pk__in=[user.pk for user in users]).delete()
+
+    def run(self, users, addresses):
+        factory = APIRequestFactory()
+        view = CheckoutView.as_view()
+        outcomes, errors = Counter(), Counter()
+        lock = threading.Lock()
+        barrier = threading.Barrier(len(users))
+
+        def worker(user, address):
+            request = factory.post('/api/checkout/', {'address_id': address.id}, format='json')
+            force_authenticate(request, user=user)
+            barrier.wait()
+            try:
+                response = view(request)
+                with lock:
+                    if response.status_code in (201, 400):
+                        outcomes[response.status_code] += 1
+                    else:
+                        errors[f'HTTP {response.status_code}: {response.data}'] += 1
+            except Exception as e:
+                with lock:
+                    errors[f'{type(e).__name__}: {e}'] += 1
+            finally:
+                connection.close()
+
+        workers = [threading.Thread(target=worker, args=pair) for pair in zip(users, addresses)]
+        started = time.perf_counter()
+        for thread in workers:
+            thread.start()
+        for thread in workers:
+            thread.join()
+        return time.perf_counter() - started, outcomes, errors
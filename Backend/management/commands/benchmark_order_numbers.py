@@ -0,0 +1,72 @@
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, transaction
+
+from Backend.ordernumbers import RandomOrderNumberGenerator, SnowflakeOrderNumberGenerator
+
+TABLE = 'bench_order_numbers'
+
+
+class Command(BaseCommand):
+    help = (
+        "Compare order-number schemes: generation speed, insert throughput into a unique "
+        "index, index size and collisions. Uses a scratch table that is dropped afterwards."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--rows', type=int, default=200_000)
+        parser.add_argument('--batch-size', type=int, default=1000)
+
+    def handle(self, *args, rows, batch_size, **options):
+        if rows < 1 or batch_size < 1:
+            raise CommandError("--rows and --batch-size must be at least 1.")
+        self.stdout.write(f"rows={rows} batch_size={batch_size} database={connection.vendor}")
+        for label, generator in (
+            ('random (uuid4[:8])', RandomOrderNumberGenerator()),
+            ('snowflake', SnowflakeOrderNumberGenerator()),
+        ):
+            self.run(label, generator, rows, batch_size)
+
+    def run(self, label, generator, rows, batch_size):
+        start = time.perf_counter()
+        numbers = [generator() for _ in range(rows)]
+        generate = time.perf_counter() - start
+
+        # a real checkout would die on these with IntegrityError; count and drop them
+        unique = list(dict.fromkeys(numbers))
+        collisions = len(numbers) - len(unique)
+
+        with connection.cursor() as cursor:
+            cursor.execute(f"CREATE TABLE {TABLE} (id integer PRIMARY KEY, number varchar(20) NOT NULL)")
+            cursor.execute(f"CREATE UNIQUE INDEX {TABLE}_number ON {TABLE} (number)")
+            try:
+                start = time.perf_counter()
+                for offset in range(0, len(unique), batch_size):
+                    batch = unique[offset:offset + batch_size]
+                    with transaction.atomic():
+                        cursor.executemany(
+                            f"INSERT INTO {TABLE} (id, number) VALUES (%s, %s)",
+                            [(offset + i + 1, number) for i, number in enumerate(batch)],
+                        )
+                insert = time.perf_counter() - start
+                size = self.index_size(cursor)
+            finally:
+                cursor.execute(f"DROP TABLE {TABLE}")
+
+        self.stdout.write(
+            f"  {label:<20} generate {rows / generate:>10,.0f}/s  insert {len(unique) / insert:>9,.0f} rows/s  "
+            f"index {size}  collisions {collisions}  sorted {numbers == sorted(numbers)}"
+        )
+
+    def index_size(self, cursor):
+        if connection.vendor == 'postgresql':
+            cursor.execute("SELECT pg_relation_size(%s)", [f'{TABLE}_number'])
+        elif connection.vendor == 'sqlite':
+            try:
+                cursor.execute("SELECT SUM(pgsize) FROM dbstat WHERE name = %s", [f'{TABLE}_number'])
+            except Exception:
+                return 'n/a (no dbstat)'
+        else:
+            return 'n/a'
+        return f"{cursor.fetchone()[0] / 1024:,.0f} KiB"
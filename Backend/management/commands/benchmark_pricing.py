@@ -0,0 +1,118 @@
+import random
+import time
+from decimal import Decimal
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+from django.db.models import Q
+
+from Backend.models import Address, Cart, CartItem, Category, DiscountRule, Product, TaxRule, User
+from Backend.pricing import PricingEngine, price_cart
+
+STATES = ['Gujarat', 'Maharashtra', 'Karnataka', 'Delhi', 'Kerala', 'Punjab', 'Goa', 'Assam']
+
+
+class Command(BaseCommand):
+    help = (
+        "Time the compiled pricing engine on carts of --lines lines against looking rules up per line. "
+        "Everything runs inside a transaction that is rolled back."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--lines', type=int, default=100)
+        parser.add_argument('--carts', type=int, default=1000)
+        parser.add_argument('--categories', type=int, default=20)
+        parser.add_argument('--discount-rules', type=int, default=500)
+
+    def handle(self, *args, lines, carts, categories, discount_rules, **options):
+        if lines < 1 or carts < 1 or categories < 1:
+            raise CommandError("--lines, --carts and --categories must be at least 1.")
+        rng = random.Random(42)
+        with transaction.atomic():
+            cart, address = self.populate(rng, lines, categories, discount_rules)
+            items = list(cart.items.select_related('product'))
+            raw = [(item.product_id, item.product.category_id, item.product.discounted_price, item.quantity) for item in items]
+
+            start = time.perf_counter()
+            engine = PricingEngine.compile()
+            compile_ms = (time.perf_counter() - start) * 1000
+
+            start = time.perf_counter()
+            for _ in range(carts):
+                quote = engine.quote(raw, address)
+            quote_us = (time.perf_counter() - start) / carts * 1_000_000
+
+            start = time.perf_counter()
+            for _ in range(min(carts, 50)):
+                price_cart(Cart.with_totals().get(pk=cart.pk), address)
+            end_to_end_ms = (time.perf_counter() - start) / min(carts, 50) * 1000
+
+            naive_carts = min(carts, 10)
+            start = time.perf_counter()
+            for _ in range(naive_carts):
+                naive = self.naive_quote(raw, address)
+            naive_ms = (time.perf_counter() - start) / naive_carts * 1000
+            transaction.set_rollback(True)
+
+        self.stdout.write(
+            f"lines={lines} tax_rules={len(engine.tax)} discount_rules={sum(map(len, engine.discounts.values()))}"
+        )
+        self.stdout.write(f"compile                      {compile_ms:10.2f} ms (once per rule change)")
+        self.stdout.write(f"compiled quote               {quote_us:10.1f} us/cart  {quote_us / lines:6.2f} us/line")
+        self.stdout.write(f"load cart + compiled quote   {end_to_end_ms:10.2f} ms/cart")
+        self.stdout.write(f"rules queried per line       {naive_ms:10.2f} ms/cart")
+        if naive != quote.tax:
+            self.stderr.write(f"tax mismatch: compiled {quote.tax} vs per-line {naive}")
+
+    def populate(self, rng, lines, categories, discount_rules):
+        user = User.objects.create(email='bench-pricing@example.com')
+        address = Address.objects.create(user=user, fullname='bench', state='Gujarat', country='India')
+        cats = [
+            Category.objects.create(name=f'bench-pricing-{i}', slug=f'bench-pricing-{i}', description='bench')
+            for i in range(categories)
+        ]
+        products = Product.objects.bulk_create([
+            Product(
+                category=rng.choice(cats), name=f'bench pricing {i}', slug=f'bench-pricing-{i}', description='bench',
+                price=Decimal(rng.randint(100, 99999)) / 100, discount=rng.choice((0, 5, 10)), stock=100, status='active',
+            )
+            for i in range(lines)
+        ])
+        cart = Cart.objects.create(user=user)
+        CartItem.objects.bulk_create([CartItem(cart=cart, product=p, quantity=rng.randint(1, 5)) for p in products])
+
+        TaxRule.objects.bulk_create(
+            [TaxRule(name=state, rate=Decimal(rng.choice((5, 12, 18))) / 100, country='India', state=state) for state in STATES]
+            + [
+                TaxRule(name=f'{c.name} {state}', rate=Decimal(rng.choice((0, 5, 28))) / 100, category=c, country='India', state=state)
+                for c in cats for state in rng.sample(STATES, 3)
+            ]
+        )
+        DiscountRule.objects.bulk_create([
+            DiscountRule(
+                name=f'rule {i}', percent=Decimal(rng.randint(1, 30)), min_quantity=rng.randint(1, 4),
+                **rng.choice(({'product': rng.choice(products)}, {'category': rng.choice(cats)})),
+            )
+            for i in range(discount_rules)
+        ])
+        return cart, address
+
+    def naive_quote(self, raw, address):
+        """What pricing looks like without the compiled lookup: rules queried per line."""
+        tax = Decimal('0')
+        for product_id, category_id, base_price, quantity in raw:
+            percent = (
+                DiscountRule.objects.filter(is_active=True, min_quantity__lte=quantity)
+                .filter(Q(product_id=product_id) | Q(category_id=category_id) | Q(product__isnull=True, category__isnull=True))
+                .order_by('-percent').values_list('percent', flat=True).first()
+            ) or Decimal('0')
+            unit_price = (base_price * (100 - percent) / 100).quantize(Decimal('0.01')) if percent else base_price
+            rule = (
+                TaxRule.objects.filter(is_active=True, country__iexact=address.country, state__iexact=address.state)
+                .filter(Q(category_id=category_id) | Q(category__isnull=True))
+                .order_by('category_id').values_list('rate', 'category_id')
+            )
+            rates = dict((category, rate) for rate, category in rule)
+            rate = rates.get(category_id, rates.get(None, Decimal('0.10')))
+            tax += unit_price * quantity * rate
+        return tax.quantize(Decimal('0.01'))
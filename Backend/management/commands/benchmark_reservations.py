@@ -0,0 +1,109 @@
+import threading
+import time
+import uuid
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, transaction
+from django.db.models import Sum
+
+from Backend.models import Cart, CartItem, Category, Product, StockReservation, User
+from Backend.reservations import hold
+
+
+def add_with_row_lock(cart, product_id, quantity, work):
+    # the previous AddToCartView: product row locked for the whole transaction
+    with transaction.atomic():
+        product = Product.objects.select_for_update().get(pk=product_id)
+        item, _ = CartItem.objects.select_for_update().get_or_create(cart=cart, product_id=product_id, defaults={'quantity': 0})
+        time.sleep(work)
+        if item.quantity + quantity > product.stock:
+            return False
+        item.quantity += quantity
+        item.save()
+        return True
+
+
+def add_with_reservation(cart, product_id, quantity, work):
+    with transaction.atomic():
+        item, _ = CartItem.objects.select_for_update().get_or_create(cart=cart, product_id=product_id, defaults={'quantity': 0})
+        time.sleep(work)
+        item.quantity += quantity
+        item.save()
+        if not hold(cart, product_id, item.quantity):
+            transaction.set_rollback(True)
+            return False
+        return True
+
+
+class Command(BaseCommand):
+    help = (
+        "Concurrent add-to-cart throughput on one hot SKU: row lock vs. stock reservation. "
+        "Creates throwaway users/products and deletes them afterwards. "
+        "Meaningful on PostgreSQL; SQLite serializes every writer."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--threads', type=int, default=32)
+        parser.add_argument('--adds', type=int, default=20, help="Add-to-cart calls per thread.")
+        parser.add_argument('--stock', type=int, default=10_000)
+        parser.add_argument('--work-ms', type=float, default=2.0,
+                            help="Simulated request work done inside the transaction.")
+
+    def handle(self, *args, threads, adds, stock, work_ms, **options):
+        if threads < 1 or adds < 1:
+            raise CommandError("--threads and --adds must be at least 1.")
+        tag = uuid.uuid4().hex[:8]
+        category = Category.objects.create(name=f'bench-{tag}', slug=f'bench-{tag}', description='benchmark')
+        users = User.objects.bulk_create([
+            User(email=f'bench-{tag}-{index}@example.com') for index in range(threads)
+        ])
+        carts = Cart.objects.bulk_create([Cart(user=user) for user in users])
+        try:
+            self.stdout.write(f"threads={threads} adds/thread={adds} stock={stock} work={work_ms}ms vendor={connection.vendor}")
+            for label, add in (('row lock', add_with_row_lock), ('reservation', add_with_reservation)):
+                product = Product.objects.create(
+                    category=category, name=f'Hot SKU {tag} {label}', slug=f'bench-{tag}-{label.replace(" ", "-")}',
+                    description='benchmark', price=10, discount=0, stock=stock, status='active',
+                )
+                elapsed, done, failed = self.run(add, carts, product.id, adds, work_ms / 1000)
+                self.stdout.write(
+                    f"{label:<12} {done / elapsed:8.1f} adds/s  ({done} ok, {failed} rejected/errored, {elapsed:.2f}s)"
+                )
+            product.refresh_from_db()
+            held = StockReservation.objects.filter(product=product).aggregate(total=Sum('quantity'))['total'] or 0
+            self.stdout.write(f"reserved counter={product.reserved}, reservation rows={held}, stock={product.stock}")
+        finally:
+            StockReservation.objects.filter(cart__in=carts).delete()
+            Category.objects.filter(pk=category.pk).delete()
+            User.objects.filter(pk__in=[user.pk for user in users]).delete()
+
+    def run(self, add, carts, product_id, adds, work):
+        counts = {'done': 0, 'failed': 0}
+        lock = threading.Lock()
+        barrier = threading.Barrier(len(carts))
+
+        def worker(cart):
+            barrier.wait()
+            done = failed = 0
+            try:
+                for _ in range(adds):
+                    try:
+                        if add(cart, product_id, 1, work):
+                            done += 1
+                        else:
+                            failed += 1
+                    except Exception:
+                        failed += 1
+            finally:
+                connection.close()
+            with lock:
+                counts['done'] += done
+                counts['failed'] += failed
+
+        workers = [threading.Thread(target=worker, args=(cart,)) for cart in carts]
+        started = time.perf_counter()
+        for thread in workers:
+            thread.start()
+        for thread in workers:
+            thread.join()
+        return time.perf_counter() - started, counts['done'], counts['failed']
@@ -0,0 +1,97 @@
+import random
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+from rest_framework.filters import SearchFilter
+from rest_framework.request import Request
+from rest_framework.test import APIRequestFactory
+
+from Backend.models import Category, Product
+from Backend.search import FullTextSearchFilter, get_search_backend
+
+WORDS = (
+    'wireless bluetooth cotton leather steel wooden smart portable organic classic '
+    'premium compact ergonomic waterproof vintage digital solar ceramic silk bamboo'
+).split()
+NOUNS = (
+    'headphones shirt wallet bottle chair watch speaker lamp jacket mug '
+    'keyboard backpack sofa camera blender sneakers kettle desk pillow charger'
+).split()
+
+
+class _View:
+    search_fields = ['name', 'description', 'category__name']
+    search_backend = None
+
+
+class Command(BaseCommand):
+    help = (
+        "Compare the full-text search backend with DRF's SearchFilter on a synthetic catalog. "
+        "Everything runs inside a transaction that is rolled back."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--rows', type=int, default=1_000_000)
+        parser.add_argument('--queries', type=int, default=20)
+        parser.add_argument('--batch-size', type=int, default=10_000)
+
+    def handle(self, *args, rows, queries, batch_size, **options):
+        if queries < 1:
+            raise CommandError("--queries must be at least 1.")
+        rng = random.Random(42)
+        with transaction.atomic():
+            self.populate(rng, rows, batch_size)
+            terms = [f"{rng.choice(WORDS)} {rng.choice(NOUNS)}" for _ in range(queries)]
+
+            legacy = self.run(SearchFilter(), terms)
+            fulltext = self.run(FullTextSearchFilter(), terms)
+
+            self.stdout.write(f"rows={rows} queries={queries} backend={type(get_search_backend()).__name__}")
+            self.report('SearchFilter (ILIKE)', legacy)
+            self.report('FullTextSearchFilter', fulltext)
+            transaction.set_rollback(True)
+
+    def populate(self, rng, rows, batch_size):
+        categories = [
+            Category.objects.create(name=f'bench-{noun}', slug=f'bench-{noun}', description=noun)
+            for noun in NOUNS
+        ]
+        start = time.perf_counter()
+        for offset in range(0, rows, batch_size):
+            batch = []
+            for i in range(offset, min(offset + batch_size, rows)):
+                noun = rng.choice(NOUNS)
+                batch.append(Product(
+                    category=rng.choice(categories),
+                    name=f"{rng.choice(WORDS)} {noun} {i}",
+                    slug=f"bench-product-{i}",
+                    description=' '.join(rng.choices(WORDS + NOUNS, k=30)),
+                    price=rng.randint(1, 99999) / 100,
+                    discount=rng.choice((0, 5, 10, 25)),
+                    stock=rng.randint(0, 100),
+                    status='active',
+                ))
+            Product.objects.bulk_create(batch)
+        self.stdout.write(f"inserted {rows} rows in {time.perf_counter() - start:.1f}s")
+
+        start = time.perf_counter()
+        get_search_backend().index_products()
+        self.stdout.write(f"indexed in {time.perf_counter() - start:.1f}s")
+
+    def run(self, search_filter, terms):
+        factory = APIRequestFactory()
+        timings = []
+        for term in terms:
+            request = Request(factory.get('/api/products/', {'search': term}))
+            queryset = Product.objects.filter(status='active').select_related('category')
+            start = time.perf_counter()
+            # the first page is what the API actually serves
+            list(search_filter.filter_queryset(request, queryset, _View())[:10])
+            timings.append((time.perf_counter() - start) * 1000)
+        return sorted(timings)
+
+    def report(self, label, timings):
+        p50 = timings[len(timings) // 2]
+        p95 = timings[min(len(timings) - 1, int(len(timings) * 0.95))]
+        self.stdout.write(f"{label:<24} p50={p50:8.1f}ms  p95={p95:8.1f}ms  max={timings[-1]:8.1f}ms")
@@ -0,0 +1,20 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from Backend.recommendations import build_recommendations
+
+
+class Command(BaseCommand):
+    help = "Count co-purchases from orders placed since the last run and refresh top-K product recommendations."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--full', action='store_true', help="Recount every order and re-rank every product.")
+
+    def handle(self, *args, full, **options):
+        started = time.perf_counter()
+        run = build_recommendations(full=full)
+        self.stdout.write(self.style.SUCCESS(
+            f"Counted {run.orders} order(s) up to #{run.last_order_id}, "
+            f"refreshed {run.products} product(s) in {time.perf_counter() - started:.2f}s."
+        ))
@@ -0,0 +1,32 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from Backend.models import Order
+from Backend.orders import CHUNK_SIZE, cancel_orders
+
+
+class Command(BaseCommand):
+    help = "Cancel and restock orders in bulk, one transaction per chunk."
+
+    def add_arguments(self, parser):
+        parser.add_argument('order_ids', nargs='*', type=int, help="Orders to cancel.")
+        parser.add_argument('--status', help="Cancel every order with this status instead of listing ids.")
+        parser.add_argument('--chunk-size', type=int, default=CHUNK_SIZE, help="Orders per transaction.")
+        parser.add_argument('--no-notify', action='store_true', help="Don't email customers.")
+
+    def handle(self, *args, order_ids, status, chunk_size, no_notify, **options):
+        if bool(order_ids) == bool(status):
+            raise CommandError("Pass order ids or --status, not both.")
+        if chunk_size < 1:
+            raise CommandError("--chunk-size must be at least 1.")
+        if status:
+            order_ids = list(Order.objects.filter(status=status).values_list('id', flat=True))
+
+        def progress(done, total, cancelled):
+            self.stdout.write(f"  {done}/{total} processed, {cancelled} cancelled")
+
+        cancelled, skipped, restocked = cancel_orders(
+            order_ids, chunk_size=chunk_size, notify=not no_notify, progress=progress,
+        )
+        self.stdout.write(self.style.SUCCESS(
+            f"Cancelled {cancelled} order(s), skipped {skipped}, restocked {restocked} product row(s)."
+        ))
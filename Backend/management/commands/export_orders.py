@@ -0,0 +1,59 @@
+import sys
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+
+from Backend.catalog import FORMATS, guess_format
+from Backend.exports import buffered, gzipped, order_rows, render_orders
+from Backend.filters import OrderFilter
+from Backend.models import Order
+
+
+class Command(BaseCommand):
+    help = "Stream orders, one row per line item with customer and shipping address, to a CSV or JSONL file."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--output', '-o', default='-', help="File to write, or - for stdout. A .gz name compresses.")
+        parser.add_argument('--format', choices=FORMATS, help="Defaults to the file extension.")
+        parser.add_argument('--gzip', action='store_true', help="Compress even without a .gz file name.")
+        parser.add_argument('--status', choices=[value for value, _ in Order.STATUS_CHOICES])
+        parser.add_argument('--payment-status', choices=[value for value, _ in Order.PAYMENT_STATUS_CHOICES])
+        parser.add_argument('--since', help="Orders created at or after this date/time (ISO 8601).")
+        parser.add_argument('--until', help="Orders created before this date/time (ISO 8601).")
+        parser.add_argument('--chunk-size', type=int, default=2000)
+
+    def handle(self, *args, output, format, gzip, status, payment_status, since, until, chunk_size, **options):
+        fmt = format or guess_format(output)
+        compress = gzip or output.endswith('.gz')
+        filterset = OrderFilter({
+            'status': status, 'payment_status': payment_status, 'created_after': since, 'created_before': until,
+        }, queryset=Order.objects.all())
+        if not filterset.is_valid():
+            raise CommandError(filterset.errors.as_text())
+
+        lines = 0
+
+        def counted(rows):
+            nonlocal lines
+            for line in rows:
+                lines += 1
+                yield line
+
+        chunks = buffered(counted(render_orders(order_rows(filterset.qs, chunk_size), fmt)))
+        if compress:
+            chunks = gzipped(chunks)
+
+        started = time.perf_counter()
+        stream = sys.stdout.buffer if output == '-' else open(output, 'wb')
+        try:
+            for chunk in chunks:
+                stream.write(chunk)
+        finally:
+            if output == '-':
+                stream.flush()
+            else:
+                stream.close()
+
+        rows = lines - 1 if fmt == 'csv' else lines
+        elapsed = time.perf_counter() - started
+        self.stderr.write(f"Exported {rows} order lines in {elapsed:.1f}s ({rows / elapsed if elapsed else 0:,.0f} rows/s).")
@@ -0,0 +1,38 @@
+import sys
+import time
+
+from django.core.management.base import BaseCommand
+
+from Backend.catalog import FORMATS, export_rows, guess_format, render_rows
+from Backend.models import Product
+
+
+class Command(BaseCommand):
+    help = "Stream the product catalog to a CSV or JSONL file."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--output', '-o', default='-', help="File to write, or - for stdout.")
+        parser.add_argument('--format', choices=FORMATS, help="Defaults to the file extension.")
+        parser.add_argument('--status', choices=[value for value, _ in Product.STATUS_CHOICE])
+        parser.add_argument('--chunk-size', type=int, default=2000)
+
+    def handle(self, *args, output, format, status, chunk_size, **options):
+        fmt = format or guess_format(output)
+        queryset = Product.objects.all()
+        if status:
+            queryset = queryset.filter(status=status)
+
+        started = time.perf_counter()
+        count = 0
+        stream = sys.stdout if output == '-' else open(output, 'w', newline='', encoding='utf-8')
+        try:
+            for line in render_rows(export_rows(queryset, chunk_size), fmt):
+                stream.write(line)
+                count += 1
+        finally:
+            if stream is not sys.stdout:
+                stream.close()
+
+        rows = count - 1 if fmt == 'csv' else count
+        elapsed = time.perf_counter() - started
+        self.stderr.write(f"Exported {rows} rows in {elapsed:.1f}s ({rows / elapsed if elapsed else 0:,.0f} rows/s).")
@@ -0,0 +1,64 @@
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+from django.core.management.base import BaseCommand
+from django.db import connections
+
+from Backend.images import generate_variants
+from Backend.models import Category, OrderItem, Product, User
+
+IMAGE_FIELDS = [
+    (Product, 'image'),
+    (Category, 'image'),
+    (OrderItem, 'product_image'),
+    (User, 'profile_pic'),
+]
+
+
+def _process(names, force):
+    done, failed = 0, []
+    for name in names:
+        try:
+            generate_variants(name, force=force)
+            done += 1
+        except Exception as e:
+            failed.append((name, str(e)))
+    return done, failed
+
+
+class Command(BaseCommand):
+    help = "Generate thumb/card/detail WebP and JPEG variants for every stored image."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--workers', type=int, default=None, help="Processes to use (default: CPU count).")
+        parser.add_argument('--chunk-size', type=int, default=50)
+        parser.add_argument('--force', action='store_true', help="Regenerate variants that already exist.")
+
+    def handle(self, *args, workers, chunk_size, force, **options):
+        names = set()
+        for model, field in IMAGE_FIELDS:
+            names.update(
+                model.objects.exclude(**{field: ''}).exclude(**{f'{field}__isnull': True})
+                .values_list(field, flat=True).iterator()
+            )
+        names = sorted(names)
+        chunks = [names[i:i + chunk_size] for i in range(0, len(names), chunk_size)]
+
+        # children must not inherit open database connections
+        connections.close_all()
+
+        started = time.perf_counter()
+        processed, failures = 0, []
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            futures = [pool.submit(_process, chunk, force) for chunk in chunks]
+            for future in as_completed(futures):
+                done, failed = future.result()
+                processed += done
+                failures.extend(failed)
+                self.stdout.write(f"{processed + len(failures)}/{len(names)} images")
+
+        for name, error in failures:
+            self.stderr.write(f"{name}: {error}")
+        self.stdout.write(self.style.SUCCESS(
+            f"Processed {processed} image(s) in {time.perf_counter() - started:.1f}s, {len(failures)} failed."
+        ))
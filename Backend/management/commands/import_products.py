@@ -0,0 +1,42 @@
+import json
+import sys
+
+from django.core.management.base import BaseCommand, CommandError
+
+from Backend.catalog import FORMATS, ProductImporter, guess_format, read_rows
+
+
+class Command(BaseCommand):
+    help = "Stream a CSV or JSONL catalog file into Product, upserting on slug."
+
+    def add_arguments(self, parser):
+        parser.add_argument('path', help="File to import, or - for stdin.")
+        parser.add_argument('--format', choices=FORMATS, help="Defaults to the file extension.")
+        parser.add_argument('--batch-size', type=int, default=1000)
+        parser.add_argument('--max-errors', type=int, default=50, help="How many row errors to keep and print.")
+
+    def handle(self, *args, path, format, batch_size, max_errors, **options):
+        fmt = format or guess_format(path)
+
+        def progress(importer):
+            self.stdout.write(f"{importer.processed} rows, {importer.rate:,.0f} rows/s, {importer.error_count} errors")
+
+        importer = ProductImporter(batch_size=batch_size, on_progress=progress, max_errors=max_errors)
+        try:
+            if path == '-':
+                importer.run(read_rows(sys.stdin, fmt))
+            else:
+                with open(path, newline='', encoding='utf-8') as stream:
+                    importer.run(read_rows(stream, fmt))
+        except OSError as e:
+            raise CommandError(str(e))
+
+        for line_number, errors in importer.errors:
+            self.stderr.write(f"line {line_number}: {json.dumps(errors)}")
+        if importer.error_count > len(importer.errors):
+            self.stderr.write(f"... and {importer.error_count - len(importer.errors)} more")
+
+        self.stdout.write(self.style.SUCCESS(
+            f"Imported {importer.upserted} of {importer.processed} rows in {importer.elapsed:.1f}s "
+            f"({importer.rate:,.0f} rows/s), {importer.error_count} error(s)."
+        ))
@@ -0,0 +1,41 @@
+import time
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand, CommandError
+from django.utils import timezone
+from django.utils.dateparse import parse_date
+
+from Backend.rollups import rebuild_days, update_rollups
+
+
+class Command(BaseCommand):
+    help = (
+        "Refresh the daily sales rollups for orders created or changed since the last run. "
+        "Run it from cron; --full or --since/--until backfill."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--full', action='store_true', help="Drop the rollups and recompute every day.")
+        parser.add_argument('--since', help="Recompute days from this date (YYYY-MM-DD), leaving the watermark alone.")
+        parser.add_argument('--until', help="Last day for --since (default: today).")
+
+    def handle(self, *args, full, since, until, **options):
+        started = time.perf_counter()
+        if since:
+            if full:
+                raise CommandError("Pass --full or --since, not both.")
+            first, last = parse_date(since), parse_date(until) if until else None
+            if first is None or (until and last is None):
+                raise CommandError("Dates must look like YYYY-MM-DD.")
+            last = last or timezone.localdate()
+            days = [first + timedelta(days=n) for n in range((last - first).days + 1)]
+            self.stdout.write(self.style.SUCCESS(
+                f"Recomputed {rebuild_days(days) if days else 0} day(s) in {time.perf_counter() - started:.2f}s."
+            ))
+            return
+
+        run = update_rollups(full=full)
+        self.stdout.write(self.style.SUCCESS(
+            f"Rolled up {run.orders} changed order(s) over {run.days} day(s) up to {run.watermark:%Y-%m-%d %H:%M:%S}, "
+            f"in {time.perf_counter() - started:.2f}s."
+        ))
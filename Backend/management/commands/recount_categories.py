@@ -0,0 +1,16 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from Backend.cache import bump_version_on_commit
+from Backend.models import Category
+
+
+class Command(BaseCommand):
+    help = "Recompute Category.product_count / active_product_count and repair any drift."
+
+    @transaction.atomic
+    def handle(self, *args, **options):
+        repaired = Category.recount_products()
+        if repaired:
+            bump_version_on_commit('category')
+        self.stdout.write(self.style.SUCCESS(f"Repaired {repaired} category counter(s)."))
@@ -0,0 +1,29 @@
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from Backend.reservations import recount_reserved, release_expired
+
+
+class Command(BaseCommand):
+    help = "Hand expired cart stock reservations back to Product stock, in batches."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=500)
+        parser.add_argument('--loop', action='store_true', help="Keep sweeping every --interval seconds.")
+        parser.add_argument('--interval', type=float, default=30.0)
+        parser.add_argument('--recount', action='store_true',
+                            help="Also rebuild Product.reserved from the reservation rows.")
+
+    def handle(self, *args, batch_size, loop, interval, recount, **options):
+        while True:
+            released = release_expired(batch_size=batch_size)
+            self.stdout.write(f"Released {released} expired reservation(s).")
+            if recount:
+                with transaction.atomic():
+                    repaired = recount_reserved()
+                self.stdout.write(self.style.SUCCESS(f"Repaired {repaired} reserved counter(s)."))
+            if not loop:
+                return
+            time.sleep(interval)
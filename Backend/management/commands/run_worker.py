@@ -0,0 +1,62 @@
+import os
+import socket
+import time
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, ThreadPoolExecutor, wait
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connections
+
+from Backend.taskqueue import claim, execute, requeue_stale
+
+
+class Command(BaseCommand):
+    help = "Run queued background tasks (Backend.tasks) on a pool of threads or processes."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--concurrency', type=int, default=4, help="Tasks run at the same time.")
+        parser.add_argument('--pool', choices=['thread', 'process'], default='thread',
+                            help="Threads for I/O-bound tasks (mail, HTTP), processes for CPU-bound ones.")
+        parser.add_argument('--poll-interval', type=float, default=1.0, help="Seconds to sleep when the queue is empty.")
+        parser.add_argument('--once', action='store_true', help="Exit once no task is due instead of polling.")
+
+    def handle(self, *args, concurrency, pool, poll_interval, once, **options):
+        if concurrency < 1:
+            raise CommandError("--concurrency must be at least 1.")
+        worker = f"{socket.gethostname()}:{os.getpid()}"
+        if pool == 'process':
+            # children must not inherit open database connections
+            connections.close_all()
+            executor = ProcessPoolExecutor(max_workers=concurrency)
+        else:
+            executor = ThreadPoolExecutor(max_workers=concurrency, thread_name_prefix='task')
+
+        self.stdout.write(f"Worker {worker}: pool={pool} concurrency={concurrency}")
+        running, done = set(), 0
+        last_sweep = 0.0
+        try:
+            while True:
+                if time.monotonic() - last_sweep > 60:
+                    requeued = requeue_stale()
+                    if requeued:
+                        self.stdout.write(f"Requeued {requeued} stale task(s).")
+                    last_sweep = time.monotonic()
+
+                free = concurrency - len(running)
+                task_ids = claim(free, worker) if free else []
+                for task_id in task_ids:
+                    running.add(executor.submit(execute, task_id))
+
+                if running:
+                    finished, running = wait(running, timeout=poll_interval, return_when=FIRST_COMPLETED)
+                    for future in finished:
+                        future.result()
+                    done += len(finished)
+                elif once:
+                    break
+                else:
+                    time.sleep(poll_interval)
+        except KeyboardInterrupt:
+            self.stdout.write("Stopping; waiting for running tasks.")
+        finally:
+            executor.shutdown(wait=True)
+        self.stdout.write(self.style.SUCCESS(f"Ran {done} task(s)."))
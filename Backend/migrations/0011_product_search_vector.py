@@ -0,0 +1,64 @@
+# Generated by Django 5.2.1 on 2026-10-17 11:14
+
+import django.contrib.postgres.search
+from django.db import migrations
+
+
+POSTGRES_FORWARD = [
+    'CREATE INDEX "Backend_product_search_vector_gin" ON "Backend_product" USING gin ("search_vector")',
+    """
+    UPDATE "Backend_product" AS p SET search_vector =
+        setweight(to_tsvector('english', coalesce(p.name, '')), 'A') ||
+        setweight(to_tsvector('english', coalesce(c.name, '')), 'B') ||
+        setweight(to_tsvector('english', coalesce(p.description, '')), 'C')
+    FROM "Backend_category" AS c
+    WHERE c.id = p.category_id
+    """,
+]
+
+SQLITE_FORWARD = [
+    """
+    CREATE VIRTUAL TABLE IF NOT EXISTS Backend_product_fts
+    USING fts5(name, description, category_name, tokenize = 'porter unicode61')
+    """,
+    """
+    INSERT INTO Backend_product_fts (rowid, name, description, category_name)
+    SELECT p.id, p.name, p.description, c.name
+    FROM Backend_product AS p JOIN Backend_category AS c ON c.id = p.category_id
+    """,
+]
+
+BACKWARD = {
+    'postgresql': ['DROP INDEX IF EXISTS "Backend_product_search_vector_gin"'],
+    'sqlite': ['DROP TABLE IF EXISTS Backend_product_fts'],
+}
+
+
+def create_search_index(apps, schema_editor):
+    statements = {
+        'postgresql': POSTGRES_FORWARD,
+        'sqlite': SQLITE_FORWARD,
+    }.get(schema_editor.connection.vendor, [])
+    for sql in statements:
+        schema_editor.execute(sql)
+
+
+def drop_search_index(apps, schema_editor):
+    for sql in BACKWARD.get(schema_editor.connection.vendor, []):
+        schema_editor.execute(sql)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('Backend', '0010_alter_user_email'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='product',
+            name='search_vector',
+            field=django.contrib.postgres.search.SearchVectorField(editable=False, null=True),
+        ),
+        migrations.RunPython(create_search_index, drop_search_index),
+    ]
@@ -0,0 +1,43 @@
+# Generated by Django 5.2.1 on 2026-10-17 11:17
+
+from django.db import migrations, models
+from django.db.models import Count, Q
+
+
+def populate_counts(apps, schema_editor):
+    Category = apps.get_model('Backend', 'Category')
+    Product = apps.get_model('Backend', 'Product')
+    counts = (
+        Product.objects.order_by()
+        .values('category_id')
+        .annotate(total=Count('id'), active=Count('id', filter=Q(status='active')))
+    )
+    categories = []
+    for row in counts:
+        categories.append(Category(
+            pk=row['category_id'],
+            product_count=row['total'],
+            active_product_count=row['active'],
+        ))
+    Category.objects.bulk_update(categories, ['product_count', 'active_product_count'], batch_size=500)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('Backend', '0012_keyset_pagination_indexes'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='category',
+            name='active_product_count',
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+        migrations.AddField(
+            model_name='category',
+            name='product_count',
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+        migrations.RunPython(populate_counts, migrations.RunPython.noop),
+    ]
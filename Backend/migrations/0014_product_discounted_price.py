@@ -0,0 +1,25 @@
+# Generated by Django 5.2.1 on 2026-10-17 11:18
+
+import django.db.models.expressions
+import django.db.models.functions.math
+from decimal import Decimal
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('Backend', '0013_category_product_counts'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='product',
+            name='discounted_price',
+            field=models.GeneratedField(db_persist=True, expression=models.Case(models.When(discount__gt=0, then=django.db.models.functions.math.Round(django.db.models.expressions.CombinedExpression(django.db.models.expressions.CombinedExpression(models.F('price'), '*', django.db.models.expressions.CombinedExpression(models.Value(100), '-', models.F('discount'))), '*', models.Value(Decimal('0.01'))), 2)), default=models.F('price')), output_field=models.DecimalField(decimal_places=2, max_digits=7)),
+        ),
+        migrations.AddIndex(
+            model_name='product',
+            index=models.Index(fields=['status', 'discounted_price', 'id'], name='product_status_dprice_idx'),
+        ),
+    ]
@@ -0,0 +1,48 @@
+# Generated by Django 5.2.1 on 2026-10-17 11:36
+
+from django.db import migrations, models
+from django.db.models import Count, Sum
+
+CHUNK_SIZE = 2000
+
+
+def populate_counts(apps, schema_editor):
+    Order = apps.get_model('Backend', 'Order')
+    OrderItem = apps.get_model('Backend', 'OrderItem')
+    # walk order ids in chunks: one grouped query and one bulk update per chunk
+    last_id = 0
+    while True:
+        ids = list(Order.objects.filter(id__gt=last_id).order_by('id').values_list('id', flat=True)[:CHUNK_SIZE])
+        if not ids:
+            break
+        counts = (
+            OrderItem.objects.filter(order_id__in=ids).order_by()
+            .values('order_id').annotate(lines=Count('id'), quantity=Sum('quantity'))
+        )
+        Order.objects.bulk_update(
+            [Order(pk=row['order_id'], item_count=row['lines'], total_quantity=row['quantity']) for row in counts],
+            ['item_count', 'total_quantity'],
+            batch_size=500,
+        )
+        last_id = ids[-1]
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('Backend', '0018_tasks'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='order',
+            name='item_count',
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+        migrations.AddField(
+            model_name='order',
+            name='total_quantity',
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+        migrations.RunPython(populate_counts, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,21 @@
+from django.db import migrations
+
+# values written by older code that never matched Order.STATUS_CHOICES
+RENAMES = {'cancelled': 'canceled', 'confirmed': 'confirm'}
+
+
+def normalize(apps, schema_editor):
+    Order = apps.get_model('Backend', 'Order')
+    for old, new in RENAMES.items():
+        Order.objects.filter(status=old).update(status=new)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('Backend', '0019_order_item_counts'),
+    ]
+
+    operations = [
+        migrations.RunPython(normalize, migrations.RunPython.noop),
+    ]
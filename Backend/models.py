@@ -1,9 +1,14 @@
 from django.core.exceptions import ValidationError
 from datetime import date
 from django.contrib.auth.models import AbstractUser
+from django.contrib.postgres.search import SearchVectorField
 from django.db import models
+from django.db.models import Case, ExpressionWrapper, F, Value, When
+from django.db.models.functions import Coalesce, Greatest, Now, Round
+from decimal import Decimal
+from django.utils import timezone
 from django.utils.text import slugify
-import uuid
+from .ordernumbers import next_order_number
 
 class Gender(models.TextChoices):
     MALE = "M", "Male"
@@ -51,6 +56,13 @@ class User(AbstractUser):
     
     class Meta:
         ordering = ['-date_joined']
+
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        # remember the stored avatar so variants are only queued when it changes
+        instance._loaded_state = {'profile_pic': dict(zip(field_names, values)).get('profile_pic')}
+        return instance
       
     @property
     def fullname(self):
@@ -64,12 +76,22 @@ class Category(models.Model):
     slug = models.SlugField(max_length=100, unique=True, blank=True)
     description = models.TextField()
     image = models.ImageField(upload_to='category/', null=True, blank=True)
+    # maintained by Backend.signals, repaired by `manage.py recount_categories`
+    product_count = models.PositiveIntegerField(default=0, editable=False)
+    active_product_count = models.PositiveIntegerField(default=0, editable=False)
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
     
     class Meta:
         verbose_name_plural = "Categories"
         ordering = ['name']
+
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        # remember the stored image so variants are only queued when it changes
+        instance._loaded_state = {'image': dict(zip(field_names, values)).get('image')}
+        return instance
         
     def __str__(self):
         return self.name
@@ -78,6 +100,37 @@ class Category(models.Model):
         if not self.slug:
             self.slug = slugify(self.name)
         super().save(*args, **kwargs)
+
+    @classmethod
+    def recount_products(cls):
+        """Rebuild both counters from one grouped query; returns rows repaired."""
+        counts = {
+            row['category_id']: (row['total'], row['active'])
+            for row in Product.objects.order_by().values('category_id').annotate(
+                total=models.Count('id'),
+                active=models.Count('id', filter=models.Q(status='active')),
+            )
+        }
+        drifted = []
+        for category in cls.objects.select_for_update().only('id', 'product_count', 'active_product_count'):
+            total, active = counts.get(category.id, (0, 0))
+            if (category.product_count, category.active_product_count) != (total, active):
+                category.product_count, category.active_product_count = total, active
+                drifted.append(category)
+        for category in drifted:
+            category.updated_at = timezone.now()
+        cls.objects.bulk_update(drifted, ['product_count', 'active_product_count', 'updated_at'], batch_size=500)
+        return len(drifted)
+
+    @classmethod
+    def adjust_counts(cls, category_id, products=0, active=0):
+        if products or active:
+            # clamp at zero: a drifted counter must never make a delete fail
+            cls.objects.filter(pk=category_id).update(
+                product_count=Greatest(F('product_count') + products, 0),
+                active_product_count=Greatest(F('active_product_count') + active, 0),
+                updated_at=Now(),
+            )
         
         
 class Product(models.Model):
@@ -93,29 +146,71 @@ class Product(models.Model):
     description = models.TextField()
     price = models.DecimalField(decimal_places=2, max_digits=7)
     discount = models.DecimalField(decimal_places=2, max_digits=7)
+    # what the customer pays; computed by the database so it can be indexed,
+    # sorted and range-filtered, and stays right through bulk updates
+    discounted_price = models.GeneratedField(
+        expression=Case(
+            When(discount__gt=0, then=Round(F('price') * (Value(100) - F('discount')) * Value(Decimal('0.01')), 2)),
+            default=F('price'),
+        ),
+        output_field=models.DecimalField(decimal_places=2, max_digits=7),
+        db_persist=True,
+    )
     stock = models.PositiveIntegerField(default=0)
+    # units held by unexpired cart reservations (Backend.reservations);
+    # available to a new shopper = stock - reserved
+    reserved = models.PositiveIntegerField(default=0, editable=False)
     image = models.ImageField(upload_to='product/', blank=True)
     status = models.CharField(choices=STATUS_CHOICE, default='draft')
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
+    # filled by Backend.search on PostgreSQL, unused elsewhere
+    search_vector = SearchVectorField(null=True, editable=False)
     
     class Meta:
         ordering = ['-created_at']
+        # keyset pagination seeks on these (see Backend.pagination)
+        indexes = [
+            models.Index(fields=['status', '-created_at', '-id'], name='product_status_created_idx'),
+            models.Index(fields=['status', 'price', 'id'], name='product_status_price_idx'),
+            models.Index(fields=['status', 'discounted_price', 'id'], name='product_status_dprice_idx'),
+        ]
         
     def __str__(self):
         return self.name
     
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        # remember what was loaded so category counters and image variants
+        # only move when those fields change
+        loaded = dict(zip(field_names, values))
+        instance._loaded_state = {
+            'category_id': loaded.get('category_id'),
+            'status': loaded.get('status'),
+            'image': loaded.get('image'),
+        }
+        return instance
+
     def save(self,*args, **kwargs):
         if not self.slug:
             self.slug = slugify(self.name)
+        if not self._state.adding and kwargs.get('update_fields') is None:
+            # `reserved` only moves through F() updates; never write back a stale copy
+            kwargs['update_fields'] = [
+                field.name for field in self._meta.concrete_fields
+                if not field.primary_key and not field.generated and field.name != 'reserved'
+            ]
         super().save(*args, **kwargs)
+        # the database computes discounted_price; reload it so responses built from this instance aren't stale
+        update_fields = kwargs.get('update_fields')
+        if update_fields is None or {'price', 'discount'} & set(update_fields):
+            self.refresh_from_db(fields=['discounted_price'])
         
     @property
-    def discounted_price(self):
-        if self.discount > 0:
-            return round(self.price * (1 - self.discount/100), 2)
-        return self.price
-    
+    def available_stock(self):
+        return max(self.stock - self.reserved, 0)
+
     @property
     def is_in_stock(self):
         return self.stock > 0 and self.status == 'active'
@@ -129,13 +224,47 @@ class Cart(models.Model):
     def __str__(self):
         return f"Cart of: {self.user.email}"
     
+    @classmethod
+    def with_totals(cls):
+        """
+        Carts with both totals summed in SQL and their items prefetched with the
+        product joined and unit/line prices annotated: two queries, whatever
+        the number of items.
+        """
+        line_total = ExpressionWrapper(
+            F('product__discounted_price') * F('quantity'),
+            output_field=models.DecimalField(max_digits=10, decimal_places=2),
+        )
+        items = CartItem.objects.select_related('product').defer('product__search_vector').annotate(
+            unit_price=F('product__discounted_price'),
+            line_total=line_total,
+        ).order_by('id')
+        return cls.objects.annotate(
+            item_quantity=Coalesce(models.Sum('items__quantity'), 0),
+            price_total=Coalesce(
+                models.Sum(F('items__product__discounted_price') * F('items__quantity')),
+                Value(Decimal('0')),
+                output_field=models.DecimalField(max_digits=10, decimal_places=2),
+            ),
+        ).prefetch_related(models.Prefetch('items', queryset=items))
+
+    # annotated by with_totals(); otherwise one aggregate query
+
     @property
     def total_items(self):
-        return sum(item.quantity for item in self.items.all())
+        if hasattr(self, 'item_quantity'):
+            return self.item_quantity
+        return self.items.aggregate(total=Coalesce(models.Sum('quantity'), 0))['total']
     
     @property
     def total_price(self):
-        return sum(item.item_total for item in self.items.all())
+        if hasattr(self, 'price_total'):
+            return self.price_total
+        return self.items.aggregate(total=Coalesce(
+            models.Sum(F('product__discounted_price') * F('quantity')),
+            Value(Decimal('0')),
+            output_field=models.DecimalField(max_digits=10, decimal_places=2),
+        ))['total']
 
 
 class CartItem(models.Model):
@@ -154,6 +283,26 @@ class CartItem(models.Model):
     class Meta:
         unique_together = ['cart', 'product']
 
+class StockReservation(models.Model):
+    """
+    Units of one product held for one cart until `expires_at`.
+    Mirrored in Product.reserved; see Backend.reservations.
+    """
+    cart = models.ForeignKey(Cart, on_delete=models.CASCADE, related_name='reservations')
+    product = models.ForeignKey(Product, on_delete=models.CASCADE, related_name='reservations')
+    quantity = models.PositiveIntegerField()
+    expires_at = models.DateTimeField(db_index=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['cart', 'product'], name='unique_cart_reservation'),
+        ]
+
+    def __str__(self):
+        return f"{self.quantity} X {self.product_id} for cart {self.cart_id}"
+
+
 class Address(models.Model):
     user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='address')
     fullname = models.CharField(max_length=100, blank=True)
@@ -207,19 +356,28 @@ class Order(models.Model):
     subtotal = models.DecimalField(decimal_places=2, max_digits=7)
     tax = models.DecimalField(decimal_places=2, max_digits=7)
     total = models.DecimalField(decimal_places=2, max_digits=7)
+    # set at checkout so order lists never touch OrderItem
+    item_count = models.PositiveIntegerField(default=0, editable=False)
+    total_quantity = models.PositiveIntegerField(default=0, editable=False)
     notes = models.TextField(blank=True)
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
     
     class Meta:
         ordering = ['-created_at']
+        indexes = [
+            models.Index(fields=['user', '-created_at', '-id'], name='order_user_created_idx'),
+            # day ranges and the "changed since" scan of the sales rollups
+            models.Index(fields=['created_at'], name='order_created_idx'),
+            models.Index(fields=['updated_at'], name='order_updated_idx'),
+        ]
         
     def __str__(self):
         return f"Order {self.order_number} - {self.user.email}"
     
     def save(self, *args, **kwargs):
         if not self.order_number:
-            self.order_number = 'ORD-' + uuid.uuid4().hex[:8]
+            self.order_number = next_order_number()
         super().save(*args, **kwargs)
     
 
@@ -241,3 +399,245 @@ class OrderItem(models.Model):
     def item_total(self):
         return self.quantity * self.unit_price
     
+
+# Recommendations
+# Filled by Backend.recommendations (`manage.py build_recommendations`),
+# never written on the request path.
+
+class ProductPairCount(models.Model):
+    """How many orders contained both products; stored in both directions."""
+    product = models.ForeignKey(Product, on_delete=models.CASCADE, related_name='+')
+    other = models.ForeignKey(Product, on_delete=models.CASCADE, related_name='+')
+    orders = models.PositiveIntegerField(default=0)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['product', 'other'], name='unique_product_pair'),
+        ]
+
+
+class ProductRecommendation(models.Model):
+    KIND_CHOICES = [
+        ('bought_together', 'Frequently bought together'),
+        ('related', 'Related'),
+    ]
+
+    product = models.ForeignKey(Product, on_delete=models.CASCADE, related_name='recommendations')
+    recommended = models.ForeignKey(Product, on_delete=models.CASCADE, related_name='+')
+    kind = models.CharField(choices=KIND_CHOICES, max_length=20)
+    score = models.FloatField(default=0)
+    rank = models.PositiveSmallIntegerField()
+
+    class Meta:
+        ordering = ['product', 'rank']
+        constraints = [
+            models.UniqueConstraint(fields=['product', 'rank'], name='unique_recommendation_rank'),
+        ]
+
+    def __str__(self):
+        return f"{self.product_id} -> {self.recommended_id} ({self.kind})"
+
+
+class RecommendationRun(models.Model):
+    # orders up to and including last_order_id have been counted
+    last_order_id = models.PositiveBigIntegerField(default=0)
+    orders = models.PositiveIntegerField(default=0)
+    products = models.PositiveIntegerField(default=0)
+    full = models.BooleanField(default=False)
+    started_at = models.DateTimeField(auto_now_add=True)
+    finished_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        ordering = ['-id']
+
+    def __str__(self):
+        return f"Run {self.pk} up to order {self.last_order_id}"
+
+
+class IdempotencyKey(models.Model):
+    """
+    The stored outcome of one non-idempotent POST, replayed to retries that
+    send the same Idempotency-Key. See Backend.idempotency.
+    """
+    # 'user:<pk>', or 'anon:<client address>' for endpoints such as registration
+    owner = models.CharField(max_length=64)
+    key = models.CharField(max_length=255)
+    # method + path + body digest; a key reused for another request is refused
+    fingerprint = models.CharField(max_length=64)
+    # null while the first request is still running
+    response_status = models.PositiveSmallIntegerField(null=True, blank=True)
+    response_body = models.JSONField(null=True, blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    locked_at = models.DateTimeField()
+    expires_at = models.DateTimeField(db_index=True)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['owner', 'key'], name='unique_idempotency_key'),
+        ]
+
+    def __str__(self):
+        return f"{self.owner} {self.key}"
+
+
+# Background tasks
+# Rows are written by Backend.taskqueue.enqueue and run by `manage.py run_worker`.
+
+class Task(models.Model):
+    STATUS_CHOICES = [
+        ('queued', 'Queued'),
+        ('running', 'Running'),
+        ('done', 'Done'),
+        ('failed', 'Failed'),
+    ]
+
+    name = models.CharField(max_length=100)
+    kwargs = models.JSONField(default=dict, blank=True)
+    status = models.CharField(choices=STATUS_CHOICES, default='queued', max_length=10)
+    attempts = models.PositiveSmallIntegerField(default=0)
+    max_attempts = models.PositiveSmallIntegerField(default=5)
+    # not picked up before this; moved forward by retry backoff
+    run_at = models.DateTimeField(default=timezone.now)
+    locked_by = models.CharField(max_length=100, blank=True)
+    locked_at = models.DateTimeField(null=True, blank=True)
+    last_error = models.TextField(blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    started_at = models.DateTimeField(null=True, blank=True)
+    finished_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        ordering = ['-id']
+        indexes = [
+            models.Index(fields=['status', 'run_at', 'id'], name='task_status_run_at_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.name} #{self.pk} ({self.status})"
+
+
+# Sales rollups
+# One row per day (and product / category), filled by Backend.rollups
+# (`manage.py rebuild_rollups`) and read by the admin analytics endpoints.
+# Days follow TIME_ZONE; canceled orders are counted apart, never in sales.
+
+class SalesRollup(models.Model):
+    date = models.DateField()
+    orders = models.PositiveIntegerField(default=0)
+    units = models.PositiveIntegerField(default=0)
+    gross = models.DecimalField(decimal_places=2, max_digits=14, default=0)
+    tax = models.DecimalField(decimal_places=2, max_digits=14, default=0)
+    canceled_orders = models.PositiveIntegerField(default=0)
+    canceled_units = models.PositiveIntegerField(default=0)
+    canceled_gross = models.DecimalField(decimal_places=2, max_digits=14, default=0)
+
+    class Meta:
+        abstract = True
+        ordering = ['date']
+
+
+class DailySales(SalesRollup):
+    class Meta(SalesRollup.Meta):
+        constraints = [
+            models.UniqueConstraint(fields=['date'], name='unique_daily_sales'),
+        ]
+
+
+class DailyCategorySales(SalesRollup):
+    category = models.ForeignKey(Category, on_delete=models.CASCADE, related_name='daily_sales')
+
+    class Meta(SalesRollup.Meta):
+        constraints = [
+            models.UniqueConstraint(fields=['category', 'date'], name='unique_daily_category_sales'),
+        ]
+        indexes = [
+            models.Index(fields=['date'], name='daily_category_sales_date_idx'),
+        ]
+
+
+class DailyProductSales(SalesRollup):
+    product = models.ForeignKey(Product, on_delete=models.CASCADE, related_name='daily_sales')
+
+    class Meta(SalesRollup.Meta):
+        constraints = [
+            models.UniqueConstraint(fields=['product', 'date'], name='unique_daily_product_sales'),
+        ]
+        indexes = [
+            models.Index(fields=['date'], name='daily_product_sales_date_idx'),
+        ]
+
+
+class RollupRun(models.Model):
+    # orders last updated up to and including this moment are in the rollups
+    watermark = models.DateTimeField(null=True, blank=True)
+    orders = models.PositiveIntegerField(default=0)
+    days = models.PositiveIntegerField(default=0)
+    full = models.BooleanField(default=False)
+    started_at = models.DateTimeField(auto_now_add=True)
+    finished_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        ordering = ['-id']
+
+    def __str__(self):
+        return f"Rollup run {self.pk} up to {self.watermark}"
+
+
+# Pricing rules
+# Compiled into an in-memory lookup by Backend.pricing; saving or deleting a
+# rule bumps the 'pricing' cache version and every process recompiles.
+
+class TaxRule(models.Model):
+    name = models.CharField(max_length=100)
+    # 0.1800 is 18%
+    rate = models.DecimalField(max_digits=5, decimal_places=4)
+    # blank scope fields match anything; the most specific active rule wins
+    category = models.ForeignKey(Category, on_delete=models.CASCADE, null=True, blank=True, related_name='tax_rules')
+    country = models.CharField(max_length=20, blank=True)
+    state = models.CharField(max_length=15, blank=True)
+    is_active = models.BooleanField(default=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        ordering = ['id']
+
+    def __str__(self):
+        return f"{self.name} ({(self.rate * 100).normalize():f}%)"
+
+    def clean(self):
+        if not Decimal('0') <= self.rate < Decimal('1'):
+            raise ValidationError({'rate': 'Use a fraction, e.g. 0.18 for 18%.'})
+        clash = TaxRule.objects.filter(
+            is_active=True, category=self.category, country__iexact=self.country, state__iexact=self.state,
+        ).exclude(pk=self.pk)
+        if self.is_active and clash.exists():
+            raise ValidationError('An active tax rule already covers this category and region.')
+
+
+class DiscountRule(models.Model):
+    name = models.CharField(max_length=100)
+    # taken off the product's discounted price; the best matching rule applies, rules never stack
+    percent = models.DecimalField(max_digits=5, decimal_places=2)
+    # neither set: store-wide
+    product = models.ForeignKey(Product, on_delete=models.CASCADE, null=True, blank=True, related_name='discount_rules')
+    category = models.ForeignKey(Category, on_delete=models.CASCADE, null=True, blank=True, related_name='discount_rules')
+    min_quantity = models.PositiveIntegerField(default=1)
+    starts_at = models.DateTimeField(null=True, blank=True)
+    ends_at = models.DateTimeField(null=True, blank=True)
+    is_active = models.BooleanField(default=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        ordering = ['id']
+
+    def __str__(self):
+        return f"{self.name} (-{self.percent}%)"
+
+    def clean(self):
+        if not Decimal('0') < self.percent <= Decimal('100'):
+            raise ValidationError({'percent': 'Must be above 0 and at most 100.'})
+        if self.product_id and self.category_id:
+            raise ValidationError('Scope a discount to a product or a category, not both.')
+        if self.starts_at and self.ends_at and self.starts_at >= self.ends_at:
+            raise ValidationError({'ends_at': 'Must be after starts_at.'})
@@ -0,0 +1,126 @@
+import os
+import threading
+import time
+import uuid
+
+from django.conf import settings
+from django.core.checks import Error, register
+from django.utils.module_loading import import_string
+
+# Crockford base32: no I, L, O, U, and ASCII order matches numeric order
+ALPHABET = '0123456789ABCDEFGHJKMNPQRSTVWXYZ'
+PREFIX = 'ORD-'
+
+
+def encode(value, length):
+    chars = []
+    for _ in range(length):
+        value, digit = divmod(value, 32)
+        chars.append(ALPHABET[digit])
+    return ''.join(reversed(chars))
+
+
+class SnowflakeOrderNumberGenerator:
+    """
+    80-bit ids: 42 bits of milliseconds since EPOCH_MS, 26 bits of worker id
+    and a 12-bit per-millisecond sequence, written as 16 Crockford base32
+    characters after "ORD-" (20 chars, the column's max_length).
+
+    The worker id is ORDER_NUMBER_NODE_ID (0-15, distinct per host; unset
+    means 0) over the process id. Live pids on a host are distinct and below 2**22, so two
+    processes never share a worker id and no number is ever handed out
+    twice: no retry on IntegrityError is needed. Numbers only grow within a
+    process. If the clock steps back, or the sequence runs out within a
+    millisecond, the generator keeps counting from the last millisecond it
+    used instead of sleeping.
+    """
+    EPOCH_MS = 1704067200000  # 2024-01-01T00:00:00Z
+    TIME_BITS, WORKER_BITS, SEQUENCE_BITS = 42, 26, 12
+    PID_BITS = 22
+    LENGTH = 16
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.pid = None
+
+    MAX_NODE_ID = (1 << (WORKER_BITS - PID_BITS)) - 1
+
+    def _reset(self):
+        node = getattr(settings, 'ORDER_NUMBER_NODE_ID', None) or 0
+        if not 0 <= node <= self.MAX_NODE_ID:
+            raise ValueError(f"ORDER_NUMBER_NODE_ID must be between 0 and {self.MAX_NODE_ID}.")
+        self.pid = os.getpid()
+        self.worker = node << self.PID_BITS | self.pid & ((1 << self.PID_BITS) - 1)
+        self.last_ms = -1
+        self.sequence = 0
+
+    def __call__(self):
+        with self.lock:
+            # a forked child must not continue its parent's sequence
+            if self.pid != os.getpid():
+                self._reset()
+            now = time.time_ns() // 1_000_000 - self.EPOCH_MS
+            if now > self.last_ms:
+                self.last_ms, self.sequence = now, 0
+            else:
+                self.sequence += 1
+                if self.sequence >> self.SEQUENCE_BITS:
+                    self.last_ms, self.sequence = self.last_ms + 1, 0
+            value = (
+                self.last_ms << (self.WORKER_BITS + self.SEQUENCE_BITS)
+                | self.worker << self.SEQUENCE_BITS
+                | self.sequence
+            )
+        return PREFIX + encode(value, self.LENGTH)
+
+
+class RandomOrderNumberGenerator:
+    """The original scheme: 32 random bits. Kept for comparison."""
+
+    def __call__(self):
+        return PREFIX + uuid.uuid4().hex[:8]
+
+
+def _snowflake_in_use():
+    path = getattr(settings, 'ORDER_NUMBER_GENERATOR', None)
+    return not path or import_string(path) is SnowflakeOrderNumberGenerator
+
+
+@register()
+def check_node_id_range(app_configs, **kwargs):
+    node = getattr(settings, 'ORDER_NUMBER_NODE_ID', None)
+    limit = SnowflakeOrderNumberGenerator.MAX_NODE_ID
+    if _snowflake_in_use() and node is not None and not 0 <= node <= limit:
+        return [Error(f"ORDER_NUMBER_NODE_ID must be between 0 and {limit}.", id='Backend.E001')]
+    return []
+
+
+@register(deploy=True)
+def check_node_id_configured(app_configs, **kwargs):
+    """
+    `manage.py check --deploy`: every host falls back to node 0 when
+    ORDER_NUMBER_NODE_ID is unset, and two hosts on the same node id hand
+    out the same numbers whenever their pids coincide.
+    """
+    if _snowflake_in_use() and getattr(settings, 'ORDER_NUMBER_NODE_ID', None) is None:
+        return [Error(
+            "ORDER_NUMBER_NODE_ID is not set; every host uses node 0.",
+            hint=f"Give each host its own node id, 0-{SnowflakeOrderNumberGenerator.MAX_NODE_ID}.",
+            id='Backend.E002',
+        )]
+    return []
+
+
+_generator = None
+
+
+def get_order_number_generator():
+    global _generator
+    if _generator is None:
+        path = getattr(settings, 'ORDER_NUMBER_GENERATOR', None)
+        _generator = import_string(path)() if path else SnowflakeOrderNumberGenerator()
+    return _generator
+
+
+def next_order_number():
+    return get_order_number_generator()()
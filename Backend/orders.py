@@ -0,0 +1,137 @@
+import logging
+
+from django.db import transaction
+from django.db.models import F, OuterRef, Subquery, Sum
+from django.db.models.functions import Now
+
+from .cache import bump_version_on_commit
+from .models import Order, OrderItem, Product
+from .taskqueue import enqueue
+
+logger = logging.getLogger(__name__)
+
+CHUNK_SIZE = 500
+
+# Order status state machine: status -> statuses it may move to. Every status
+# change (single, bulk, cancel) is checked against this one table. Cancelling
+# restocks, so it stops at 'shipped': those units have left the warehouse.
+TRANSITIONS = {
+    'pending': ('confirm', 'canceled'),
+    'confirm': ('shipped', 'canceled'),
+    'shipped': ('delivered',),
+    'delivered': (),
+    'canceled': (),
+}
+
+
+def allowed_from(target):
+    """The statuses an order may be in to move to `target`."""
+    return tuple(source for source, targets in TRANSITIONS.items() if target in targets)
+
+
+def can_transition(current, target):
+    return target in TRANSITIONS.get(current, ())
+
+
+def restore_stock(order_ids):
+    """
+    Puts the units of these orders back on the shelf; returns products touched.
+
+    Quantities are summed per product across all the orders, so a product
+    that appears in 300 of them gets one += of the total. The product rows
+    are locked in id order first (the order checkout uses) and then written
+    by a single UPDATE whose per-row delta is a correlated SUM.
+    """
+    items = OrderItem.objects.filter(order_id__in=order_ids, product__isnull=False)
+    product_ids = list(
+        Product.objects.select_for_update()
+        .filter(id__in=items.values('product_id'))
+        .order_by('id')
+        .values_list('id', flat=True)
+    )
+    if not product_ids:
+        return 0
+    delta = (
+        items.filter(product_id=OuterRef('pk'))
+        .order_by()
+        .values('product_id')
+        .annotate(total=Sum('quantity'))
+        .values('total')
+    )
+    updated = Product.objects.filter(id__in=product_ids).update(stock=F('stock') + Subquery(delta), updated_at=Now())
+    bump_version_on_commit('product', 'stock')
+    return updated
+
+
+def cancel_orders(order_ids, chunk_size=CHUNK_SIZE, notify=True, progress=None):
+    """
+    Cancels and refunds the given orders, restocking their items, one
+    transaction per chunk of `chunk_size` orders so a long sweep never holds
+    thousands of locks at once. Orders that may not move to 'canceled'
+    are skipped. `progress(done, total, cancelled)` is called
+    after every chunk. Returns (cancelled, skipped, product rows updated).
+    """
+    order_ids = sorted(set(order_ids))
+    cancelled = restocked = 0
+    for start in range(0, len(order_ids), chunk_size):
+        chunk = order_ids[start:start + chunk_size]
+        with transaction.atomic():
+            ids = list(
+                Order.objects.select_for_update()
+                .filter(id__in=chunk, status__in=allowed_from('canceled'))
+                .order_by('id')
+                .values_list('id', flat=True)
+            )
+            if ids:
+                restocked += restore_stock(ids)
+                Order.objects.filter(id__in=ids).update(
+                    status='canceled', payment_status='refunded', updated_at=Now(),
+                )
+                if notify:
+                    for order_id in ids:
+                        enqueue('send_order_cancellation', order_id=order_id)
+        cancelled += len(ids)
+        done = start + len(chunk)
+        logger.info("Bulk cancel: %d/%d orders processed, %d cancelled", done, len(order_ids), cancelled)
+        if progress:
+            progress(done, len(order_ids), cancelled)
+    return cancelled, len(order_ids) - cancelled, restocked
+
+
+def transition_orders(order_ids, target, chunk_size=CHUNK_SIZE, notify=True, progress=None):
+    """
+    Moves orders to `target` with one conditional UPDATE per chunk
+    (... WHERE id IN chunk AND status IN allowed_from(target)), so an order
+    that has moved on in the meantime is simply not matched. With `notify`
+    the chunk's orders are locked and read first, so each one that moved
+    gets its status email. Cancelling goes through cancel_orders() to
+    restock. Returns (applied, rejected); ids that don't exist count as
+    rejected.
+    """
+    if target == 'canceled':
+        applied, rejected, _ = cancel_orders(order_ids, chunk_size=chunk_size, notify=notify, progress=progress)
+        return applied, rejected
+
+    order_ids = sorted(set(order_ids))
+    sources = allowed_from(target)
+    applied = 0
+    for start in range(0, len(order_ids), chunk_size):
+        chunk = order_ids[start:start + chunk_size]
+        if notify:
+            with transaction.atomic():
+                ids = list(
+                    Order.objects.select_for_update()
+                    .filter(id__in=chunk, status__in=sources)
+                    .order_by('id')
+                    .values_list('id', flat=True)
+                )
+                applied += Order.objects.filter(id__in=ids).update(status=target, updated_at=Now())
+                for order_id in ids:
+                    enqueue('send_order_status_update', order_id=order_id)
+        else:
+            applied += Order.objects.filter(id__in=chunk, status__in=sources).update(status=target, updated_at=Now())
+        done = start + len(chunk)
+        logger.info("Bulk %s: %d/%d orders processed, %d applied", target, done, len(order_ids), applied)
+        if progress:
+            progress(done, len(order_ids), applied)
+    return applied, len(order_ids) - applied
@@ -0,0 +1,161 @@
+import base64
+import binascii
+import json
+from datetime import datetime
+from decimal import Decimal
+
+from django.db.models import Q
+from rest_framework.exceptions import ValidationError
+from rest_framework.pagination import BasePagination, PageNumberPagination
+from rest_framework.response import Response
+from rest_framework.settings import api_settings
+from rest_framework.utils.urls import remove_query_param, replace_query_param
+
+
+def _encode_value(value):
+    if isinstance(value, datetime):
+        return value.isoformat()
+    if isinstance(value, Decimal):
+        return str(value)
+    return value
+
+
+class KeysetPagination(BasePagination):
+    """
+    Cursor pagination that seeks with `WHERE (key, id) < (last_key, last_id)`
+    instead of COUNT(*) + OFFSET, so every page costs the same.
+
+    The sort key is the first ordering already applied to the queryset
+    (OrderingFilter, search rank or the model default), with the primary
+    key added as a tie-breaker. Only keys listed in `cursor_ordering_fields`
+    on the view are accepted; anything else falls back to the default.
+
+    Staff users can opt back into page numbers with `?page=`, which is
+    what the admin screens use.
+    """
+    page_size = api_settings.PAGE_SIZE
+    max_page_size = 100
+    cursor_query_param = 'cursor'
+    page_size_query_param = 'page_size'
+    default_ordering = ('-created_at', '-id')
+    invalid_cursor_message = 'Invalid cursor'
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.request = request
+        self.page_number_paginator = None
+
+        if request.query_params.get('page') and request.user.is_staff:
+            self.page_number_paginator = PageNumberPagination()
+            self.page_number_paginator.page_size = self.get_page_size(request)
+            return self.page_number_paginator.paginate_queryset(queryset, request, view)
+
+        self.page_size = self.get_page_size(request)
+        self.ordering = self.get_ordering(queryset, view)
+        reverse, position = self.decode_cursor(request)
+
+        order = [self.flip(field) for field in self.ordering] if reverse else list(self.ordering)
+        queryset = queryset.order_by(*order)
+        if position is not None:
+            queryset = queryset.filter(self.seek(order, position))
+
+        results = list(queryset[:self.page_size + 1])
+        has_more = len(results) > self.page_size
+        results = results[:self.page_size]
+        if reverse:
+            results.reverse()
+
+        if reverse:
+            self.has_next, self.has_previous = True, has_more
+        else:
+            self.has_next, self.has_previous = has_more, position is not None
+
+        self.first = self.position_of(results[0]) if results else None
+        self.last = self.position_of(results[-1]) if results else None
+        return results
+
+    def get_page_size(self, request):
+        try:
+            size = int(request.query_params[self.page_size_query_param])
+        except (KeyError, ValueError):
+            return self.page_size
+        return max(1, min(size, self.max_page_size))
+
+    def get_ordering(self, queryset, view):
+        allowed = getattr(view, 'cursor_ordering_fields', ('created_at',))
+        current = list(queryset.query.order_by) or list(queryset.model._meta.ordering)
+        if current and isinstance(current[0], str) and current[0].lstrip('-') in allowed:
+            field = current[0]
+            tie_breaker = '-id' if field.startswith('-') else 'id'
+            return (field, tie_breaker)
+        return self.default_ordering
+
+    @staticmethod
+    def flip(field):
+        return field[1:] if field.startswith('-') else f'-{field}'
+
+    @staticmethod
+    def seek(order, position):
+        # (a, b) after (x, y)  ==  a > x  OR  (a = x AND b > y), per direction
+        condition = Q()
+        equal = Q()
+        for field, value in zip(order, position):
+            name = field.lstrip('-')
+            lookup = 'lt' if field.startswith('-') else 'gt'
+            condition |= equal & Q(**{f'{name}__{lookup}': value})
+            equal &= Q(**{name: value})
+        return condition
+
+    def position_of(self, obj):
+        return [_encode_value(getattr(obj, field.lstrip('-'))) for field in self.ordering]
+
+    def decode_cursor(self, request):
+        encoded = request.query_params.get(self.cursor_query_param)
+        if not encoded:
+            return False, None
+        try:
+            payload = json.loads(base64.urlsafe_b64decode(encoded.encode()))
+            reverse, position = bool(payload['r']), payload['p']
+        except (TypeError, ValueError, KeyError, binascii.Error):
+            raise ValidationError({self.cursor_query_param: self.invalid_cursor_message})
+        # a cursor minted for another ordering can't be reused
+        if payload.get('o') != list(self.ordering) or len(position) != len(self.ordering):
+            raise ValidationError({self.cursor_query_param: self.invalid_cursor_message})
+        return reverse, position
+
+    def encode_cursor(self, reverse, position):
+        payload = {'r': int(reverse), 'p': position, 'o': list(self.ordering)}
+        encoded = base64.urlsafe_b64encode(json.dumps(payload, separators=(',', ':')).encode())
+        url = self.request.build_absolute_uri()
+        return replace_query_param(url, self.cursor_query_param, encoded.decode())
+
+    def get_next_link(self):
+        if not self.has_next or self.last is None:
+            return None
+        return self.encode_cursor(False, self.last)
+
+    def get_previous_link(self):
+        if not self.has_previous:
+            return None
+        if self.first is None:
+            return remove_query_param(self.request.build_absolute_uri(), self.cursor_query_param)
+        return self.encode_cursor(True, self.first)
+
+    def get_paginated_response(self, data):
+        if self.page_number_paginator is not None:
+            return self.page_number_paginator.get_paginated_response(data)
+        return Response({
+            'next': self.get_next_link(),
+            'previous': self.get_previous_link(),
+            'results': data,
+        })
+
+    def get_paginated_response_schema(self, schema):
+        return {
+            'type': 'object',
+            'required': ['results'],
+            'properties': {
+                'next': {'type': 'string', 'nullable': True, 'format': 'uri'},
+                'previous': {'type': 'string', 'nullable': True, 'format': 'uri'},
+                'results': schema,
+            },
+        }
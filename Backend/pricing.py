@@ -0,0 +1,231 @@
+import hashlib
+import threading
+import time
+from bisect import bisect_right
+from collections import defaultdict
+from decimal import Decimal
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models.functions import Now
+from django.utils import timezone
+
+from .cache import get_version
+from .models import DiscountRule, Order, OrderItem, TaxRule
+
+CENT = Decimal('0.01')
+HUNDRED = Decimal('100')
+REPRICEABLE = {'status': 'pending', 'payment_status': 'unpaid'}
+
+
+def _region(value):
+    return (value or '').strip().lower()
+
+
+class Quote:
+    """Priced lines plus totals. Tax is summed unrounded per line and rounded once."""
+
+    def __init__(self, lines):
+        self.lines = lines
+        self.subtotal = sum((line['line_total'] for line in lines), Decimal('0'))
+        self.discount = sum((line['discount'] for line in lines), Decimal('0'))
+        self.tax = sum((line['tax'] for line in lines), Decimal('0')).quantize(CENT)
+        self.total = self.subtotal + self.tax
+
+    def by_product(self):
+        return {line['product_id']: line for line in self.lines}
+
+
+class PricingEngine:
+    """
+    Active tax and discount rules compiled into dicts, so pricing a cart is
+    a few dict lookups per line and no queries.
+
+    Tax: the most specific rule for (category, country, state) wins, a
+    category match before a region match; DEFAULT_TAX_RATE when none does.
+    Discounts: the best of the product's, its category's and the store-wide
+    rules whose min_quantity and time window the line meets.
+    """
+
+    def __init__(self, tax_rules=(), discount_rules=(), default_rate=None):
+        tax_rules, discount_rules = list(tax_rules), list(discount_rules)
+        self.default_rate = Decimal(str(default_rate if default_rate is not None else getattr(settings, 'DEFAULT_TAX_RATE', '0.10')))
+        # the same rules compile to the same signature in every process
+        self.signature = hashlib.md5(repr([
+            (type(rule).__name__, rule.pk, getattr(rule, 'updated_at', None)) for rule in (*tax_rules, *discount_rules)
+        ] + [str(self.default_rate)]).encode()).hexdigest()
+        # instants at which some discount window opens or closes
+        self.boundaries = sorted({
+            moment for rule in discount_rules for moment in (rule.starts_at, rule.ends_at) if moment is not None
+        })
+        self.tax = {}
+        for rule in tax_rules:
+            # lowest id wins a (disallowed) duplicate scope
+            self.tax.setdefault((rule.category_id, _region(rule.country), _region(rule.state)), rule.rate)
+        self.discounts = defaultdict(list)
+        for rule in discount_rules:
+            if rule.product_id:
+                scope = ('product', rule.product_id)
+            elif rule.category_id:
+                scope = ('category', rule.category_id)
+            else:
+                scope = ('all', None)
+            self.discounts[scope].append((rule.percent, rule.min_quantity, rule.starts_at, rule.ends_at))
+        for candidates in self.discounts.values():
+            candidates.sort(key=lambda candidate: candidate[0], reverse=True)
+        self.rates = {}
+
+    @classmethod
+    def compile(cls):
+        return cls(
+            TaxRule.objects.filter(is_active=True).order_by('id'),
+            DiscountRule.objects.filter(is_active=True).order_by('id'),
+        )
+
+    def state(self, now=None):
+        """
+        Changes whenever prices may: when the rules change, and when a
+        discount window opens or closes (no write happens then). For ETags.
+        """
+        return f'{self.signature}.{bisect_right(self.boundaries, now or timezone.now())}'
+
+    def tax_rate(self, category_id, country='', state=''):
+        key = (category_id, _region(country), _region(state))
+        rate = self.rates.get(key)
+        if rate is None:
+            category, country, state = key
+            scopes = (
+                (scope, *region)
+                for scope in (category, None)
+                for region in ((country, state), ('', state), (country, ''), ('', ''))
+            )
+            rate = self.rates[key] = next((self.tax[scope] for scope in scopes if scope in self.tax), self.default_rate)
+        return rate
+
+    def discount_percent(self, product_id, category_id, quantity, now):
+        best = Decimal('0')
+        for scope in (('product', product_id), ('category', category_id), ('all', None)):
+            # sorted best first: the first one that applies is this scope's best
+            for percent, min_quantity, starts_at, ends_at in self.discounts.get(scope, ()):
+                if percent <= best:
+                    break
+                if quantity >= min_quantity and (starts_at is None or starts_at <= now) and (ends_at is None or now < ends_at):
+                    best = percent
+                    break
+        return best
+
+    def quote(self, lines, address=None, now=None):
+        """
+        lines: (product_id, category_id, base_price, quantity) tuples, where
+        base_price is the product's discounted_price. A line without a
+        product_id keeps its base price (no discount applies to it).
+        """
+        now = now or timezone.now()
+        country, state = (address.country, address.state) if address is not None else ('', '')
+        priced = []
+        for product_id, category_id, base_price, quantity in lines:
+            percent = self.discount_percent(product_id, category_id, quantity, now) if product_id else Decimal('0')
+            unit_price = (base_price * (HUNDRED - percent) / HUNDRED).quantize(CENT) if percent else base_price
+            line_total = unit_price * quantity
+            rate = self.tax_rate(category_id, country, state)
+            priced.append({
+                'product_id': product_id,
+                'quantity': quantity,
+                'base_price': base_price,
+                'discount_percent': percent,
+                'unit_price': unit_price,
+                'line_total': line_total,
+                'discount': base_price * quantity - line_total,
+                'tax_rate': rate,
+                'tax': line_total * rate,
+            })
+        return Quote(priced)
+
+
+_engine = None
+_engine_version = None
+_engine_expires = 0
+_lock = threading.Lock()
+
+
+def get_engine():
+    """
+    This process's compiled engine, rebuilt when the 'pricing' version moves
+    and at least every PRICING_ENGINE_TTL seconds: with a per-process cache
+    (LocMemCache) other workers never see this one's version bumps.
+    """
+    global _engine, _engine_version, _engine_expires
+    version = get_version('pricing')
+    if _engine is None or version != _engine_version or time.monotonic() >= _engine_expires:
+        with _lock:
+            if _engine is None or version != _engine_version or time.monotonic() >= _engine_expires:
+                _engine, _engine_version = PricingEngine.compile(), version
+                _engine_expires = time.monotonic() + getattr(settings, 'PRICING_ENGINE_TTL', 60)
+    return _engine
+
+
+# Batch pricing
+
+def price_cart(cart, address=None):
+    """
+    Quotes every line of a cart in one call. Expects items with their
+    product loaded (Cart.with_totals() or prefetch_related('items__product')).
+    """
+    return _quote_cart(get_engine(), cart, address)
+
+
+def price_carts(carts):
+    """{cart.id: Quote} for many carts against one engine lookup; same prefetch as price_cart."""
+    engine = get_engine()
+    return {cart.id: _quote_cart(engine, cart) for cart in carts}
+
+
+def _quote_cart(engine, cart, address=None):
+    return engine.quote(
+        [(item.product_id, item.product.category_id, item.product.discounted_price, item.quantity) for item in cart.items.all()],
+        address,
+    )
+
+
+def reprice_orders(order_ids):
+    """
+    Recomputes line prices, tax and totals of unpaid pending orders from the
+    current product prices and rules: one query for the lines, one bulk
+    update each for items and orders. Other orders are left alone; returns
+    how many were repriced.
+    """
+    with transaction.atomic():
+        orders = {
+            order.id: order
+            for order in Order.objects.select_for_update(of=('self',)).filter(id__in=order_ids, **REPRICEABLE)
+            .select_related('shipped_address')
+        }
+        if not orders:
+            return 0
+        lines = defaultdict(list)
+        items = OrderItem.objects.filter(order_id__in=orders).select_related('product').order_by('order_id', 'id')
+        for item in items:
+            lines[item.order_id].append(item)
+
+        engine = get_engine()
+        changed_items = []
+        for order_id, order in orders.items():
+            quote = engine.quote(
+                [
+                    (item.product_id, item.product.category_id, item.product.discounted_price, item.quantity)
+                    if item.product_id else (None, None, item.unit_price, item.quantity)
+                    for item in lines[order_id]
+                ],
+                order.shipped_address,
+            )
+            for item, line in zip(lines[order_id], quote.lines):
+                if item.unit_price != line['unit_price']:
+                    item.unit_price = line['unit_price']
+                    changed_items.append(item)
+            order.subtotal, order.tax, order.total = quote.subtotal, quote.tax, quote.total
+
+        OrderItem.objects.bulk_update(changed_items, ['unit_price'], batch_size=1000)
+        Order.objects.bulk_update(orders.values(), ['subtotal', 'tax', 'total'], batch_size=1000)
+        # bulk_update skips auto_now; order ETags hang on updated_at
+        Order.objects.filter(id__in=orders).update(updated_at=Now())
+    return len(orders)
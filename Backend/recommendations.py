@@ -0,0 +1,181 @@
+import heapq
+from collections import defaultdict
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Count, F, Max, Q, Window
+from django.db.models.functions import Now, RowNumber
+from django.utils import timezone
+
+from .cache import bump_version
+from .models import (
+    Order, OrderItem, Product, ProductPairCount, ProductRecommendation, RecommendationRun,
+)
+
+# orders in these states never count as "bought together"
+EXCLUDED_STATUSES = ('canceled',)
+# an order still inside its checkout transaction may hold a lower id than a
+# committed one; leave the newest orders for the next run
+SETTLE_DELAY = timedelta(minutes=1)
+CHUNK_SIZE = 1000
+
+
+def _top_k():
+    return getattr(settings, 'RECOMMENDATIONS_PER_PRODUCT', 8)
+
+
+def _chunks(values, size=CHUNK_SIZE):
+    values = list(values)
+    for start in range(0, len(values), size):
+        yield values[start:start + size]
+
+
+# Counting
+
+def count_pairs(after_order_id, upto_order_id):
+    """
+    {(product_id, other_id): orders} for orders in (after, upto], counted in
+    one self-join on OrderItem grouped by both product ids.
+    """
+    rows = (
+        OrderItem.objects
+        .filter(order_id__gt=after_order_id, order_id__lte=upto_order_id, product__isnull=False)
+        .exclude(order__status__in=EXCLUDED_STATUSES)
+        .annotate(other_id=F('order__items__product_id'))
+        .filter(other_id__isnull=False)
+        .filter(~Q(other_id=F('product_id')))
+        .order_by()
+        .values('product_id', 'other_id')
+        .annotate(orders=Count('order_id', distinct=True))
+    )
+    return {(row['product_id'], row['other_id']): row['orders'] for row in rows}
+
+
+def merge_pairs(counts):
+    """Adds new co-occurrence counts onto the stored ones."""
+    by_product = defaultdict(dict)
+    for (product_id, other_id), orders in counts.items():
+        by_product[product_id][other_id] = orders
+
+    for chunk in _chunks(by_product):
+        stored = ProductPairCount.objects.filter(product_id__in=chunk).values_list('product_id', 'other_id', 'orders')
+        for product_id, other_id, orders in stored:
+            if other_id in by_product[product_id]:
+                by_product[product_id][other_id] += orders
+
+        ProductPairCount.objects.bulk_create(
+            [
+                ProductPairCount(product_id=product_id, other_id=other_id, orders=orders)
+                for product_id in chunk
+                for other_id, orders in by_product[product_id].items()
+            ],
+            update_conflicts=True,
+            unique_fields=['product', 'other'],
+            update_fields=['orders'],
+            batch_size=CHUNK_SIZE,
+        )
+    return set(by_product)
+
+
+# Ranking
+
+def category_fallbacks(category_ids, limit):
+    """category_id -> newest active product ids, one windowed query."""
+    rows = (
+        Product.objects.filter(status='active', category_id__in=category_ids)
+        .annotate(row=Window(RowNumber(), partition_by=F('category_id'), order_by=[F('created_at').desc(), F('id').desc()]))
+        .filter(row__lte=limit)
+        .values_list('category_id', 'id')
+    )
+    fallbacks = defaultdict(list)
+    for category_id, product_id in rows:
+        fallbacks[category_id].append(product_id)
+    return fallbacks
+
+
+def rank_products(product_ids):
+    """Rewrites the top-K rows of the given products; returns how many changed."""
+    k = _top_k()
+    changed = 0
+    for chunk in _chunks(product_ids):
+        categories = dict(Product.objects.filter(id__in=chunk).values_list('id', 'category_id'))
+
+        candidates = defaultdict(list)
+        pairs = ProductPairCount.objects.filter(product_id__in=categories, other__status='active')
+        for product_id, other_id, orders in pairs.values_list('product_id', 'other_id', 'orders'):
+            candidates[product_id].append((orders, -other_id))
+        # one extra per category: a product is its own newest sibling
+        fallbacks = category_fallbacks(set(categories.values()), k + 1)
+
+        rows = []
+        for product_id, category_id in categories.items():
+            top = heapq.nlargest(k, candidates[product_id])
+            picked = [(-negative_id, 'bought_together', float(orders)) for orders, negative_id in top]
+            seen = {product_id, *(other_id for other_id, _, _ in picked)}
+            for other_id in fallbacks.get(category_id, ()):
+                if len(picked) >= k:
+                    break
+                if other_id not in seen:
+                    picked.append((other_id, 'related', 0.0))
+                    seen.add(other_id)
+            rows.extend(
+                ProductRecommendation(product_id=product_id, recommended_id=other_id, kind=kind, score=score, rank=rank)
+                for rank, (other_id, kind, score) in enumerate(picked)
+            )
+
+        current = defaultdict(list)
+        stored = ProductRecommendation.objects.filter(product_id__in=categories).order_by('product_id', 'rank')
+        for product_id, other_id, kind in stored.values_list('product_id', 'recommended_id', 'kind'):
+            current[product_id].append((other_id, kind))
+        wanted = defaultdict(list)
+        for row in rows:
+            wanted[row.product_id].append((row.recommended_id, row.kind))
+        stale = [product_id for product_id in categories if current[product_id] != wanted[product_id]]
+        if not stale:
+            continue
+
+        stale_set = set(stale)
+        ProductRecommendation.objects.filter(product_id__in=stale).delete()
+        ProductRecommendation.objects.bulk_create([row for row in rows if row.product_id in stale_set], batch_size=CHUNK_SIZE)
+        # the detail payload embeds these rows; move its ETag / Last-Modified
+        Product.objects.filter(id__in=stale).update(updated_at=Now())
+        changed += len(stale)
+    return changed
+
+
+# Job
+
+def build_recommendations(full=False):
+    """
+    Counts orders placed since the previous run, then re-ranks the products
+    those orders touched plus any product that has no recommendations yet.
+    `full` starts over from the first order and re-ranks every product.
+    """
+    with transaction.atomic():
+        previous = RecommendationRun.objects.select_for_update().first()
+        after = 0 if full or previous is None else previous.last_order_id
+        run = RecommendationRun.objects.create(last_order_id=after, full=full)
+
+        settled = Order.objects.filter(id__gt=after, created_at__lt=timezone.now() - SETTLE_DELAY)
+        upto = settled.aggregate(last=Max('id'))['last'] or after
+        run.orders = settled.filter(id__lte=upto).count()
+
+        if full:
+            ProductPairCount.objects.all().delete()
+        touched = merge_pairs(count_pairs(after, upto)) if upto > after else set()
+
+        if full:
+            to_rank = set(Product.objects.values_list('id', flat=True))
+        else:
+            to_rank = touched | set(
+                Product.objects.filter(status='active', recommendations__isnull=True).values_list('id', flat=True)
+            )
+        run.products = rank_products(sorted(to_rank))
+        run.last_order_id = upto
+        run.finished_at = timezone.now()
+        run.save()
+
+    if run.products:
+        bump_version('product')
+    return run
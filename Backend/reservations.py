@@ -0,0 +1,168 @@
+from collections import Counter
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import F, Sum
+from django.db.models.functions import Greatest
+from django.utils import timezone
+
+from .cache import bump_version_on_commit
+from .models import Product, StockReservation
+
+
+# Stock reservations
+# Adding to a cart holds units with one conditional UPDATE on Product.reserved
+# instead of locking the product row for the whole request. Holds expire after
+# STOCK_RESERVATION_TTL and are handed back by `manage.py release_reservations`;
+# checkout turns them into a real stock decrement.
+#
+# Lock order is always reservation rows first, then product rows in id order.
+# These are queryset .update()s, which send no post_save: each path bumps the
+# 'stock' cache version itself. Only the facets depend on that tag, so cart
+# clicks leave the cached product pages alone.
+
+def get_ttl():
+    return timedelta(seconds=getattr(settings, 'STOCK_RESERVATION_TTL', 15 * 60))
+
+
+def hold(cart, product_id, quantity):
+    """
+    Sets the cart's hold on one product to exactly `quantity` (0 drops it) and
+    pushes its expiry out. Returns False, changing nothing, when there is not
+    enough unreserved stock. Call it last in a transaction: the product row
+    stays locked until commit.
+    """
+    with transaction.atomic():
+        reservation = StockReservation.objects.select_for_update().filter(cart=cart, product_id=product_id).first()
+        current = reservation.quantity if reservation else 0
+        delta = quantity - current
+
+        if delta > 0:
+            # UPDATE ... SET reserved = reserved + n WHERE stock >= reserved + n
+            grabbed = Product.objects.filter(
+                pk=product_id, status='active', stock__gte=F('reserved') + delta,
+            ).update(reserved=F('reserved') + delta)
+            if not grabbed:
+                return False
+        elif delta < 0:
+            Product.objects.filter(pk=product_id).update(reserved=Greatest(F('reserved') + delta, 0))
+        if delta:
+            bump_version_on_commit('stock')
+
+        if not quantity:
+            if reservation:
+                reservation.delete()
+        elif reservation:
+            reservation.quantity = quantity
+            reservation.expires_at = timezone.now() + get_ttl()
+            reservation.save(update_fields=['quantity', 'expires_at'])
+        else:
+            StockReservation.objects.create(
+                cart=cart, product_id=product_id, quantity=quantity, expires_at=timezone.now() + get_ttl(),
+            )
+    return True
+
+
+def _give_back(rows):
+    """rows: (reservation_id, product_id, quantity); deletes them and frees their units."""
+    totals = Counter()
+    for _, product_id, quantity in rows:
+        totals[product_id] += quantity
+    for product_id in sorted(totals):
+        Product.objects.filter(pk=product_id).update(reserved=Greatest(F('reserved') - totals[product_id], 0))
+    StockReservation.objects.filter(id__in=[row[0] for row in rows]).delete()
+    bump_version_on_commit('stock')
+
+
+def release(cart, product_ids=None):
+    """Drops the cart's holds (all of them, or only on `product_ids`)."""
+    with transaction.atomic():
+        reservations = StockReservation.objects.select_for_update().filter(cart=cart)
+        if product_ids is not None:
+            reservations = reservations.filter(product_id__in=product_ids)
+        rows = list(reservations.order_by('id').values_list('id', 'product_id', 'quantity'))
+        if rows:
+            _give_back(rows)
+    return len(rows)
+
+
+def release_expired(batch_size=500):
+    """
+    Hands back expired holds one batch per transaction; returns how many.
+    Rows another transaction is touching (a shopper re-adding, another
+    sweeper) are skipped and picked up next time.
+    """
+    released = 0
+    while True:
+        with transaction.atomic():
+            rows = list(
+                StockReservation.objects.select_for_update(skip_locked=True)
+                .filter(expires_at__lte=timezone.now())
+                .order_by('id')
+                .values_list('id', 'product_id', 'quantity')[:batch_size]
+            )
+            if rows:
+                _give_back(rows)
+        released += len(rows)
+        if len(rows) < batch_size:
+            return released
+
+
+def commit_stock(cart, lines):
+    """
+    Checkout: decrements stock for `lines` ({product_id: quantity}) and
+    consumes the cart's holds. Returns {product_id: units available} for
+    every line that fell short; the caller must roll back if any did.
+
+    No product row is read or locked beforehand. Each product gets one
+    conditional UPDATE and a shortfall shows up as an affected-row count
+    of 0. The UPDATEs go out in id order, so two checkouts sharing
+    products lock them in the same order and cannot deadlock. A single
+    UPDATE ... FROM (VALUES ...) would save round trips but leaves the
+    lock order to the query plan.
+    """
+    held = dict(
+        StockReservation.objects.select_for_update().filter(cart=cart).values_list('product_id', 'quantity')
+    )
+    now = timezone.now()
+    short = []
+    for product_id in sorted(lines):
+        quantity, mine = lines[product_id], held.get(product_id, 0)
+        # what others hold stays untouchable: stock - (reserved - mine) >= quantity
+        updated = Product.objects.filter(
+            pk=product_id, stock__gte=F('reserved') - mine + quantity,
+        ).update(
+            stock=F('stock') - quantity,
+            reserved=Greatest(F('reserved') - mine, 0),
+            updated_at=now,
+        )
+        if not updated:
+            short.append(product_id)
+
+    if not short:
+        StockReservation.objects.filter(cart=cart).delete()
+        # product responses only show is_in_stock, which changes when a line sells out
+        if Product.objects.filter(id__in=lines, stock=0).exists():
+            bump_version_on_commit('product', 'stock')
+        else:
+            bump_version_on_commit('stock')
+        return {}
+    return {
+        product_id: max(stock - (reserved - held.get(product_id, 0)), 0)
+        for product_id, stock, reserved in Product.objects.filter(id__in=short).values_list('id', 'stock', 'reserved')
+    }
+
+
+def recount_reserved():
+    """Rebuilds Product.reserved from the reservation rows; returns rows repaired."""
+    totals = dict(
+        StockReservation.objects.order_by().values('product_id').annotate(total=Sum('quantity'))
+        .values_list('product_id', 'total')
+    )
+    drifted = Product.objects.exclude(reserved=0).exclude(id__in=totals).update(reserved=0)
+    for product_id, total in totals.items():
+        drifted += Product.objects.filter(pk=product_id).exclude(reserved=total).update(reserved=total)
+    if drifted:
+        bump_version_on_commit('stock')
+    return drifted
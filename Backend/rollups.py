@@ -0,0 +1,182 @@
+from datetime import datetime, time, timedelta
+from decimal import Decimal
+from functools import reduce
+from operator import or_
+
+from django.db import transaction
+from django.db.models import Count, DecimalField, ExpressionWrapper, F, Q, Sum
+from django.db.models.functions import NullIf, TruncDate
+from django.utils import timezone
+
+from .models import DailyCategorySales, DailyProductSales, DailySales, Order, OrderItem, RollupRun
+
+CANCELED = 'canceled'
+# orders whose checkout/cancel transaction is still open may carry an older
+# updated_at than committed ones; leave the newest changes for the next run
+SETTLE_DELAY = timedelta(minutes=1)
+DAYS_PER_CHUNK = 31
+CENT = Decimal('0.01')
+
+MONEY = DecimalField(max_digits=14, decimal_places=2)
+LINE_GROSS = ExpressionWrapper(F('quantity') * F('unit_price'), output_field=MONEY)
+# orders store tax only in total; each line carries its share of it
+LINE_TAX = ExpressionWrapper(
+    F('quantity') * F('unit_price') * F('order__tax') / NullIf(F('order__subtotal'), 0),
+    output_field=DecimalField(max_digits=20, decimal_places=6),
+)
+
+
+def _money(value):
+    return Decimal(str(value or 0)).quantize(CENT)
+
+
+def _day_bounds(day):
+    start = timezone.make_aware(datetime.combine(day, time.min))
+    return start, start + timedelta(days=1)
+
+
+def _created_on(days, field='created_at'):
+    """Q matching rows created on any of `days`, as ranges the index can serve."""
+    ranges = []
+    for day in days:
+        start, end = _day_bounds(day)
+        ranges.append(Q(**{f'{field}__gte': start, f'{field}__lt': end}))
+    return reduce(or_, ranges)
+
+
+def _item_metrics():
+    live, canceled = ~Q(order__status=CANCELED), Q(order__status=CANCELED)
+    return {
+        'orders': Count('order_id', distinct=True, filter=live),
+        'units': Sum('quantity', filter=live),
+        'gross': Sum(LINE_GROSS, filter=live),
+        'tax': Sum(LINE_TAX, filter=live),
+        'canceled_orders': Count('order_id', distinct=True, filter=canceled),
+        'canceled_units': Sum('quantity', filter=canceled),
+        'canceled_gross': Sum(LINE_GROSS, filter=canceled),
+    }
+
+
+def _row(model, values, **keys):
+    return model(
+        **keys,
+        orders=values['orders'] or 0,
+        units=values['units'] or 0,
+        gross=_money(values['gross']),
+        tax=_money(values['tax']),
+        canceled_orders=values['canceled_orders'] or 0,
+        canceled_units=values['canceled_units'] or 0,
+        canceled_gross=_money(values['canceled_gross']),
+    )
+
+
+def rebuild_days(days):
+    """
+    Recomputes every rollup row for `days` from the orders placed on them:
+    three grouped queries per chunk of days, then delete + bulk insert.
+    Recomputing whole days (rather than applying deltas) keeps a rerun or
+    an overlapping run harmless.
+    """
+    days = sorted(set(days))
+    for start in range(0, len(days), DAYS_PER_CHUNK):
+        chunk = days[start:start + DAYS_PER_CHUNK]
+        live, canceled = ~Q(status=CANCELED), Q(status=CANCELED)
+        totals = (
+            Order.objects.filter(_created_on(chunk))
+            .annotate(day=TruncDate('created_at'))
+            .order_by()
+            .values('day')
+            .annotate(
+                orders=Count('id', filter=live),
+                units=Sum('total_quantity', filter=live),
+                gross=Sum('subtotal', filter=live),
+                tax=Sum('tax', filter=live),
+                canceled_orders=Count('id', filter=canceled),
+                canceled_units=Sum('total_quantity', filter=canceled),
+                canceled_gross=Sum('subtotal', filter=canceled),
+            )
+        )
+        items = (
+            OrderItem.objects.filter(_created_on(chunk, 'order__created_at'), product__isnull=False)
+            .annotate(day=TruncDate('order__created_at'))
+            .order_by()
+        )
+        by_category = items.values('day', 'product__category_id').annotate(**_item_metrics())
+        by_product = items.values('day', 'product_id').annotate(**_item_metrics())
+
+        with transaction.atomic():
+            for model in (DailySales, DailyCategorySales, DailyProductSales):
+                model.objects.filter(date__in=chunk).delete()
+            DailySales.objects.bulk_create([_row(DailySales, row, date=row['day']) for row in totals])
+            DailyCategorySales.objects.bulk_create(
+                [_row(DailyCategorySales, row, date=row['day'], category_id=row['product__category_id']) for row in by_category],
+                batch_size=1000,
+            )
+            DailyProductSales.objects.bulk_create(
+                [_row(DailyProductSales, row, date=row['day'], product_id=row['product_id']) for row in by_product],
+                batch_size=1000,
+            )
+    return len(days)
+
+
+def update_rollups(full=False):
+    """
+    Re-rolls the days of every order created or changed (updated_at) since
+    the previous run. `full` wipes the rollups and recomputes every day;
+    use it after orders have been deleted, which leaves no updated_at behind.
+    """
+    with transaction.atomic():
+        previous = RollupRun.objects.select_for_update().first()
+        since = None if full or previous is None else previous.watermark
+        upto = timezone.now() - SETTLE_DELAY
+        run = RollupRun.objects.create(watermark=since, full=full)
+
+        changed = Order.objects.filter(updated_at__lte=upto)
+        if since is not None:
+            changed = changed.filter(updated_at__gt=since)
+        run.orders = changed.count()
+        days = set(changed.annotate(day=TruncDate('created_at')).order_by().values_list('day', flat=True).distinct())
+
+        if full:
+            for model in (DailySales, DailyCategorySales, DailyProductSales):
+                model.objects.all().delete()
+        run.days = rebuild_days(days)
+        run.watermark = upto
+        run.finished_at = timezone.now()
+        run.save()
+    return run
+
+
+# Reading
+
+SERIES_FIELDS = ('orders', 'units', 'gross', 'tax', 'canceled_orders', 'canceled_units', 'canceled_gross')
+
+
+def sales_series(start, end, product_id=None, category_id=None):
+    """Daily rows for [start, end] from one rollup table; days without sales are zero."""
+    if product_id is not None:
+        rows = DailyProductSales.objects.filter(product_id=product_id)
+    elif category_id is not None:
+        rows = DailyCategorySales.objects.filter(category_id=category_id)
+    else:
+        rows = DailySales.objects.all()
+    stored = {row['date']: row for row in rows.filter(date__gte=start, date__lte=end).values('date', *SERIES_FIELDS)}
+
+    zero = dict.fromkeys(SERIES_FIELDS, 0)
+    series, day = [], start
+    while day <= end:
+        series.append(stored.get(day) or {'date': day, **zero})
+        day += timedelta(days=1)
+    return series
+
+
+def top_sellers(start, end, by='product', limit=10):
+    """Products or categories ranked by gross over [start, end]."""
+    model, key = (DailyProductSales, 'product') if by == 'product' else (DailyCategorySales, 'category')
+    rows = (
+        model.objects.filter(date__gte=start, date__lte=end)
+        .values(f'{key}_id', name=F(f'{key}__name'))
+        .annotate(**{field: Sum(field) for field in SERIES_FIELDS})
+        .order_by('-gross', f'{key}_id')[:limit]
+    )
+    return [{'id': row.pop(f'{key}_id'), **row} for row in rows]
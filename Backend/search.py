@@ -0,0 +1,202 @@
+import json
+import re
+
+from django.conf import settings
+from django.db import connection
+from django.db.models import FloatField, Q, Value
+from django.db.models.expressions import RawSQL
+from django.utils.module_loading import import_string
+from rest_framework.filters import BaseFilterBackend
+
+from .models import Category, Product
+
+
+def _table(model):
+    return connection.ops.quote_name(model._meta.db_table)
+
+
+def _placeholders(values):
+    return ', '.join(['%s'] * len(values))
+
+
+def _no_results(queryset):
+    return queryset.annotate(search_rank=Value(0.0, output_field=FloatField())).none()
+
+
+FTS_TABLE = 'Backend_product_fts'
+
+
+class SimpleSearchBackend:
+    """
+    Plain ILIKE matching, same behaviour as DRF's SearchFilter.
+    Used on databases without a native full-text engine.
+    """
+
+    def search(self, queryset, terms):
+        for term in terms.split():
+            queryset = queryset.filter(
+                Q(name__icontains=term)
+                | Q(description__icontains=term)
+                | Q(category__name__icontains=term)
+            )
+        return queryset.annotate(search_rank=Value(0.0, output_field=FloatField()))
+
+    def index_products(self, product_ids=None):
+        pass
+
+    def remove_products(self, product_ids):
+        pass
+
+
+class PostgresSearchBackend:
+    """
+    Searches the stored, GIN-indexed `Product.search_vector` column.
+    Name is weighted above category, category above description.
+    """
+    config = 'english'
+
+    def search(self, queryset, terms):
+        from django.contrib.postgres.search import SearchQuery, SearchRank
+
+        query = SearchQuery(terms, config=self.config, search_type='websearch')
+        return queryset.filter(search_vector=query).annotate(
+            search_rank=SearchRank('search_vector', query)
+        )
+
+    def index_products(self, product_ids=None):
+        sql = f"""
+            UPDATE {_table(Product)} AS p SET search_vector =
+                setweight(to_tsvector(%s, coalesce(p.name, '')), 'A') ||
+                setweight(to_tsvector(%s, coalesce(c.name, '')), 'B') ||
+                setweight(to_tsvector(%s, coalesce(p.description, '')), 'C')
+            FROM {_table(Category)} AS c
+            WHERE c.id = p.category_id
+        """
+        params = [self.config] * 3
+        if product_ids is not None:
+            sql += " AND p.id = ANY(%s)"
+            params.append(list(product_ids))
+        with connection.cursor() as cursor:
+            cursor.execute(sql, params)
+
+    def remove_products(self, product_ids):
+        # the vector lives on the product row itself
+        pass
+
+
+class SQLiteSearchBackend:
+    """
+    Searches an FTS5 virtual table whose rowid is the product id. Every
+    match is kept, filtered in SQL, so counts, facets and pagination see
+    them all. The best `SEARCH_RANKED_RESULTS` are ranked with bm25();
+    the rest rank 0 and follow them.
+    """
+    weights = (10.0, 2.0, 5.0)  # name, description, category_name
+    token_re = re.compile(r'\w+', re.UNICODE)
+
+    def match_expression(self, terms):
+        # quote every token so user input can't inject FTS5 syntax,
+        # and prefix-match the last one so "wireless head" finds "headphones"
+        tokens = [f'"{token}"' for token in self.token_re.findall(terms)]
+        if tokens:
+            tokens[-1] += '*'
+        return ' '.join(tokens)
+
+    def search(self, queryset, terms):
+        match = self.match_expression(terms)
+        if not match:
+            return _no_results(queryset)
+
+        limit = getattr(settings, 'SEARCH_RANKED_RESULTS', 500)
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f"SELECT rowid, bm25({FTS_TABLE}, %s, %s, %s) FROM {FTS_TABLE} "
+                f"WHERE {FTS_TABLE} MATCH %s ORDER BY 2 LIMIT %s",
+                [*self.weights, match, limit],
+            )
+            hits = cursor.fetchall()
+
+        if not hits:
+            return _no_results(queryset)
+
+        # bm25 is lower-is-better; flip it so both engines sort on -search_rank.
+        # The scores travel as one JSON object, far cheaper than a CASE per hit.
+        # Joining the FTS table instead would run the MATCH once per product row.
+        scores = json.dumps({str(pk): -score for pk, score in hits})
+        return queryset.filter(
+            id__in=RawSQL(f"SELECT rowid FROM {FTS_TABLE} WHERE {FTS_TABLE} MATCH %s", [match]),
+        ).annotate(
+            search_rank=RawSQL(
+                f"coalesce(json_extract(%s, '$.\"' || {_table(Product)}.id || '\"'), 0.0)",
+                [scores],
+                output_field=FloatField(),
+            )
+        )
+
+    def index_products(self, product_ids=None):
+        where, params = '', []
+        if product_ids is not None:
+            product_ids = list(product_ids)
+            if not product_ids:
+                return
+            where = f"WHERE p.id IN ({_placeholders(product_ids)})"
+            params = product_ids
+
+        with connection.cursor() as cursor:
+            if product_ids is None:
+                cursor.execute(f"DELETE FROM {FTS_TABLE}")
+            else:
+                self.remove_products(product_ids)
+            cursor.execute(
+                f"""
+                INSERT INTO {FTS_TABLE} (rowid, name, description, category_name)
+                SELECT p.id, p.name, p.description, c.name
+                FROM {_table(Product)} AS p
+                JOIN {_table(Category)} AS c ON c.id = p.category_id
+                {where}
+                """,
+                params,
+            )
+
+    def remove_products(self, product_ids):
+        product_ids = list(product_ids)
+        if not product_ids:
+            return
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f"DELETE FROM {FTS_TABLE} WHERE rowid IN ({_placeholders(product_ids)})",
+                product_ids,
+            )
+
+
+VENDOR_BACKENDS = {
+    'postgresql': PostgresSearchBackend,
+    'sqlite': SQLiteSearchBackend,
+}
+
+
+def get_search_backend():
+    path = getattr(settings, 'PRODUCT_SEARCH_BACKEND', None)
+    if path:
+        return import_string(path)()
+    return VENDOR_BACKENDS.get(connection.vendor, SimpleSearchBackend)()
+
+
+class FullTextSearchFilter(BaseFilterBackend):
+    """
+    Drop-in replacement for SearchFilter using the view's `search_backend`.
+    Results are ordered by relevance unless `?ordering=` is given.
+    """
+    search_param = 'search'
+
+    def filter_queryset(self, request, queryset, view):
+        terms = request.query_params.get(self.search_param, '').strip()
+        if not terms:
+            return queryset
+
+        backend = getattr(view, 'search_backend', None) or get_search_backend()
+        queryset = backend.search(queryset, terms)
+
+        if not request.query_params.get('ordering'):
+            queryset = queryset.order_by('-search_rank', '-created_at')
+        return queryset
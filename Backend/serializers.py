@@ -1,6 +1,17 @@
 from rest_framework import serializers
 from .models import *
 from rest_framework.exceptions import ValidationError
+from .images import variant_urls
+from datetime import timedelta
+from django.utils import timezone
+from .orders import TRANSITIONS, can_transition
+from .filters import OrderFilter
+
+
+# {"thumb": {"webp": url, "jpeg": url}, "card": {...}, "detail": {...}}
+class ImageVariantsField(serializers.ReadOnlyField):
+    def to_representation(self, value):
+        return variant_urls(value.name if value else None, self.context.get('request'))
 
 class RegisterSerializer(serializers.ModelSerializer):
     email = serializers.EmailField()
@@ -79,12 +90,13 @@ class LoginSerializer(serializers.Serializer):
     
 class UserProfileSerializer(serializers.ModelSerializer):
     full_name = serializers.CharField(read_only=True)
+    profile_pic_variants = ImageVariantsField(source='profile_pic')
     
     class Meta:
         model = User
         fields = [
             'id', 'email', 'first_name', 'last_name',
-            'full_name', 'phone', 'profile_pic'
+            'full_name', 'phone', 'profile_pic', 'profile_pic_variants'
         ]
         
         
@@ -125,24 +137,26 @@ class ChangePasswordSerializer(serializers.Serializer):
 class CartItemReadSerializer(serializers.ModelSerializer):
     product_name = serializers.CharField(read_only=True, source='product.name')
     product_image = serializers.ImageField(read_only=True, source='product.image')
-    unit_price = serializers.DecimalField(read_only=True, decimal_places=2, max_digits=10,
-                                          source='product.discounted_price')
-    item_total = serializers.DecimalField(read_only=True, decimal_places=2, max_digits=10, source='items_total')
+    # unit_price / line_total are annotated by Cart.with_totals()
+    unit_price = serializers.DecimalField(read_only=True, decimal_places=2, max_digits=10)
+    item_total = serializers.DecimalField(read_only=True, decimal_places=2, max_digits=10, source='line_total')
     
     class Meta:
         model = CartItem
         fields = ['id', 'product', 'product_name', 'product_image', 'unit_price', 'quantity', 'item_total']
 
 
-# cart for readings
+# cart for readings; pass a cart from Cart.with_totals()
 class CartReadSerializer(serializers.ModelSerializer):
     items = CartItemReadSerializer(many=True, read_only=True)
     total_items = serializers.IntegerField(read_only=True)
     total_price = serializers.DecimalField(read_only=True, decimal_places=2, max_digits=7)
+    # set by read_cart from the pricing engine
+    discount_total = serializers.DecimalField(read_only=True, decimal_places=2, max_digits=10, default=0)
     
     class Meta:
         model = Cart
-        fields = ['id', 'items', 'total_items', 'total_price']
+        fields = ['id', 'items', 'total_items', 'total_price', 'discount_total']
 
 
 class AddToCartSerializer(serializers.Serializer):
@@ -155,6 +169,28 @@ class AddToCartSerializer(serializers.Serializer):
         return value
 
 
+class CartOperationSerializer(serializers.Serializer):
+    OPS = ['add', 'set', 'remove']
+    
+    op = serializers.ChoiceField(choices=OPS)
+    product_id = serializers.IntegerField()
+    quantity = serializers.IntegerField(min_value=0, required=False)
+    
+    def validate(self, data):
+        if data['op'] == 'add':
+            data.setdefault('quantity', 1)
+            if data['quantity'] < 1:
+                raise serializers.ValidationError({'quantity': 'Add at least one.'})
+        elif data['op'] == 'set' and 'quantity' not in data:
+            raise serializers.ValidationError({'quantity': 'This field is required.'})
+        return data
+
+
+# POST /api/cart/batch/; operations run in order, several may touch one product
+class CartBatchSerializer(serializers.Serializer):
+    operations = CartOperationSerializer(many=True, allow_empty=False, max_length=100)
+
+
 class UpdateToCartSerializer(serializers.ModelSerializer):
     quantity = serializers.IntegerField(min_value=1)
     
@@ -176,14 +212,13 @@ class UpdateToCartSerializer(serializers.ModelSerializer):
 
 
 class CategorySerializer(serializers.ModelSerializer):
-    product_count = serializers.IntegerField(source='product.count', read_only=True)
+    image_variants = ImageVariantsField(source='image')
     
     class Meta:
         model = Category
-        fields = ['id', 'name', 'slug', 'description', 'image', 'product_count', 'created_at']
-        
-    def get_product_count(self, value):
-        return value.products.count()
+        fields = ['id', 'name', 'slug', 'description', 'image', 'image_variants', 'product_count',
+                  'active_product_count', 'created_at']
+        read_only_fields = ['product_count', 'active_product_count']
     
 
 class CategoryCreateSerializer(serializers.ModelSerializer):
@@ -196,22 +231,40 @@ class ProductSerializer(serializers.ModelSerializer):
     category_name = serializers.CharField(read_only=True, source='category.name')
     discounted_price = serializers.DecimalField(max_digits=10, decimal_places=2, read_only=True)
     is_in_stock = serializers.BooleanField( read_only=True)
+    image_variants = ImageVariantsField(source='image')
     
     class Meta:
         model = Product
         fields = ['id', 'name', 'slug', 'category','category_name', 'price', 'discount','discounted_price', 'image',
-                  'is_in_stock', 'status']
+                  'image_variants', 'is_in_stock', 'status']
         
 
+# one precomputed recommendation, flattened to the recommended product
+class RecommendedProductSerializer(serializers.ModelSerializer):
+    id = serializers.IntegerField(source='recommended_id', read_only=True)
+    name = serializers.CharField(source='recommended.name', read_only=True)
+    slug = serializers.CharField(source='recommended.slug', read_only=True)
+    price = serializers.DecimalField(source='recommended.price', max_digits=10, decimal_places=2, read_only=True)
+    discounted_price = serializers.DecimalField(source='recommended.discounted_price', max_digits=10, decimal_places=2, read_only=True)
+    image_variants = ImageVariantsField(source='recommended.image')
+
+    class Meta:
+        model = ProductRecommendation
+        fields = ['id', 'kind', 'name', 'slug', 'price', 'discounted_price', 'image_variants']
+
+
 class ProductDetailSerializer(serializers.ModelSerializer):
     category_name = serializers.CharField(read_only=True, source='category.name')
     discounted_price = serializers.DecimalField(max_digits=10, decimal_places=2, read_only=True)
     is_in_stock = serializers.BooleanField( read_only=True)
+    image_variants = ImageVariantsField(source='image')
+    # prefetched by ProductViewSet.get_queryset
+    recommendations = RecommendedProductSerializer(many=True, read_only=True, source='active_recommendations')
     
     class Meta:
         model = Product
-        fields = ['id', 'name', 'slug', 'category','category_name', 'price', 'discount', 'discounted_price', 'image', 'status',
-                  'is_in_stock','description', 'created_at', 'updated_at']
+        fields = ['id', 'name', 'slug', 'category','category_name', 'price', 'discount', 'discounted_price', 'image',
+                  'image_variants', 'status', 'is_in_stock','description', 'recommendations', 'created_at', 'updated_at']
 
     
 class ProductCreateSerializer(serializers.ModelSerializer):
@@ -238,6 +291,52 @@ class ProductCreateSerializer(serializers.ModelSerializer):
         return value
     
 
+# one row of a catalog import (see Backend.catalog); category is a slug or name
+class ProductImportSerializer(serializers.Serializer):
+    slug = serializers.SlugField(max_length=50)
+    name = serializers.CharField(max_length=100, required=False, allow_blank=True, default='')
+    category = serializers.CharField(max_length=100)
+    description = serializers.CharField(required=False, allow_blank=True, default='')
+    price = serializers.DecimalField(max_digits=7, decimal_places=2, min_value=0)
+    discount = serializers.DecimalField(max_digits=7, decimal_places=2, min_value=0, max_value=100, default=0)
+    stock = serializers.IntegerField(min_value=0, default=0)
+    status = serializers.ChoiceField(choices=Product.STATUS_CHOICE, default='draft')
+    
+
+# one entry of POST /api/products/batch/; stock sets, stock_delta adds
+class ProductBatchItemSerializer(serializers.Serializer):
+    id = serializers.IntegerField()
+    price = serializers.DecimalField(max_digits=7, decimal_places=2, min_value=0, required=False)
+    discount = serializers.DecimalField(max_digits=7, decimal_places=2, min_value=0, max_value=100, required=False)
+    stock = serializers.IntegerField(min_value=0, required=False)
+    stock_delta = serializers.IntegerField(required=False)
+    status = serializers.ChoiceField(choices=Product.STATUS_CHOICE, required=False)
+    
+    def validate(self, data):
+        if 'stock' in data and 'stock_delta' in data:
+            raise serializers.ValidationError("Send either stock or stock_delta, not both.")
+        if len(data) == 1:
+            raise serializers.ValidationError("Nothing to update.")
+        return data
+
+
+class ProductBatchUpdateSerializer(serializers.Serializer):
+    items = serializers.ListField(child=serializers.DictField(), allow_empty=False, max_length=1000)
+    
+    def validate_items(self, value):
+        # compare ids the way the items will parse them, so 1 and "1" count as the same product;
+        # unparseable ids are left for the per-item errors
+        id_field, ids = serializers.IntegerField(), []
+        for item in value:
+            try:
+                ids.append(id_field.run_validation(item.get('id')))
+            except serializers.ValidationError:
+                continue
+        if len(ids) != len(set(ids)):
+            raise serializers.ValidationError("Each product id may appear only once per batch.")
+        return value
+    
+
 class AddressSerializer(serializers.ModelSerializer):
     class Meta:
         model = Address
@@ -260,15 +359,12 @@ class OrderItemSerializer(serializers.ModelSerializer):
         
     
 class OrderListSerializer(serializers.ModelSerializer):
-    item_count = serializers.SerializerMethodField()
     order_number = serializers.CharField(read_only=True)
     
     class Meta:
         model = Order
-        fields = ['id', 'order_number', 'status', 'payment_status', 'total', 'item_count', 'created_at']
-        
-    def get_item_count(self, obj):
-        return obj.items.count()
+        fields = ['id', 'order_number', 'status', 'payment_status', 'total', 'item_count', 'total_quantity',
+                  'created_at']
         
     
 class OrderDetailSerializer(serializers.ModelSerializer):
@@ -277,8 +373,8 @@ class OrderDetailSerializer(serializers.ModelSerializer):
     
     class Meta:
         model = Order
-        fields = ['id', 'order_number', 'items', 'shipped_address', 'status', 'payment_status', 'subtotal', 'tax', 'total',
-                  'notes', 'created_at', 'updated_at']
+        fields = ['id', 'order_number', 'items', 'item_count', 'total_quantity', 'shipped_address', 'status',
+                  'payment_status', 'subtotal', 'tax', 'total', 'notes', 'created_at', 'updated_at']
     
     def get_shipped_address(self, obj):
         if obj.shipped_address:
@@ -300,11 +396,69 @@ class OrderStatusUpdateSerializer(serializers.ModelSerializer):
         fields = ['status']
 
     def validate_status(self, value):
-        valid_statuses = ['pending', 'confirmed', 'shipped', 'delivered', 'cancelled']
-        if value not in valid_statuses:
-            raise serializers.ValidationError(f"Invalid status. Choose from: {valid_statuses}")
+        if self.instance is not None and not can_transition(self.instance.status, value):
+            allowed = list(TRANSITIONS.get(self.instance.status, ()))
+            raise serializers.ValidationError(
+                f'Cannot move an order from "{self.instance.status}" to "{value}". Allowed: {allowed}'
+            )
         return value
 
+
+class BulkOrderStatusSerializer(serializers.Serializer):
+    status = serializers.ChoiceField(choices=Order.STATUS_CHOICES)
+    order_ids = serializers.ListField(
+        child=serializers.IntegerField(min_value=1), allow_empty=False, max_length=10000, required=False,
+    )
+    filters = serializers.DictField(allow_empty=False, required=False)
+    notify = serializers.BooleanField(default=True)
+
+    def validate_filters(self, value):
+        # OrderFilter ignores keys it doesn't know and blank values; either would match every order
+        unknown = set(value) - set(OrderFilter.base_filters)
+        if unknown:
+            raise serializers.ValidationError(
+                f'Unknown filter(s): {sorted(unknown)}. Choose from: {sorted(OrderFilter.base_filters)}'
+            )
+        blank = sorted(name for name, filter_value in value.items() if filter_value in (None, ''))
+        if blank:
+            raise serializers.ValidationError(f'Filter(s) without a value: {blank}')
+        return value
+
+    def validate(self, data):
+        if ('order_ids' in data) == ('filters' in data):
+            raise serializers.ValidationError('Pass either order_ids or filters.')
+        if data['status'] not in {target for targets in TRANSITIONS.values() for target in targets}:
+            raise serializers.ValidationError({'status': f'No order can move to "{data["status"]}".'})
+        return data
+
+
+
+class BulkOrderCancelSerializer(serializers.Serializer):
+    order_ids = serializers.ListField(
+        child=serializers.IntegerField(min_value=1), allow_empty=False, max_length=10000,
+    )
+    notify = serializers.BooleanField(default=True)
+
+
+
+class SalesQuerySerializer(serializers.Serializer):
+    start = serializers.DateField(required=False)
+    end = serializers.DateField(required=False)
+    product = serializers.IntegerField(min_value=1, required=False)
+    category = serializers.IntegerField(min_value=1, required=False)
+    by = serializers.ChoiceField(choices=['product', 'category'], default='product')
+    limit = serializers.IntegerField(min_value=1, max_value=100, default=10)
+    max_days = 366
+
+    def validate(self, data):
+        data.setdefault('end', timezone.localdate())
+        data.setdefault('start', data['end'] - timedelta(days=29))
+        if data['start'] > data['end']:
+            raise serializers.ValidationError({'start': 'Must not be after end.'})
+        if (data['end'] - data['start']).days >= self.max_days:
+            raise serializers.ValidationError({'start': f'At most {self.max_days} days per request.'})
+        return data
+
     
 class CheckoutSerializer(serializers.Serializer):
     address_id = serializers.IntegerField()
@@ -0,0 +1,107 @@
+from django.db.models.signals import post_save, post_delete
+from django.dispatch import receiver
+
+from .cache import bump_version_on_commit
+from .images import enqueue_variants
+from .models import Category, DiscountRule, Product, TaxRule, User
+from .search import get_search_backend
+
+
+# Product responses embed the category name, so a category change
+# invalidates both tags.
+@receiver([post_save, post_delete], sender=Category)
+def invalidate_category_cache(sender, **kwargs):
+    bump_version_on_commit('category', 'product')
+
+
+@receiver([post_save, post_delete], sender=Product)
+def invalidate_product_cache(sender, **kwargs):
+    bump_version_on_commit('product')
+
+
+# Compiled pricing rules (Backend.pricing)
+@receiver([post_save, post_delete], sender=TaxRule)
+@receiver([post_save, post_delete], sender=DiscountRule)
+def invalidate_pricing(sender, **kwargs):
+    bump_version_on_commit('pricing')
+
+
+# Search index
+@receiver(post_save, sender=Product)
+def index_product(sender, instance, raw=False, **kwargs):
+    if not raw:
+        get_search_backend().index_products([instance.pk])
+
+
+@receiver(post_delete, sender=Product)
+def unindex_product(sender, instance, **kwargs):
+    get_search_backend().remove_products([instance.pk])
+
+
+@receiver(post_save, sender=Category)
+def reindex_category_products(sender, instance, created, raw=False, **kwargs):
+    if not created and not raw:
+        product_ids = instance.product_set.values_list('id', flat=True)
+        get_search_backend().index_products(list(product_ids))
+
+
+# Category product counters
+def _is_active(status):
+    return int(status == 'active')
+
+
+@receiver(post_save, sender=Product)
+def move_category_counts(sender, instance, created, raw=False, **kwargs):
+    if raw:
+        return
+    previous = getattr(instance, '_loaded_state', None)
+    category_id, active = instance.category_id, _is_active(instance.status)
+
+    if created:
+        Category.adjust_counts(category_id, 1, active)
+    elif previous is not None and previous['category_id'] is not None:
+        was_active = _is_active(previous['status']) if previous['status'] is not None else active
+        if previous['category_id'] != category_id:
+            Category.adjust_counts(previous['category_id'], -1, -was_active)
+            Category.adjust_counts(category_id, 1, active)
+        else:
+            Category.adjust_counts(category_id, 0, active - was_active)
+    else:
+        # saved from an instance we didn't load; recount_categories fixes any drift
+        return
+
+    instance._loaded_state = {
+        **(previous or {}), 'category_id': category_id, 'status': instance.status,
+    }
+    bump_version_on_commit('category')
+
+
+@receiver(post_delete, sender=Product)
+def release_category_counts(sender, instance, **kwargs):
+    Category.adjust_counts(instance.category_id, -1, -_is_active(instance.status))
+    bump_version_on_commit('category')
+
+
+# Image variants
+def _queue_if_changed(instance, field):
+    # only new files are resized; a save that leaves the image alone queues nothing
+    name = getattr(instance, field).name
+    state = getattr(instance, '_loaded_state', None)
+    if state is None:
+        state = instance._loaded_state = {}
+    if name and state.get(field) != name:
+        enqueue_variants(name)
+    state[field] = name
+
+
+@receiver(post_save, sender=Product)
+@receiver(post_save, sender=Category)
+def queue_catalog_image_variants(sender, instance, raw=False, **kwargs):
+    if not raw:
+        _queue_if_changed(instance, 'image')
+
+
+@receiver(post_save, sender=User)
+def queue_avatar_variants(sender, instance, raw=False, **kwargs):
+    if not raw:
+        _queue_if_changed(instance, 'profile_pic')
@@ -0,0 +1,163 @@
+import re
+import threading
+import time
+from bisect import bisect_left, insort
+
+from django.conf import settings
+from django.utils import timezone
+
+from .cache import get_version
+from .images import variant_urls
+from .models import Category, Product
+
+WORD_RE = re.compile(r'\w+', re.UNICODE)
+
+
+def _words(text):
+    return WORD_RE.findall(text.lower())
+
+
+class PrefixIndex:
+    """
+    Sorted (word, kind, id) keys searched with bisect, one key per word of a
+    name, so "head" finds "Wireless Headphones". Categories and products keep
+    separate key lists so matching categories always take the first places.
+    Built lazily in each worker process and kept current by re-reading only
+    the products touched since the last sync whenever the product cache
+    version moves.
+    """
+
+    def __init__(self):
+        self.keys = {'category': [], 'product': []}
+        self.items = {}
+        self.lock = threading.Lock()
+        self.product_version = None
+        self.category_version = None
+        self.synced_at = None
+        self.checked_at = 0.0
+
+    # building
+
+    def _add(self, kind, obj, keep_sorted=True):
+        key = (kind, obj.id)
+        self.items[key] = {
+            'type': kind,
+            'id': obj.id,
+            'slug': obj.slug,
+            'name': obj.name,
+            'image': obj.image.name if obj.image else '',
+            'words': _words(obj.name),
+        }
+        for word in set(self.items[key]['words']):
+            if keep_sorted:
+                insort(self.keys[kind], (word, kind, obj.id))
+            else:
+                self.keys[kind].append((word, kind, obj.id))
+
+    def _remove(self, kind, pk):
+        item = self.items.pop((kind, pk), None)
+        if item is None:
+            return
+        keys = self.keys[kind]
+        for word in set(item['words']):
+            index = bisect_left(keys, (word, kind, pk))
+            if index < len(keys) and keys[index] == (word, kind, pk):
+                del keys[index]
+
+    def _rebuild(self):
+        self.keys, self.items = {'category': [], 'product': []}, {}
+        for product in Product.objects.filter(status='active').only('id', 'slug', 'name', 'image').iterator():
+            self._add('product', product, keep_sorted=False)
+        for category in Category.objects.only('id', 'slug', 'name', 'image'):
+            self._add('category', category, keep_sorted=False)
+        for keys in self.keys.values():
+            keys.sort()
+
+    def _sync_products(self):
+        changed = Product.objects.filter(updated_at__gte=self.synced_at).only('id', 'slug', 'name', 'image', 'status')
+        for product in changed:
+            self._remove('product', product.id)
+            if product.status == 'active':
+                self._add('product', product)
+        # deletes leave no updated row behind; a count mismatch means one happened
+        indexed = sum(1 for kind, _ in self.items if kind == 'product')
+        if indexed != Product.objects.filter(status='active').count():
+            self._rebuild()
+
+    def _sync_categories(self):
+        for kind, pk in [key for key in self.items if key[0] == 'category']:
+            self._remove(kind, pk)
+        for category in Category.objects.only('id', 'slug', 'name', 'image'):
+            self._add('category', category)
+
+    def refresh(self):
+        # the version check is a cache read; skip even that for a moment after a check
+        now = time.monotonic()
+        if self.synced_at is not None and now - self.checked_at < getattr(settings, 'SUGGEST_CHECK_INTERVAL', 1.0):
+            return
+        product_version, category_version = get_version('product'), get_version('category')
+
+        with self.lock:
+            self.checked_at = now
+            started = timezone.now()
+            if self.synced_at is None:
+                self._rebuild()
+            else:
+                if product_version != self.product_version:
+                    self._sync_products()
+                if category_version != self.category_version:
+                    self._sync_categories()
+            self.product_version, self.category_version = product_version, category_version
+            # rows written while we were reading get picked up next time
+            self.synced_at = started
+
+    # querying
+
+    def search(self, query, limit=10, request=None):
+        words = _words(query)
+        if not words:
+            return []
+        self.refresh()
+
+        results = []
+        with self.lock:
+            # categories first, then products fill what is left of `limit`
+            for kind in ('category', 'product'):
+                matches = self._matches(kind, words, limit - len(results))
+                results.extend(sorted(matches, key=lambda item: item['name'].lower()))
+        return [
+            {
+                'type': item['type'],
+                'id': item['id'],
+                'slug': item['slug'],
+                'name': item['name'],
+                'thumbnail': self.thumbnail(item['image'], request),
+            }
+            for item in results
+        ]
+
+    def _matches(self, kind, words, limit):
+        first, rest = words[0], words[1:]
+        keys, matches, seen = self.keys[kind], [], set()
+        index = bisect_left(keys, (first,))
+        while index < len(keys) and len(matches) < limit:
+            word, _, pk = keys[index]
+            if not word.startswith(first):
+                break
+            index += 1
+            if pk in seen:
+                continue
+            seen.add(pk)
+            item = self.items[(kind, pk)]
+            # every other typed word must prefix some word of the name
+            if all(any(w.startswith(r) for w in item['words']) for r in rest):
+                matches.append(item)
+        return matches
+
+    @staticmethod
+    def thumbnail(name, request):
+        urls = variant_urls(name, request)
+        return urls['thumb']['webp'] if urls else None
+
+
+index = PrefixIndex()
@@ -0,0 +1,108 @@
+import logging
+import random
+import traceback
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import connection, transaction
+from django.db.models import F
+from django.utils import timezone
+
+from .models import Task
+
+logger = logging.getLogger(__name__)
+
+# name -> (function, max_attempts)
+REGISTRY = {}
+
+
+def task(name=None, max_attempts=5):
+    """Registers a function as a background task under `name` (default: its own name)."""
+    def register(func):
+        REGISTRY[name or func.__name__] = (func, max_attempts)
+        return func
+    return register
+
+
+def enqueue(name, run_at=None, **kwargs):
+    """
+    Queues `name(**kwargs)` once the current transaction commits, so a task
+    never runs for a request that rolled back or sees rows not yet visible.
+    Outside a transaction the row is written straight away.
+    """
+    if name not in REGISTRY:
+        raise KeyError(f"Unknown task {name!r}.")
+    max_attempts = REGISTRY[name][1]
+    transaction.on_commit(lambda: Task.objects.create(
+        name=name, kwargs=kwargs, max_attempts=max_attempts, run_at=run_at or timezone.now(),
+    ))
+
+
+def backoff(attempts):
+    # 10s, 20s, 40s ... capped at an hour, with jitter so failures don't retry in lockstep
+    base = getattr(settings, 'TASK_RETRY_BASE_DELAY', 10)
+    delay = min(base * 2 ** (attempts - 1), 3600)
+    return timedelta(seconds=delay * random.uniform(0.8, 1.2))
+
+
+# Worker side
+
+def claim(limit, worker):
+    """
+    Marks up to `limit` due tasks as running for `worker` and returns their ids.
+    PostgreSQL/MySQL: SELECT ... FOR UPDATE SKIP LOCKED, so workers never wait
+    on each other. SQLite (one writer at a time): a conditional UPDATE per row.
+    """
+    now = timezone.now()
+    due = Task.objects.filter(status='queued', run_at__lte=now).order_by('run_at', 'id')
+    claimed_fields = dict(
+        status='running', locked_by=worker, locked_at=now, started_at=now, attempts=F('attempts') + 1,
+    )
+
+    if connection.features.has_select_for_update_skip_locked:
+        with transaction.atomic():
+            ids = list(due.select_for_update(skip_locked=True).values_list('id', flat=True)[:limit])
+            Task.objects.filter(id__in=ids).update(**claimed_fields)
+        return ids
+
+    ids = []
+    for task_id in due.values_list('id', flat=True)[:limit]:
+        if Task.objects.filter(id=task_id, status='queued').update(**claimed_fields):
+            ids.append(task_id)
+    return ids
+
+
+def execute(task_id):
+    """Runs one claimed task and records the outcome; safe to call from a thread or process."""
+    try:
+        current = Task.objects.get(pk=task_id)
+        func, _ = REGISTRY[current.name]
+        func(**current.kwargs)
+    except Exception:
+        error = traceback.format_exc()
+        current = Task.objects.filter(pk=task_id).first()
+        if current is None:
+            return
+        logger.warning("Task %s #%s failed (attempt %s/%s)", current.name, task_id, current.attempts, current.max_attempts)
+        if current.attempts >= current.max_attempts:
+            Task.objects.filter(pk=task_id).update(status='failed', last_error=error, finished_at=timezone.now())
+        else:
+            Task.objects.filter(pk=task_id).update(
+                status='queued', last_error=error, run_at=timezone.now() + backoff(current.attempts),
+                locked_by='', locked_at=None,
+            )
+    else:
+        Task.objects.filter(pk=task_id).update(status='done', finished_at=timezone.now())
+    finally:
+        connection.close()
+
+
+def requeue_stale(timeout=None):
+    """Puts back tasks whose worker died mid-run; they count as a failed attempt."""
+    timeout = timeout or getattr(settings, 'TASK_LOCK_TIMEOUT', 15 * 60)
+    cutoff = timezone.now() - timedelta(seconds=timeout)
+    stale = Task.objects.filter(status='running', locked_at__lt=cutoff)
+    failed = stale.filter(attempts__gte=F('max_attempts')).update(
+        status='failed', last_error='Worker stopped before finishing.', finished_at=timezone.now(),
+    )
+    return failed + stale.update(status='queued', locked_by='', locked_at=None)
@@ -0,0 +1,57 @@
+from django.conf import settings
+from django.core.mail import send_mail
+
+from .models import Order, User
+from .taskqueue import task
+
+
+# Background tasks, queued with Backend.taskqueue.enqueue(name, **kwargs)
+# and run by `manage.py run_worker`. Arguments must be JSON-serializable.
+
+@task()
+def send_order_confirmation(order_id):
+    order = Order.objects.select_related('user').prefetch_related('items').get(pk=order_id)
+    lines = '\n'.join(f"  {item.quantity} x {item.product_name} @ {item.unit_price}" for item in order.items.all())
+    send_mail(
+        subject=f"Order {order.order_number} received",
+        message=(
+            f"Hi {order.user.first_name or order.user.email},\n\n"
+            f"Thanks for your order {order.order_number}.\n\n{lines}\n\n"
+            f"Subtotal: {order.subtotal}\nTax: {order.tax}\nTotal: {order.total}\n"
+        ),
+        from_email=settings.DEFAULT_FROM_EMAIL,
+        recipient_list=[order.user.email],
+    )
+
+
+@task()
+def send_order_cancellation(order_id):
+    order = Order.objects.select_related('user').get(pk=order_id)
+    send_mail(
+        subject=f"Order {order.order_number} cancelled",
+        message=f"Your order {order.order_number} has been cancelled and {order.total} will be refunded.\n",
+        from_email=settings.DEFAULT_FROM_EMAIL,
+        recipient_list=[order.user.email],
+    )
+
+
+@task()
+def send_order_status_update(order_id):
+    order = Order.objects.select_related('user').get(pk=order_id)
+    send_mail(
+        subject=f"Order {order.order_number}: {order.get_status_display()}",
+        message=f"Your order {order.order_number} is now {order.get_status_display().lower()}.\n",
+        from_email=settings.DEFAULT_FROM_EMAIL,
+        recipient_list=[order.user.email],
+    )
+
+
+@task()
+def send_welcome_email(user_id):
+    user = User.objects.get(pk=user_id)
+    send_mail(
+        subject="Welcome!",
+        message=f"Hi {user.first_name or user.email}, your account is ready.\n",
+        from_email=settings.DEFAULT_FROM_EMAIL,
+        recipient_list=[user.email],
+    )
@@ -25,12 +25,22 @@ urlpatterns = [
     path('cart/update/<int:pk>/', UpdateCartItemView.as_view(), name='cart-update'),
     path('cart/clear/', ClearCartView.as_view(), name='cart-clear'),
     
+    # Typeahead (before the router so "suggest" isn't read as a product id)
+    path('products/suggest/', ProductSuggestView.as_view(), name='product-suggest'),
+    
     # Checkout
     path('checkout/', CheckoutView.as_view(), name='checkout'),
     
     #Admin only status update
     path('admin/orders/<int:order_id>/status/', OrderStatusUpdateView.as_view(),
          name='admin-order-status-update'),
+    path('admin/orders/status/', BulkOrderStatusView.as_view(), name='admin-order-bulk-status'),
+    path('admin/orders/export/', OrderExportView.as_view(), name='admin-order-export'),
+    path('admin/orders/cancel/', BulkOrderCancelView.as_view(), name='admin-order-bulk-cancel'),
+    path('admin/analytics/sales/', SalesSeriesView.as_view(), name='admin-sales-series'),
+    path('admin/analytics/top/', TopSellersView.as_view(), name='admin-top-sellers'),
+    path('admin/products/export/', ProductExportView.as_view(), name='admin-product-export'),
+    path('admin/products/import/', ProductImportView.as_view(), name='admin-product-import'),
     
     #All router Urls
     path('', include(router.urls))
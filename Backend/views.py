@@ -13,20 +13,49 @@ from django.db import transaction
 from rest_framework.decorators import action
 from django_filters.rest_framework import DjangoFilterBackend
 from rest_framework.filters import SearchFilter, OrderingFilter
-from decimal import Decimal
-from django.db.models import F
+from django.db.models import Count, F, Max, Prefetch
+from django.utils import timezone
+from collections import Counter
 from rest_framework.exceptions import ValidationError
+from .cache import CachedResponseMixin, bump_version_on_commit, versioned_key
+from .conditional import ConditionalGetMixin
+from .facets import compute_facets
+from .suggest import index as suggest_index
+from .reservations import commit_stock, hold, release
+from .idempotency import idempotent
+from .taskqueue import enqueue
+from .rollups import sales_series, top_sellers
+from .pricing import get_engine, price_cart
+from .orders import can_transition, cancel_orders, restore_stock, transition_orders
+from .exports import buffered, gzipped, order_rows, render_orders
+from .catalog import FORMATS, ProductImporter, export_rows, guess_format, read_rows, render_rows
+from django.http import StreamingHttpResponse
+import io
+from django.core.cache import cache
+from .search import FullTextSearchFilter
+from .pagination import KeysetPagination
+from .filters import OrderFilter, ProductFilter
 import logging
 
 logger = logging.getLogger(__name__)
 User = get_user_model()
 
 
+# a replayed registration gets fresh tokens; the stored response never holds any
+def _reissue_tokens(view, request, body):
+    user = User.objects.filter(pk=body['user']['id']).first()
+    if user is None:
+        return body
+    refresh = RefreshToken.for_user(user)
+    return {**body, 'tokens': {'access': str(refresh.access_token), 'refresh': str(refresh)}}
+
+
 # user registrations
 class RegisterView(CreateAPIView):
         serializer_class = RegisterSerializer
         permission_classes = [AllowAny]
         
+        @idempotent(private=('tokens',), on_replay=_reissue_tokens)
         def create(self, request, *args, **kwargs):
             serializer = self.get_serializer(data=request.data)
             if not serializer.is_valid():
@@ -34,6 +63,7 @@ class RegisterView(CreateAPIView):
                 return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
             serializer.is_valid(raise_exception=True)
             user = serializer.save()
+            enqueue('send_welcome_email', user_id=user.id)
             
             refresh = RefreshToken.for_user(user)
             
@@ -244,17 +274,128 @@ class ProfileUpdateView(RetrieveUpdateAPIView):
     
 
 # Cart
-class CartView(ViewSet):
+def read_cart(user):
+    """Serialized cart with items and totals in two queries, whatever its size."""
+    cart = Cart.with_totals().filter(user=user).first()
+    if cart is None:
+        Cart.objects.get_or_create(user=user)
+        cart = Cart.with_totals().get(user=user)
+    # discount rules: swap the SQL list prices for the pricing engine's
+    quote = price_cart(cart)
+    for item, line in zip(cart.items.all(), quote.lines):
+        item.unit_price, item.line_total = line['unit_price'], line['line_total']
+    cart.price_total, cart.discount_total = quote.subtotal, quote.discount
+    return CartReadSerializer(cart).data
+
+
+class CartView(ConditionalGetMixin, ViewSet):
     permission_classes = [IsAuthenticated]
+    conditional_actions = ('list',)
     
     def get_cart(self):
         cart, _ = Cart.objects.get_or_create(user=self.request.user)
         return cart
 
+    def get_conditional_state(self):
+        # quantity edits touch added_at; price changes touch the product
+        row = CartItem.objects.filter(cart__user=self.request.user).aggregate(
+            count=Count('pk'),
+            added=Max('added_at'),
+            product=Max('product__updated_at'),
+        )
+        return row['count'], [row['added'], row['product']]
+
+    def get_etag_parts(self):
+        # discount/tax rules, including discount windows opening or closing
+        return [get_engine().state()]
+
     def list(self, request):
+        return self.conditional_response(self.cart_response, request)
+
+    def cart_response(self, request):
+        return Response(read_cart(request.user))
+
+    # POST /api/cart/batch/  {"operations": [{"op": "add", "product_id": 3, "quantity": 2}, ...]}
+    # all or nothing: one bad operation rejects the batch with per-operation errors
+    @action(detail=False, methods=['post'], url_path='batch')
+    @transaction.atomic
+    def batch(self, request):
+        serializer = CartBatchSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        operations = serializer.validated_data['operations']
+
         cart = self.get_cart()
-        serializer = CartReadSerializer(cart)
-        return Response(serializer.data)
+        product_ids = sorted({operation['product_id'] for operation in operations})
+        # read without locking; stock is claimed through reservations below
+        products = {
+            product.id: product
+            for product in Product.objects.filter(id__in=product_ids).only('id', 'name', 'stock', 'status')
+        }
+        items = {
+            item.product_id: item
+            for item in CartItem.objects.select_for_update().filter(cart=cart, product_id__in=product_ids)
+        }
+
+        quantities = {product_id: item.quantity for product_id, item in items.items()}
+        last_index = {}
+        errors = [None] * len(operations)
+        for index, operation in enumerate(operations):
+            product_id = operation['product_id']
+            product = products.get(product_id)
+            if operation['op'] != 'remove' and (product is None or product.status != 'active'):
+                errors[index] = {'product_id': ['Product not found or available.']}
+                continue
+            current = quantities.get(product_id, 0)
+            if operation['op'] == 'add':
+                quantities[product_id] = current + operation['quantity']
+            elif operation['op'] == 'set':
+                quantities[product_id] = operation['quantity']
+            else:
+                quantities[product_id] = 0
+            last_index[product_id] = index
+
+        if any(errors):
+            return Response({
+                'error': 'No changes were made.',
+                'results': [error or {} for error in errors],
+            }, status=status.HTTP_400_BAD_REQUEST)
+
+        now = timezone.now()
+        to_create, to_update, to_delete = [], [], []
+        for product_id, quantity in quantities.items():
+            item = items.get(product_id)
+            if item is None:
+                if quantity:
+                    to_create.append(CartItem(cart=cart, product_id=product_id, quantity=quantity))
+            elif not quantity:
+                to_delete.append(item.id)
+            elif quantity != item.quantity:
+                # bulk_update skips auto_now; the cart ETag reads added_at
+                item.quantity, item.added_at = quantity, now
+                to_update.append(item)
+
+        CartItem.objects.bulk_create(to_create)
+        CartItem.objects.bulk_update(to_update, ['quantity', 'added_at'])
+        if to_delete:
+            CartItem.objects.filter(id__in=to_delete).delete()
+
+        # stock is held once per product, for where the batch leaves it, in id
+        # order so concurrent batches and checkouts can't deadlock
+        for product_id in sorted(last_index):
+            if not hold(cart, product_id, quantities[product_id]):
+                product = products[product_id]
+                errors[last_index[product_id]] = {'quantity': [f'Not enough {product.name} in stock.']}
+        if any(errors):
+            transaction.set_rollback(True)
+            return Response({
+                'error': 'No changes were made.',
+                'results': [error or {} for error in errors],
+            }, status=status.HTTP_400_BAD_REQUEST)
+
+        return Response({
+            'message': 'Cart updated',
+            'cart': read_cart(request.user),
+        }, status=status.HTTP_200_OK)
 
     def retrieve(self, request, pk=None):
         # Allow checking a specific cart item if needed, or just return the whole cart
@@ -263,18 +404,20 @@ class CartView(ViewSet):
     def destroy(self, request, pk=None):
         cart = self.get_cart()
         item = get_object_or_404(CartItem, pk=pk, cart=cart)
-        item.delete()
+        with transaction.atomic():
+            item.delete()
+            release(cart, [item.product_id])
         
-        serializer = CartReadSerializer(cart)
         return Response({
             'message': 'Item removed from cart',
-            'cart': serializer.data
+            'cart': read_cart(request.user)
         })
     
 
 class AddToCartView(APIView):
     permission_classes = [IsAuthenticated]
     
+    @idempotent
     @transaction.atomic
     def post(self, request):
         serializer = AddToCartSerializer(data=request.data)
@@ -286,15 +429,14 @@ class AddToCartView(APIView):
             )
         
         try:
-            # Fetch product and cart with row-level locking
-            product = get_object_or_404(
-                Product.objects.select_for_update(), 
+            # No product lock: stock is held by a conditional UPDATE (Backend.reservations)
+            product = Product.objects.only('id', 'stock', 'reserved').get(
                 id=serializer.validated_data["product_id"]
             )
             quantity = serializer.validated_data["quantity"]
             cart, _ = Cart.objects.get_or_create(user=request.user)
             
-            # Get or update the CartItem
+            # Get or update the CartItem (locks only this shopper's row)
             cart_item, created = CartItem.objects.select_for_update().get_or_create(
                 cart=cart,
                 product=product,
@@ -305,17 +447,17 @@ class AddToCartView(APIView):
             current_qty = cart_item.quantity
             total_requested_qty = current_qty + quantity
             
-            # Stock validation
-            if total_requested_qty > product.stock:
+            cart_item.quantity = total_requested_qty
+            cart_item.save()
+
+            # Stock validation: hold the new total, last so the product row is locked briefly
+            if not hold(cart, product.id, total_requested_qty):
+                transaction.set_rollback(True)
                 return Response(
-                    {"error": f"Insufficient stock. You have {current_qty}, adding {quantity} exceeds limit of {product.stock}."},
+                    {"error": f"Insufficient stock. You have {current_qty}, adding {quantity} exceeds what is available."},
                     status=status.HTTP_400_BAD_REQUEST
                 )
             
-            # Save
-            cart_item.quantity = total_requested_qty
-            cart_item.save()
-            
             return Response({
                 'message': 'Item added to cart.'
             }, status=status.HTTP_201_CREATED)
@@ -338,12 +480,17 @@ class UpdateCartItemView(RetrieveUpdateAPIView):
     def get_queryset(self):
         return CartItem.objects.filter(cart__user=self.request.user)
 
+    @transaction.atomic
+    def perform_update(self, serializer):
+        item = serializer.save()
+        if not hold(item.cart, item.product_id, item.quantity):
+            raise ValidationError({'quantity': f"Not enough stock for {item.quantity} units."})
+
     def patch(self, request, *args, **kwargs):
         response = super().patch(request, *args, **kwargs)
-        cart = Cart.objects.get(user=self.request.user)
         return Response({
             'message': 'Quantity updated',
-            'cart': CartReadSerializer(cart).data
+            'cart': read_cart(self.request.user)
         }, status=status.HTTP_200_OK)
 
     def put(self, request, *args, **kwargs):
@@ -357,6 +504,9 @@ class ClearCartView(APIView):
         delete_count, _ = CartItem.objects.filter(
             cart__user=request.user
         ).delete()
+        cart = Cart.objects.filter(user=request.user).first()
+        if cart:
+            release(cart)
         
         return Response(
             {
@@ -367,9 +517,10 @@ class ClearCartView(APIView):
         )
     
 #  Category all List
-class CategoryListView(ModelViewSet):
+class CategoryListView(CachedResponseMixin, ConditionalGetMixin, ModelViewSet):
     queryset = Category.objects.all()
     serializer_class = CategorySerializer
+    cache_tags = ('category',)
     
     def get_permissions(self):
         if self.action in ["list", "retrieve"]:
@@ -378,29 +529,57 @@ class CategoryListView(ModelViewSet):
     
     
 # Product List
-class ProductViewSet(ModelViewSet):
+class ProductViewSet(CachedResponseMixin, ConditionalGetMixin, ModelViewSet):
     queryset = Product.objects.select_related("category")
+    cache_tags = ('product', 'category')
+    
+    @property
+    def etag_related(self):
+        # the detail payload also embeds the recommended products
+        if self.action == 'retrieve':
+            return ('category__updated_at', 'recommendations__recommended__updated_at')
+        return ('category__updated_at',)
+    
+    def get_etag_parts(self):
+        parts = super().get_etag_parts()
+        if self.action == 'retrieve':
+            # a rebuild can swap recommendations without touching any product row
+            refreshed = RecommendationRun.objects.filter(finished_at__isnull=False).values_list('finished_at', flat=True)
+            parts.append(str(refreshed.first()))
+        return parts
     
     def get_queryset(self):
-        if self.action in ["list", 'retrieve']:
+        if self.action == 'retrieve':
+            recommendations = ProductRecommendation.objects.filter(
+                recommended__status='active'
+            ).select_related('recommended').only(
+                'product', 'recommended', 'kind', 'rank',
+                'recommended__name', 'recommended__slug', 'recommended__price',
+                'recommended__discounted_price', 'recommended__image',
+            )
+            return Product.objects.filter(
+                status='active'
+            ).select_related('category').defer('search_vector').prefetch_related(
+                Prefetch('recommendations', queryset=recommendations, to_attr='active_recommendations')
+            )
+        if self.action in ["list", 'facets']:
             return Product.objects.filter(
                 status='active'
-            ).select_related('category')
+            ).select_related('category').defer('search_vector')
         return Product.objects.select_related("category")
     
     filter_backends = [
         DjangoFilterBackend,
         OrderingFilter,
-        SearchFilter
+        FullTextSearchFilter
     ]
     
-    filterset_fields  = ['category']
-    search_fields =[
-        'name',
-        'description',
-        'category__name'
-    ]
-    ordering_fields = ['price', '-created_at']
+    filterset_class = ProductFilter
+    # None -> picked from the database vendor, see Backend.search
+    search_backend = None
+    ordering_fields = ['price', 'discounted_price', 'created_at']
+    pagination_class = KeysetPagination
+    cursor_ordering_fields = ('created_at', 'price', 'discounted_price', 'search_rank')
     
     def get_serializer_class(self):
         if self.action == "retrieve":
@@ -410,16 +589,112 @@ class ProductViewSet(ModelViewSet):
         return ProductCreateSerializer
     
     def get_permissions(self):
-        if self.action in ["list", "retrieve"]:
+        if self.action in ["list", "retrieve", "facets"]:
             return [AllowAny()]
         return [IsAdminUser()]
+
+    # GET /api/products/facets/?search=&category=&min_price=&max_price=
+    @action(detail=False, methods=['get'], url_path='facets')
+    def facets(self, request):
+        params = request.query_params.copy()
+        category = params.pop('category', [''])[-1]
+        try:
+            category_id = int(category) if category else None
+        except ValueError:
+            raise ValidationError({'category': 'Enter a whole number.'})
+
+        filterset = ProductFilter(params, queryset=self.get_queryset())
+        if not filterset.is_valid():
+            raise ValidationError(filterset.errors)
+
+        # same facets for "Phone ", "phone" and a reordered query string
+        search = ' '.join(request.query_params.get('search', '').lower().split())
+        normalized = [search, category_id] + [
+            str(filterset.form.cleaned_data.get(name)) for name in ('min_price', 'max_price')
+        ]
+        # the stock facet counts unreserved units, which move with every cart hold
+        key = versioned_key('facets', self.cache_tags + ('stock',), repr(normalized))
+
+        data = cache.get(key)
+        if data is None:
+            queryset = FullTextSearchFilter().filter_queryset(request, filterset.qs, self)
+            data = compute_facets(queryset, category_id)
+            cache.set(key, data, self.get_cache_timeout())
+        return Response(data)
+
+    # POST /api/products/batch/  {"items": [{"id": 1, "price": "9.99", "stock_delta": -2}, ...]}
+    @action(detail=False, methods=['post'], url_path='batch')
+    @transaction.atomic
+    def batch_update(self, request):
+        serializer = ProductBatchUpdateSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+
+        items = serializer.validated_data['items']
+        results = [None] * len(items)
+        changes = {}
+        item_serializer = ProductBatchItemSerializer()
+        for index, item in enumerate(items):
+            try:
+                data = item_serializer.run_validation(item)
+            except ValidationError as e:
+                results[index] = {'id': item.get('id'), 'result': 'error', 'errors': e.detail}
+                continue
+            changes[data.pop('id')] = (index, data)
+
+        # lock in id order so concurrent batches can't deadlock each other
+        products = {
+            product.id: product
+            for product in Product.objects.select_for_update().filter(id__in=changes).order_by('id')
+        }
+
+        now = timezone.now()
+        to_update, fields = [], {'updated_at'}
+        active_moves = Counter()
+        for product_id, (index, data) in changes.items():
+            product = products.get(product_id)
+            if product is None:
+                results[index] = {'id': product_id, 'result': 'error', 'errors': {'id': ['Product not found.']}}
+                continue
+
+            delta = data.pop('stock_delta', None)
+            if delta is not None:
+                if product.stock + delta < 0:
+                    results[index] = {'id': product_id, 'result': 'error',
+                                      'errors': {'stock_delta': [f'Only {product.stock} in stock.']}}
+                    continue
+                product.stock = F('stock') + delta
+                fields.add('stock')
+
+            if 'status' in data and (data['status'] == 'active') != (product.status == 'active'):
+                active_moves[product.category_id] += 1 if data['status'] == 'active' else -1
+
+            for name, value in data.items():
+                setattr(product, name, value)
+                fields.add(name)
+            product.updated_at = now
+            to_update.append(product)
+            results[index] = {'id': product_id, 'result': 'updated'}
+
+        if to_update:
+            Product.objects.bulk_update(to_update, sorted(fields), batch_size=500)
+            for category_id, moved in active_moves.items():
+                Category.adjust_counts(category_id, active=moved)
+            # invalidate once for the whole batch, after commit
+            bump_version_on_commit(*(('product', 'category') if active_moves else ('product',)))
+
+        return Response({
+            'updated': len(to_update),
+            'failed': len(items) - len(to_update),
+            'results': results,
+        }, status=status.HTTP_200_OK)
     
     
-TAX_RATE = Decimal('0.10')
 
 class CheckoutView(APIView):
     permission_classes = [IsAuthenticated]
 
+    # retried checkouts (Idempotency-Key) get the first order back, not a second one
+    @idempotent
     @transaction.atomic
     def post(self, request):
         serializer = CheckoutSerializer(data=request.data)
@@ -448,48 +723,56 @@ class CheckoutView(APIView):
 
         cart_items = cart.items.all()
         order_items_data = []
-        products_to_update = []
 
-        # 3. Stock Check and Data Preparation
+        # 3. Stock: conditional decrement per product, reservations consumed
+        short = commit_stock(cart, {item.product_id: item.quantity for item in cart_items})
+        if short:
+            transaction.set_rollback(True)
+            shortfalls = [
+                {
+                    'product_id': item.product_id,
+                    'name': item.product.name,
+                    'requested': item.quantity,
+                    'available': short[item.product_id],
+                }
+                for item in cart_items if item.product_id in short
+            ]
+            first = shortfalls[0]
+            return Response(
+                {
+                    "error": f'"{first["name"]}" is now out of stock (Only {first["available"]} available).',
+                    "shortfalls": shortfalls,
+                },
+                status=status.HTTP_400_BAD_REQUEST
+            )
+
+        # 4. Pricing: discount and tax rules for the whole cart in one call
+        quote = price_cart(cart, address)
+        prices = quote.by_product()
+
+        # Data Preparation
         for item in cart_items:
             product = item.product
-            
-            if product.stock < item.quantity:
-                return Response(
-                    {"error": f'"{product.name}" is now out of stock (Only {product.stock} available).'},
-                    status=status.HTTP_400_BAD_REQUEST
-                )
-
-            # Calculate item total based on current price
-            unit_price = product.discounted_price or product.price
-            
             order_items_data.append({
                 'product': product,
                 'product_name': product.name,
                 'product_image': product.image if product.image else None,
-                'unit_price': unit_price,
+                'unit_price': prices[product.id]['unit_price'],
                 'quantity': item.quantity,
             })
-            
-            # Prepare for stock reduction
-            product.stock -= item.quantity
-            products_to_update.append(product)
-
-        # 4. Financial Calculations
-        subtotal = sum(Decimal(item['unit_price']) * item['quantity'] for item in order_items_data)
-        tax = (subtotal * Decimal("0.10")).quantize(Decimal("0.01")) # Simplified TAX_RATE for example
-        total = subtotal + tax
 
         # 5. Create Order
         order = Order.objects.create(
             user=request.user,
             shipped_address=address,
-            subtotal=subtotal,
-            tax=tax,
-            total=total,
+            subtotal=quote.subtotal,
+            tax=quote.tax,
+            total=quote.total,
             notes=notes,
             status="pending",
             payment_status="unpaid",
+            item_count=len(order_items_data),
+            total_quantity=sum(item['quantity'] for item in order_items_data),
         )
 
         # 6. Bulk Create Order Items
@@ -498,13 +781,12 @@ class CheckoutView(APIView):
         ]
         OrderItem.objects.bulk_create(order_items)
 
-        # 7. Efficient Stock Update
-        # Using bulk_update ensures only one query for all stock changes
-        Product.objects.bulk_update(products_to_update, ["stock"])
-
-        # 8. Clear Cart Items
+        # 7. Clear Cart Items
         cart.items.all().delete()
 
+        # 8. Side effects run on a worker once this commits
+        enqueue('send_order_confirmation', order_id=order.id)
+
         return Response(
             {
                 "message": "Order placed successfully 🎉",
@@ -515,15 +797,23 @@ class CheckoutView(APIView):
     
     
 # User's Order
-class OrderViewSet(ReadOnlyModelViewSet):
+class OrderViewSet(ConditionalGetMixin, ReadOnlyModelViewSet):
     permission_classes = [IsAuthenticated]
+    pagination_class = KeysetPagination
+    
+    @property
+    def etag_related(self):
+        # only the detail payload embeds the address
+        return ('shipped_address__updated_at',) if self.action == 'retrieve' else ()
     
     def get_queryset(self):
-        return Order.objects.filter(
-            user=self.request.user
-        ).select_related(
-            'shipped_address'
-        ).prefetch_related('items__product')
+        orders = Order.objects.filter(user=self.request.user)
+        if self.action == 'list':
+            # item_count / total_quantity are stored: one query per page
+            return orders.only(
+                'id', 'order_number', 'status', 'payment_status', 'total', 'item_count', 'total_quantity', 'created_at',
+            )
+        return orders.select_related('shipped_address').prefetch_related('items')
     
     def get_serializer_class(self):
         if self.action == 'retrieve':
@@ -531,6 +821,7 @@ class OrderViewSet(ReadOnlyModelViewSet):
         return OrderListSerializer
     
     @action(detail=True, methods=['post'], url_path='cancel')
+    @idempotent
     @transaction.atomic #to rollback everything if cancel turns wrong
     def cancel_order(self, request, pk=None):
         order = get_object_or_404(
@@ -540,23 +831,20 @@ class OrderViewSet(ReadOnlyModelViewSet):
         )
         
         # Order check
-        if order.status in ('delivered', 'cancelled'):
+        if not can_transition(order.status, 'canceled'):
             return Response(
                 {'error': f'Cannot cancel with status "{order.status}"'},
                 status=status.HTTP_400_BAD_REQUEST
             )
         
-        # stock restore
-        for item in order.items.select_related('product'):
-            if item.product:
-                # F() ef db field ko directly db level par reference karta hai - without value Python me load liye
-                Product.objects.filter(pk=item.product_id).update(
-                    stock=F('stock') + item.quantity
-                )
+        # stock restore: one UPDATE for all lines, rows locked in product id order like checkout
+        restore_stock([order.id])
                 
-        order.status = 'cancelled'
+        order.status = 'canceled'
         order.payment_status = 'refunded'
-        order.save(update_fields=['status', 'payment_status'])
+        # updated_at is auto_now, but update_fields must still name it
+        order.save(update_fields=['status', 'payment_status', 'updated_at'])
+        enqueue('send_order_cancellation', order_id=order.id)
         
         return Response(
             {'status': 'Order cancelled', 'id':order.id},
@@ -575,6 +863,196 @@ class OrderStatusUpdateView(RetrieveUpdateAPIView):
     def patch(self, request, *args, **kwargs):
         # You can add extra logic here if needed
         return super().patch(request, *args, **kwargs)
+
+    def perform_update(self, serializer):
+        # same conditional UPDATE as the bulk endpoint: loses cleanly to a concurrent change
+        order = serializer.instance
+        applied, _ = transition_orders([order.id], serializer.validated_data['status'])
+        if not applied:
+            raise ValidationError({'status': 'The order changed status in the meantime; reload and retry.'})
+        order.refresh_from_db()
+
+
+# Admin bulk status change (e.g. the evening "shipped" run)
+# POST /api/admin/orders/status/  {"status": "shipped", "order_ids": [...]}
+#                              or {"status": "shipped", "filters": {"status": "confirm", "created_before": "..."}}
+class BulkOrderStatusView(APIView):
+    permission_classes = [IsAdminUser]
+
+    def post(self, request):
+        serializer = BulkOrderStatusSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        data = serializer.validated_data
+
+        if 'order_ids' in data:
+            order_ids = data['order_ids']
+        else:
+            filterset = OrderFilter(data['filters'], queryset=Order.objects.all())
+            if not filterset.is_valid():
+                raise ValidationError({'filters': filterset.errors})
+            order_ids = list(filterset.qs.order_by('id').values_list('id', flat=True))
+
+        applied, rejected = transition_orders(order_ids, data['status'], notify=data['notify'])
+        return Response({
+            'status': data['status'],
+            'matched': len(set(order_ids)),
+            'applied': applied,
+            'rejected': rejected,
+        }, status=status.HTTP_200_OK)
+    
+    
+# Admin bulk cancel (fraud sweeps, a failed payment batch)
+# POST /api/admin/orders/cancel/  {"order_ids": [...], "notify": true}
+class BulkOrderCancelView(APIView):
+    permission_classes = [IsAdminUser]
+
+    def post(self, request):
+        serializer = BulkOrderCancelSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        order_ids = serializer.validated_data['order_ids']
+
+        chunks = []
+        cancelled, skipped, restocked = cancel_orders(
+            order_ids,
+            notify=serializer.validated_data['notify'],
+            progress=lambda done, total, cancelled: chunks.append({'processed': done, 'cancelled': cancelled}),
+        )
+        return Response({
+            'requested': len(set(order_ids)),
+            'cancelled': cancelled,
+            'skipped': skipped,
+            'products_restocked': restocked,
+            'progress': chunks,
+        }, status=status.HTTP_200_OK)
+
+
+# Admin sales analytics, read from the rollup tables (`manage.py rebuild_rollups`)
+# GET /api/admin/analytics/sales/?start=2026-01-01&end=2026-01-31[&product=ID | &category=ID]
+class SalesSeriesView(APIView):
+    permission_classes = [IsAdminUser]
+
+    def get(self, request):
+        params = SalesQuerySerializer(data=request.query_params)
+        params.is_valid(raise_exception=True)
+        query = params.validated_data
+        return Response({
+            'start': query['start'],
+            'end': query['end'],
+            'product': query.get('product'),
+            'category': query.get('category'),
+            'series': sales_series(query['start'], query['end'], query.get('product'), query.get('category')),
+        })
+
+
+# GET /api/admin/analytics/top/?by=product|category&start=...&end=...&limit=10
+class TopSellersView(APIView):
+    permission_classes = [IsAdminUser]
+
+    def get(self, request):
+        params = SalesQuerySerializer(data=request.query_params)
+        params.is_valid(raise_exception=True)
+        query = params.validated_data
+        return Response({
+            'start': query['start'],
+            'end': query['end'],
+            'by': query['by'],
+            'results': top_sellers(query['start'], query['end'], by=query['by'], limit=query['limit']),
+        })
+
+
+# Typeahead
+# GET /api/products/suggest/?q=wire&limit=8
+class ProductSuggestView(APIView):
+    permission_classes = [AllowAny]
+    authentication_classes = []  # public and hot; skip JWT decoding
+    max_limit = 20
+
+    def get(self, request):
+        query = request.query_params.get('q', '')
+        try:
+            limit = min(int(request.query_params.get('limit', 10)), self.max_limit)
+        except ValueError:
+            limit = 10
+        return Response({
+            'query': query,
+            'results': suggest_index.search(query, limit=max(limit, 1), request=request),
+        })
+
+
+# Admin catalog export / import
+# GET /api/admin/products/export/?file_format=csv|jsonl&status=active
+# (not ?format=, DRF reserves that for renderer selection)
+class ProductExportView(APIView):
+    permission_classes = [IsAdminUser]
+
+    def get(self, request):
+        fmt = request.query_params.get('file_format', 'csv')
+        if fmt not in FORMATS:
+            raise ValidationError({'file_format': f'Choose from: {list(FORMATS)}'})
+
+        queryset = Product.objects.all()
+        if request.query_params.get('status'):
+            queryset = queryset.filter(status=request.query_params['status'])
+
+        content_type = 'text/csv' if fmt == 'csv' else 'application/x-ndjson'
+        response = StreamingHttpResponse(render_rows(export_rows(queryset), fmt), content_type=content_type)
+        response['Content-Disposition'] = f'attachment; filename="products.{fmt}"'
+        return response
+
+
+# GET /api/admin/orders/export/?file_format=csv|jsonl&compress=gzip
+#     &status=shipped&payment_status=paid&created_after=...&created_before=...
+# one row per order line, streamed in constant memory
+class OrderExportView(APIView):
+    permission_classes = [IsAdminUser]
+
+    def get(self, request):
+        fmt = request.query_params.get('file_format', 'csv')
+        if fmt not in FORMATS:
+            raise ValidationError({'file_format': f'Choose from: {list(FORMATS)}'})
+        compress = request.query_params.get('compress')
+        if compress not in (None, '', 'gzip'):
+            raise ValidationError({'compress': 'Only "gzip" is supported.'})
+
+        filterset = OrderFilter(request.query_params, queryset=Order.objects.all())
+        if not filterset.is_valid():
+            raise ValidationError(filterset.errors)
+
+        chunks = buffered(render_orders(order_rows(filterset.qs), fmt))
+        filename = f'orders.{fmt}'
+        if compress:
+            chunks, content_type, filename = gzipped(chunks), 'application/gzip', filename + '.gz'
+        else:
+            content_type = 'text/csv' if fmt == 'csv' else 'application/x-ndjson'
+        response = StreamingHttpResponse(chunks, content_type=content_type)
+        response['Content-Disposition'] = f'attachment; filename="{filename}"'
+        return response
+
+
+# POST /api/admin/products/import/  (multipart, field "file")
+class ProductImportView(APIView):
+    permission_classes = [IsAdminUser]
+    max_errors = 100
+
+    def post(self, request):
+        upload = request.FILES.get('file')
+        if upload is None:
+            raise ValidationError({'file': 'Upload a CSV or JSONL file.'})
+
+        fmt = request.data.get('file_format') or guess_format(upload.name)
+        if fmt not in FORMATS:
+            raise ValidationError({'file_format': f'Choose from: {list(FORMATS)}'})
+
+        stream = io.TextIOWrapper(upload.file, encoding='utf-8', newline='')
+        importer = ProductImporter(max_errors=self.max_errors).run(read_rows(stream, fmt))
+
+        return Response({
+            'processed': importer.processed,
+            'imported': importer.upserted,
+            'rows_per_second': round(importer.rate),
+            'error_count': importer.error_count,
+            'errors': [{'line': line_number, 'errors': errors} for line_number, errors in importer.errors],
+        }, status=status.HTTP_200_OK)
     
     
 # User Address
@@ -10,10 +10,12 @@ For the full list of settings and their values, see
 https://docs.djangoproject.com/en/5.2/ref/settings/
 """
 from datetime import timedelta
+from decimal import Decimal
 from pathlib import Path
 
 import os
 from decouple import config
+from corsheaders.defaults import default_headers
 
 # Build paths inside the project like this: BASE_DIR / 'subdir'.
 BASE_DIR = Path(__file__).resolve().parent.parent
@@ -91,6 +93,70 @@ DATABASES = {
         conn_health_checks=True,
     )
 }
+if DATABASES['default']['ENGINE'] == 'django.db.backends.sqlite3':
+    # writers queue for the lock (BEGIN IMMEDIATE) instead of failing with
+    # "database is locked"; the threaded checkout tests need a test database
+    # on disk, as the shared in-memory one raises "table is locked" instead
+    DATABASES['default']['TEST'] = {'NAME': str(BASE_DIR / 'test_db.sqlite3')}
+    DATABASES['default'].setdefault('OPTIONS', {}).update(transaction_mode='IMMEDIATE', timeout=20)
+
+
+# Cache
+# Local memory by default; point CACHE_BACKEND/CACHE_LOCATION at a file or
+# Redis cache in production so every worker shares the same entries.
+CACHES = {
+    'default': {
+        'BACKEND': config('CACHE_BACKEND', default='django.core.cache.backends.locmem.LocMemCache'),
+        'LOCATION': config('CACHE_LOCATION', default='ecommerce-cache'),
+    }
+}
+
+# seconds a cached catalog (product/category) response is kept
+CATALOG_CACHE_TIMEOUT = config('CATALOG_CACHE_TIMEOUT', default=300, cast=int)
+
+# Product search
+# Dotted path to a Backend.search backend; empty picks one for the database
+# (tsvector on PostgreSQL, FTS5 on SQLite, ILIKE elsewhere).
+PRODUCT_SEARCH_BACKEND = config('PRODUCT_SEARCH_BACKEND', default='')
+# SQLite: hits ranked by bm25; further matches are all returned, after them
+SEARCH_RANKED_RESULTS = 500
+# seconds between checks of the product version by the in-memory typeahead index
+SUGGEST_CHECK_INTERVAL = 1.0
+# top-K rows kept per product by `manage.py build_recommendations`
+RECOMMENDATIONS_PER_PRODUCT = 8
+# seconds an add-to-cart holds stock before `manage.py release_reservations` frees it
+STOCK_RESERVATION_TTL = config('STOCK_RESERVATION_TTL', default=15 * 60, cast=int)
+# Idempotency-Key: how long responses are replayed, how long a duplicate waits
+# for the first request, and when a first request that never finished is abandoned
+IDEMPOTENCY_KEY_TTL = 24 * 60 * 60
+IDEMPOTENCY_WAIT = 10
+IDEMPOTENCY_LOCK_TIMEOUT = 60
+
+# request.META key of the header the reverse proxy puts the client address in
+# (HTTP_X_FORWARDED_FOR on Railway); its last address is used. Empty means
+# REMOTE_ADDR, which behind a proxy is the proxy's own address.
+CLIENT_IP_HEADER = config('CLIENT_IP_HEADER', default='')
+
+# Background tasks (`manage.py run_worker`): first retry delay, doubled per
+# attempt, and how long a running task may go silent before it is requeued
+TASK_RETRY_BASE_DELAY = 10
+TASK_LOCK_TIMEOUT = 15 * 60
+
+# tax rate used when no TaxRule matches a line (Backend.pricing)
+DEFAULT_TAX_RATE = config('DEFAULT_TAX_RATE', default='0.10', cast=Decimal)
+# seconds a worker prices with its compiled rules before re-reading them, so
+# rule edits reach every worker even when the cache is per process
+PRICING_ENGINE_TTL = config('PRICING_ENGINE_TTL', default=60, cast=int)
+
+# Order numbers: dotted path to a Backend.ordernumbers generator (empty is the
+# time-sortable snowflake one) and this host's node id, unique per host. The
+# node id is 4 bits, so at most 16 hosts (0-15) can issue numbers; unset means
+# 0, which `manage.py check --deploy` reports.
+ORDER_NUMBER_GENERATOR = config('ORDER_NUMBER_GENERATOR', default='')
+ORDER_NUMBER_NODE_ID = config('ORDER_NUMBER_NODE_ID', default=None, cast=lambda value: None if value is None else int(value))
+
+EMAIL_BACKEND = config('EMAIL_BACKEND', default='django.core.mail.backends.console.EmailBackend')
+DEFAULT_FROM_EMAIL = config('DEFAULT_FROM_EMAIL', default='orders@localhost')
 
 # Password validation
 # https://docs.djangoproject.com/en/5.2/ref/settings/#auth-password-validators
@@ -132,6 +198,9 @@ STATIC_ROOT = os.path.join(BASE_DIR, 'staticfiles')
 MEDIA_URL = '/media/'
 MEDIA_ROOT = BASE_DIR / 'media'
 
+# background threads resizing uploads into thumb/card/detail variants
+IMAGE_VARIANT_WORKERS = config('IMAGE_VARIANT_WORKERS', default=2, cast=int)
+
 # Default primary key field type
 # https://docs.djangoproject.com/en/5.2/ref/settings/#default-auto-field
 
@@ -141,6 +210,8 @@ CORS_ALLOWED_ORIGINS = [
     "http://localhost:3000",
     "http://localhost:5173"
 ]
+CORS_ALLOW_HEADERS = (*default_headers, 'idempotency-key')
+CORS_EXPOSE_HEADERS = ['Idempotent-Replayed']
 
 AUTH_USER_MODEL = 'Backend.User'
 
@@ -151,6 +222,8 @@ REST_FRAMEWORK = {
     'DEFAULT_PERMISSION_CLASSES': (
         'rest_framework.permissions.IsAuthenticated',
     ),
+    # short lists keep page numbers; the large, scrolled ones (products, orders)
+    # set Backend.pagination.KeysetPagination with the sort keys it may seek on
     'DEFAULT_PAGINATION_CLASS': (
         'rest_framework.pagination.PageNumberPagination'
     ),
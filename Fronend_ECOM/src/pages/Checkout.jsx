@@ -1,4 +1,4 @@
-import { useState, useEffect } from 'react'
+import { useState, useEffect, useRef } from 'react'
 import { useNavigate } from 'react-router-dom'
 import { addressAPI, orderAPI } from '../services/api'
 import { useCartStore } from '../store/cartStore'
@@ -22,6 +22,8 @@ const Checkout = () => {
     const [selectedAddress, setSelectedAddress] = useState(null)
     const [notes, setNotes] = useState('')
     const [loading, setLoading] = useState(false)
+    // one key per order attempt, kept across network retries
+    const idempotencyKey = useRef(null)
 
     useEffect(() => {
         fetchAddresses()
@@ -46,16 +48,29 @@ const Checkout = () => {
         }
 
         setLoading(true)
+        if (!idempotencyKey.current) idempotencyKey.current = crypto.randomUUID()
         try {
-            const { data } = await orderAPI.checkout({
-                address_id: selectedAddress,
-                notes: notes,
-            })
+            const payload = { address_id: selectedAddress, notes: notes }
+            let response
+            for (let attempt = 0; ; attempt++) {
+                try {
+                    response = await orderAPI.checkout(payload, idempotencyKey.current)
+                    break
+                } catch (error) {
+                    // no response (flaky network) or still in progress: retry with the same key
+                    const retryable = !error.response || error.response.status === 409
+                    if (!retryable || attempt >= 2) throw error
+                    await new Promise((resolve) => setTimeout(resolve, 1000 * (attempt + 1)))
+                }
+            }
 
+            idempotencyKey.current = null
             toast.success('Order placed successfully! 🎉')
             fetchCart()
-            navigate(`/orders/${data.order.id}`)
+            navigate(`/orders/${response.data.order.id}`)
         } catch (error) {
+            // a definite answer (e.g. out of stock) ends this attempt; the next click is a new one
+            if (error.response) idempotencyKey.current = null
             const message =
                 error.response?.data?.error || 'Failed to place order'
             toast.error(message)
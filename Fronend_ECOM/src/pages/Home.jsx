@@ -15,6 +15,7 @@ const Home = () => {
     const [products, setProducts] = useState([]);
     const [featuredProducts, setFeaturedProducts] = useState([]);
     const [search, setSearch] = useState('');
+    const [suggestions, setSuggestions] = useState([]);
     const [loading, setLoading] = useState(true);
     const [isSearchOpen, setIsSearchOpen] = useState(false);
     const [isScrolled, setIsScrolled] = useState(false);
@@ -49,19 +50,19 @@ const Home = () => {
         fetchInitialData();
     }, []);
 
-    // Search Logic
-    const fetchProducts = useCallback(async (searchTerm) => {
+    // Search Logic (typeahead endpoint, cheap enough to call on every pause)
+    const fetchSuggestions = useCallback(async (searchTerm) => {
         try {
-            const res = await productAPI.getAllProducts(searchTerm);
-            setProducts(Array.isArray(res.data) ? res.data : (res.data.results || []));
+            const res = await productAPI.suggest(searchTerm);
+            setSuggestions(res.data.results || []);
         } catch (error) {
             console.error("Search error:", error);
         }
     }, []);
 
     const debouncedFetchProducts = useMemo(
-        () => debounce((value) => fetchProducts(value), 500),
-        [fetchProducts]
+        () => debounce((value) => fetchSuggestions(value), 150),
+        [fetchSuggestions]
     );
 
     useEffect(() => {
@@ -103,20 +104,25 @@ const Home = () => {
                             </div>
 
                             <div className="max-h-[60vh] overflow-y-auto p-4">
-                                {products.length > 0 ? (
+                                {suggestions.length > 0 ? (
                                     <div className="space-y-2">
-                                        {products.map(product => (
+                                        {suggestions.map(item => (
                                             <Link 
-                                                key={product.id} to={`/product/${product.id}`}
+                                                key={`${item.type}-${item.id}`}
+                                                to={item.type === 'category' ? `/products?category=${item.id}` : `/product/${item.id}`}
                                                 className="flex items-center gap-4 p-3 hover:bg-white rounded-3xl transition-all hover:shadow-sm"
                                                 onClick={() => setIsSearchOpen(false)}
                                             >
-                                                <div className="h-12 w-12 bg-stone-100 rounded-2xl flex items-center justify-center">
-                                                    <ShoppingBag size={20} className="text-stone-600" />
+                                                <div className="h-12 w-12 bg-stone-100 rounded-2xl flex items-center justify-center overflow-hidden">
+                                                    {item.thumbnail ? (
+                                                        <img src={item.thumbnail} alt={item.name} className="h-full w-full object-cover" />
+                                                    ) : (
+                                                        <ShoppingBag size={20} className="text-stone-600" />
+                                                    )}
                                                 </div>
                                                 <div className="flex-1">
-                                                    <h4 className="font-bold text-stone-800">{product.name}</h4>
-                                                    <p className="text-sm text-stone-500">${product.price}</p>
+                                                    <h4 className="font-bold text-stone-800">{item.name}</h4>
+                                                    <p className="text-sm text-stone-500">{item.type === 'category' ? 'Category' : 'Product'}</p>
                                                 </div>
                                                 <ArrowUpRight size={18} className="text-stone-300" />
                                             </Link>
@@ -8,10 +8,10 @@ const API_BASE = import.meta.env.VITE_API_BASE_URL;
 
 const STATUS_CONFIG = {
     pending: { color: 'text-amber-600 bg-amber-50 border-amber-100', icon: Clock, label: 'Pending' },
-    processing: { color: 'text-blue-600 bg-blue-50 border-blue-100', icon: Package, label: 'Processing' },
+    confirm: { color: 'text-blue-600 bg-blue-50 border-blue-100', icon: Package, label: 'Processing' },
     shipped: { color: 'text-indigo-600 bg-indigo-50 border-indigo-100', icon: Package, label: 'Shipped' },
     delivered: { color: 'text-emerald-600 bg-emerald-50 border-emerald-100', icon: CheckCircle2, label: 'Delivered' },
-    cancelled: { color: 'text-rose-600 bg-rose-50 border-rose-100', icon: Package, label: 'Cancelled' },
+    canceled: { color: 'text-rose-600 bg-rose-50 border-rose-100', icon: Package, label: 'Cancelled' },
 };
 
 // --- Order List Component ---
@@ -112,7 +112,7 @@ const OrderDetail = () => {
         try {
             await orderAPI.cancelOrder(id);
             toast.success("Order cancelled successfully");
-            setOrder(prev => ({ ...prev, status: 'cancelled' }));
+            setOrder(prev => ({ ...prev, status: 'canceled' }));
         } catch (error) {
             console.error(error);
             const msg = error.response?.data?.error || "Failed to cancel order";
@@ -134,7 +134,7 @@ const OrderDetail = () => {
                     </button>
                     
                     <div className="flex gap-3">
-                        {['pending', 'processing'].includes(order.status) && (
+                        {['pending', 'confirm'].includes(order.status) && (
                             <button 
                                 onClick={handleCancelOrder}
                                 disabled={cancelling}
@@ -174,10 +174,10 @@ const OrderDetail = () => {
                             </div>
                             
                             {/* Visual Stepper - Hides if cancelled to avoid confusion */}
-                            {order.status !== 'cancelled' ? (
+                            {order.status !== 'canceled' ? (
                                 <div className="relative flex justify-between mt-10">
-                                    {['pending', 'processing', 'shipped', 'delivered'].map((step, idx) => {
-                                        const steps = ['pending', 'processing', 'shipped', 'delivered'];
+                                    {['pending', 'confirm', 'shipped', 'delivered'].map((step, idx) => {
+                                        const steps = ['pending', 'confirm', 'shipped', 'delivered'];
                                         const isCompleted = steps.indexOf(order.status) >= idx;
                                         return (
                                             <div key={step} className="flex flex-col items-center z-10">
@@ -192,7 +192,7 @@ const OrderDetail = () => {
                                     {/* Progress Line */}
                                     <div 
                                         className="absolute top-4 left-0 h-0.5 bg-indigo-600 transition-all duration-1000 -z-0"
-                                        style={{ width: `${(['pending', 'processing', 'shipped', 'delivered'].indexOf(order.status) / 3) * 100}%` }}
+                                        style={{ width: `${(['pending', 'confirm', 'shipped', 'delivered'].indexOf(order.status) / 3) * 100}%` }}
                                     ></div>
                                 </div>
                             ) : (
@@ -1,5 +1,5 @@
 import React, { useState, useEffect } from 'react'
-import { useParams, useNavigate } from 'react-router-dom'
+import { useParams, useNavigate, Link } from 'react-router-dom'
 import { productAPI } from '../services/api'
 import { useCartStore } from '../store/cartStore'
 import { useAuthStore } from '../store/useAuthStore'
@@ -284,6 +284,51 @@ const ProductDetail = () => {
                         )}
                     </div>
                 </div>
+
+                {/* ─── Recommendations ─── */}
+                {[
+                    { kind: 'bought_together', title: 'Frequently bought together' },
+                    { kind: 'related', title: 'You may also like' },
+                ].map(({ kind, title }) => {
+                    const items = (product.recommendations || []).filter((item) => item.kind === kind)
+                    if (!items.length) return null
+                    return (
+                        <section key={kind} className="mt-16">
+                            <h3 className="text-sm font-bold text-slate-900 uppercase tracking-widest mb-6">
+                                {title}
+                            </h3>
+                            <div className="grid grid-cols-2 sm:grid-cols-4 gap-6">
+                                {items.map((item) => (
+                                    <Link
+                                        key={item.id}
+                                        to={`/product/${item.id}`}
+                                        className="group rounded-2xl border border-slate-100 bg-white p-4 hover:shadow-md transition-all duration-200"
+                                    >
+                                        <div className="aspect-square rounded-xl bg-slate-50 overflow-hidden mb-4 flex items-center justify-center">
+                                            {item.image_variants ? (
+                                                <picture>
+                                                    <source srcSet={item.image_variants.card.webp} type="image/webp" />
+                                                    <img
+                                                        src={item.image_variants.card.jpeg}
+                                                        alt={item.name}
+                                                        loading="lazy"
+                                                        className="w-full h-full object-contain group-hover:scale-105 transition-transform duration-300"
+                                                    />
+                                                </picture>
+                                            ) : (
+                                                <ShoppingCart size={32} className="text-slate-300" />
+                                            )}
+                                        </div>
+                                        <p className="text-sm font-semibold text-slate-900 truncate">{item.name}</p>
+                                        <p className="text-sm text-slate-600 mt-1">
+                                            ₹{parseFloat(item.discounted_price).toLocaleString('en-IN')}
+                                        </p>
+                                    </Link>
+                                ))}
+                            </div>
+                        </section>
+                    )
+                })}
             </div>
         </div>
     )
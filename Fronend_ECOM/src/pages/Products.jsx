@@ -13,7 +13,7 @@ const Products = () => {
     const [products, setProducts] = useState([])
     const [categories, setCategories] = useState([])
     const [loading, setLoading] = useState(false)
-    const [totalCount, setTotalCount] = useState(0)
+    const [pageLinks, setPageLinks] = useState({ next: null, previous: null })
     const [showFilters, setShowFilters] = useState(false)
 
     
@@ -23,7 +23,7 @@ const Products = () => {
         minPrice: searchParams.get('minPrice') || '',
         maxPrice: searchParams.get('maxPrice') || '',
         sortBy: searchParams.get('sortBy') || '-created_at',
-        page: searchParams.get('page') || 1,
+        cursor: searchParams.get('cursor') || '',
     })
 
     // this handle forward and backward button
@@ -34,7 +34,7 @@ const Products = () => {
             minPrice: searchParams.get('minPrice') || '',
             maxPrice: searchParams.get('maxPrice') || '',
             sortBy: searchParams.get('sortBy') || '-created_at',
-            page: searchParams.get('page') || 1,
+            cursor: searchParams.get('cursor') || '',
         });
     }, [searchParams]);
 
@@ -57,14 +57,15 @@ const Products = () => {
         setLoading(true);
         try {
             const params = {};
-            // Only send non-empty values to API
+            // Only send non-empty values to API, under the names the API expects
+            const apiNames = { minPrice: 'min_price', maxPrice: 'max_price', sortBy: 'ordering' }
             Object.keys(currentFilters).forEach(key => {
-                if (currentFilters[key]) params[key] = currentFilters[key];
+                if (currentFilters[key]) params[apiNames[key] || key] = currentFilters[key];
             });
 
             const { data } = await productAPI.getAllProducts(params);
             setProducts(data.results);
-            setTotalCount(data.count);
+            setPageLinks({ next: data.next, previous: data.previous });
         } catch (error) {
             console.error("Error fetching products:", error);
         } finally {
@@ -84,7 +85,7 @@ const Products = () => {
     }, [filters, debouncedFetch]);
 
     const handleFilterChange = (key, value) => {
-        const newFilters = { ...filters, [key]:value, page:'1'}
+        const newFilters = { ...filters, [key]:value, cursor:''}
         setFilters(newFilters)
 
         // update url
@@ -95,8 +96,11 @@ const Products = () => {
         setSearchParams(params)
     }
 
-    const handlePageChange = (page) => {
-        const newFilters = { ...filters, page: page.toString() }
+    // the API paginates with opaque cursors carried in its next/previous links
+    const handlePageChange = (link) => {
+        if (!link) return
+        const cursor = new URL(link).searchParams.get('cursor') || ''
+        const newFilters = { ...filters, cursor }
         setFilters(newFilters)
 
         // update url
@@ -117,35 +121,11 @@ const Products = () => {
             minPrice:'',
             maxPrice:'',
             sortBy:'-created_at',
-            page:1,
+            cursor:'',
         })
         setSearchParams({})
     }
 
-    // Pagination calculations
-    const itemsPerPage = 12
-    const totalPages = Math.ceil(totalCount / itemsPerPage)
-    const currentPage = parseInt(filters.page)
-
-    // Generate page numbers with ellipsis
-    const getPageNumbers = () => {
-        const pages = []
-        if (totalPages <= 5) {
-            for (let i = 1; i <= totalPages; i++) pages.push(i)
-        } else {
-            pages.push(1)
-            if (currentPage > 3) pages.push('...')
-            
-            const start = Math.max(2, currentPage - 1)
-            const end = Math.min(totalPages - 1, currentPage + 1)
-            for (let i = start; i <= end; i++) pages.push(i)
-            
-            if (currentPage < totalPages - 2) pages.push('...')
-            pages.push(totalPages)
-        }
-        return pages
-    }
-    
     return (
         <div className='min-h-screen bg-gray-50'>
             <div className='max-w-7xl mx-auto px-4 sm:px-6 lg:px-8 py-8'>
@@ -154,7 +134,7 @@ const Products = () => {
                     <div>
                         <h1 className='text-3xl font-bold text-gray-800'>Products</h1>
                         <p className='text-gray-600'>
-                            {loading ? 'Updating...' : `Showing ${products.length} of ${totalCount} products`}
+                            {loading ? 'Updating...' : `Showing ${products.length} products`}
                         </p>
                     </div>
                     <button onClick={() => setShowFilters(!showFilters)} className='lg:hidden flex items-center space-x-2 bg-white px-4 py-2 rounded-lg shadow-md'>
@@ -224,8 +204,8 @@ const Products = () => {
                                 >
                                     <option value='-created_at'>Newest First</option>
                                     <option value='created_at'>Oldest First</option>
-                                    <option value='price'>Price: Low to High</option>
-                                    <option value='-price'>Price: High to Low</option>
+                                    <option value='discounted_price'>Price: Low to High</option>
+                                    <option value='-discounted_price'>Price: High to Low</option>
                                 </select>
                             </div>
 
@@ -269,43 +249,22 @@ const Products = () => {
                                     </div>
 
                                     {/* Pagination */}
-                                    {totalPages > 1 && (
+                                    {(pageLinks.next || pageLinks.previous) && (
                                         <div className='mt-8 flex items-center justify-center gap-2'>
                                             {/* Previous Button */}
                                             <button
-                                                onClick={() => handlePageChange(currentPage - 1)}
-                                                disabled={currentPage === 1}
+                                                onClick={() => handlePageChange(pageLinks.previous)}
+                                                disabled={!pageLinks.previous}
                                                 className='flex items-center gap-1 px-3 py-2 rounded-lg border border-gray-300 bg-white text-gray-700 hover:bg-gray-100 disabled:opacity-40 disabled:cursor-not-allowed transition-colors text-sm font-medium'
                                             >
                                                 <ChevronLeft className='h-4 w-4' />
                                                 Prev
                                             </button>
 
-                                            {/* Page Numbers */}
-                                            <div className='flex items-center gap-1'>
-                                                {getPageNumbers().map((pageNum, idx) => (
-                                                    pageNum === '...' ? (
-                                                        <span key={`dots-${idx}`} className='px-2 text-gray-400 select-none'>…</span>
-                                                    ) : (
-                                                        <button
-                                                            key={pageNum}
-                                                            onClick={() => handlePageChange(pageNum)}
-                                                            className={`min-w-[36px] h-9 rounded-lg text-sm font-medium transition-colors ${
-                                                                currentPage === pageNum
-                                                                    ? 'bg-stone-600 text-white shadow-sm'
-                                                                    : 'border border-gray-300 bg-white text-gray-700 hover:bg-gray-100'
-                                                            }`}
-                                                        >
-                                                            {pageNum}
-                                                        </button>
-                                                    )
-                                                ))}
-                                            </div>
-
                                             {/* Next Button */}
                                             <button
-                                                onClick={() => handlePageChange(currentPage + 1)}
-                                                disabled={currentPage >= totalPages}
+                                                onClick={() => handlePageChange(pageLinks.next)}
+                                                disabled={!pageLinks.next}
                                                 className='flex items-center gap-1 px-3 py-2 rounded-lg border border-gray-300 bg-white text-gray-700 hover:bg-gray-100 disabled:opacity-40 disabled:cursor-not-allowed transition-colors text-sm font-medium'
                                             >
                                                 Next
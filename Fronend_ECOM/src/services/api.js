@@ -80,6 +80,7 @@ export const authAPI = {
 // Product API
 export const productAPI = {
     getAllProducts: (params) => api.get('/products/', { params }),
+    suggest: (q) => api.get('/products/suggest/', { params: { q, limit: 8 } }),
     getById: (id) => api.get(`/products/${id}/`),
     getByCategory: (categoryId) => api.get(`/products/?category=${categoryId}`),
     createProduct: (data) => api.post('/products/create', data),
@@ -106,13 +107,20 @@ export const cartAPI = {
     updateCart: (id, data) => api.patch(`/cart/update/${id}/`, data),
     deleteCart: (id) => api.delete(`/cart/${id}/`),
     clearCart: () => api.delete('/cart/clear/'),  // ← Add trailing slash
+    // [{ op: 'add' | 'set' | 'remove', product_id, quantity }] -> { cart }
+    batch: (operations) => api.post('/cart/batch/', { operations }),
 }
 // Order API
 export const orderAPI = {
     getAllOrders: () => api.get('/orders/'),
     getById: (id) => api.get(`/orders/${id}/`),
-    checkout: (data) => api.post('/checkout/', data),
-    cancelOrder: (id) => api.post(`/orders/${id}/cancel/`),
+    // reuse the same key when retrying: the server replays the first response
+    checkout: (data, idempotencyKey) => api.post('/checkout/', data, {
+        headers: idempotencyKey ? { 'Idempotency-Key': idempotencyKey } : {},
+    }),
+    cancelOrder: (id, idempotencyKey) => api.post(`/orders/${id}/cancel/`, null, {
+        headers: idempotencyKey ? { 'Idempotency-Key': idempotencyKey } : {},
+    }),
     updateStatus: (id, data) => api.put(`/orders/${id}/status`, data),  
 }
 
@@ -27,17 +27,34 @@ export const useCartStore = create((set, get) => ({
                 quantity: parseInt(quantity, 10)
             };
             
-            const { data } = await cartAPI.addToCart(payload);
-            await get().fetchCart();
-            toast.success(data.message || 'Added to cart');
+            // one round trip: the batch endpoint answers with the new cart
+            const { data } = await cartAPI.batch([{ op: 'add', ...payload }]);
+            set({ cart: data.cart });
+            toast.success('Added to cart');
             return {success: true};
         }catch(error){
             console.error('Cart error:', error.response?.data); // Debug log
-            const message = error.response?.data?.error || 'Failed to add item to cart';
+            const results = error.response?.data?.results || [];
+            const detail = results.map((r) => Object.values(r)[0]?.[0]).find(Boolean);
+            const message = detail || error.response?.data?.error || 'Failed to add item to cart';
             toast.error(message);
             return {success: false, error: message};
         }
     },
+    // Apply several add/set/remove operations in one request (re-order, steppers)
+    applyOperations: async (operations) => {
+        try {
+            const { data } = await cartAPI.batch(operations);
+            set({ cart: data.cart });
+            return { success: true };
+        } catch (error) {
+            const results = error.response?.data?.results || [];
+            const detail = results.map((r) => Object.values(r)[0]?.[0]).find(Boolean);
+            const message = detail || error.response?.data?.error || 'Failed to update cart';
+            toast.error(message);
+            return { success: false, error: message };
+        }
+    },
     // Update Cart
     // Update Cart
     updateCart: async (itemId, quantity) => {